@@ -1,6 +1,171 @@
-from django.contrib import admin
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
+
+from todo.profiling import profile_path, saved_profiles
+from todo.sharding import each_shard
 
 # Register your models here.
-from .models import Task
+from .models import Job, Tag, Task, TaskList, VersionConflict
+
+
+class CappedCountPaginator(Paginator):
+    """Counts at most ``COUNT_CAP`` rows: a bounded subquery, not COUNT(*).
+
+    Past the cap only the first pages are listed; filter or search to
+    narrow the selection instead.
+    """
+
+    COUNT_CAP = 10_000
+
+    @cached_property
+    def count(self):
+        return self.object_list[: self.COUNT_CAP].count()
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """Lists one shard at a time (the first one by default)."""
+
+    title = "shard"
+    parameter_name = "shard"
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in settings.TASKS_SHARDS[1:]]
+
+    def choices(self, changelist):
+        choices = list(super().choices(changelist))
+        choices[0]["display"] = settings.TASKS_SHARDS[0]
+        return choices
+
+    def queryset(self, request, queryset):
+        return queryset.using(self.value() or settings.TASKS_SHARDS[0])
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ["title", "owner", "task_list", "complete", "due_at", "created"]
+    list_select_related = ["owner", "task_list"]
+    # owner and complete lead the task_owner_complete_created index.
+    list_filter = ["complete", "owner"]
+    # Prefix search walks the task_title_nocase index; "contains" would
+    # read every row.
+    search_fields = ["^title"]
+    search_help_text = "Tasks whose title starts with the search term."
+    raw_id_fields = ["owner", "task_list"]
+    show_full_result_count = False
+    paginator = CappedCountPaginator
+    list_per_page = 50
+    actions = ["mark_complete", "mark_open", "soft_delete"]
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if settings.TASKS_SHARDS:
+            # Users stay on default: fetched by a second query, not joined.
+            queryset = queryset.prefetch_related("owner")
+        return queryset
+
+    def get_list_select_related(self, request):
+        if settings.TASKS_SHARDS:
+            return ["task_list"]
+        return self.list_select_related
+
+    def get_list_filter(self, request):
+        if settings.TASKS_SHARDS:
+            return [*self.list_filter, ShardFilter]
+        return self.list_filter
+
+    def get_object(self, request, object_id, from_field=None):
+        # The change form does not know the shard: look in each in turn.
+        for _ in each_shard():
+            obj = super().get_object(request, object_id, from_field)
+            if obj is not None:
+                return obj
+        return None
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # It loads and lists every selected row first; soft_delete is a
+        # single UPDATE whatever the selection size.
+        actions.pop("delete_selected", None)
+        return actions
+
+    def update_versioned(self, request, queryset, **kwargs):
+        """Update the selection at the versions read here, all or nothing.
+
+        A row edited between that read and the UPDATE is not overwritten:
+        the action is refused and the admin asked to try again.
+        """
+        versions = dict(queryset.values_list("pk", "version"))
+        try:
+            return queryset.update_versioned(versions, **kwargs)
+        except VersionConflict as conflict:
+            self.message_user(
+                request,
+                f"{len(conflict.ids)} task(s) changed meanwhile; nothing was "
+                "updated, please try again.",
+                messages.WARNING,
+            )
+            return None
+
+    @admin.action(description="Mark selected tasks as complete")
+    def mark_complete(self, request, queryset):
+        updated = self.update_versioned(
+            request, queryset.filter(complete=False), complete=True
+        )
+        if updated is not None:
+            self.message_user(request, f"{updated} task(s) marked as complete.")
+
+    @admin.action(description="Mark selected tasks as open")
+    def mark_open(self, request, queryset):
+        updated = self.update_versioned(
+            request, queryset.filter(complete=True), complete=False
+        )
+        if updated is not None:
+            self.message_user(request, f"{updated} task(s) marked as open.")
+
+    @admin.action(description="Delete selected tasks", permissions=["delete"])
+    def soft_delete(self, request, queryset):
+        # The soft delete of TaskQuerySet.delete(), version-checked.
+        deleted = self.update_versioned(
+            request,
+            queryset.filter(deleted_at__isnull=True),
+            deleted_at=datetime.now(timezone.utc),
+        )
+        if deleted is not None:
+            self.message_user(request, f"{deleted} task(s) deleted.")
+
+
+admin.site.register(TaskList)
+admin.site.register(Job)
+admin.site.register(Tag)
+
+
+def profiles(request):
+    """Staff page listing the saved request profiles (``todo.profiling``)."""
+    context = {
+        **admin.site.each_context(request),
+        "title": "Request profiles",
+        "enabled": settings.TASKS_PROFILE,
+        "sample_rate": f"{settings.TASKS_PROFILE_SAMPLE_RATE:.2%}",
+        "profiles": [
+            {
+                "name": name,
+                "size": size,
+                "saved": datetime.fromtimestamp(mtime, timezone.utc),
+            }
+            for name, size, mtime in saved_profiles()
+        ],
+    }
+    return TemplateResponse(request, "admin/profiles.html", context)
+
 
-admin.site.register(Task)
+def download_profile(request, name):
+    path = profile_path(name)
+    if path is None:
+        raise Http404("No such profile.")
+    return FileResponse(path.open("rb"), as_attachment=True, filename=name)
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class TasksConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "tasks"
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from todo.sharding import seed_after_migrate
+
+        from .events import notify_feed
+        from .signals import changes_recorded
+
+        changes_recorded.connect(notify_feed, dispatch_uid="tasks.events.notify_feed")
+        post_migrate.connect(
+            seed_after_migrate, sender=self, dispatch_uid="todo.sharding.seed"
+        )
@@ -0,0 +1,62 @@
+"""Move old completed tasks to the archive table (``ArchivedTask``).
+
+Completed tasks otherwise stay in ``tasks_task`` forever, and every list,
+count and index pays for them. Run by ``manage.py archive_completed_tasks``
+or the ``archive_completed_tasks`` job; ``ArchivedTask.restore()`` undoes
+it for one task.
+
+``purge_deleted()`` likewise clears out soft-deleted tasks for good
+(``manage.py purge_deleted_tasks`` and the ``purge_deleted_tasks`` job).
+"""
+
+from django.db import router, transaction
+
+from todo.sharding import each_shard
+
+from .batching import delete_in_batches
+from .models import ArchivedTask, Task
+
+
+def archivable(cutoff):
+    # Walks the partial task_completed_archive index.
+    return Task.objects.filter(complete=True, completed_at__lt=cutoff).order_by(
+        "completed_at"
+    )
+
+
+def move_batch(batch):
+    """Copy one batch into the archive and remove it, in one transaction."""
+    using = router.db_for_write(Task)
+    with transaction.atomic(using=using):
+        tasks = list(batch.using(using).prefetch_related("tags"))
+        ArchivedTask.objects.using(using).bulk_create(
+            ArchivedTask.from_task(task) for task in tasks
+        )
+        # Through the task bookkeeping: list counters drop and open pages
+        # see a delete in the change log.
+        Task.all_objects.using(using).filter(
+            pk__in=[task.pk for task in tasks]
+        ).hard_delete()
+
+
+def archive_completed(cutoff, batch_size, pause):
+    """Archive the tasks completed before ``cutoff``; returns how many."""
+    return sum(
+        delete_in_batches(archivable(cutoff), batch_size, pause, delete=move_batch)
+        for _ in each_shard()
+    )
+
+
+def purge_deleted(cutoff, batch_size, pause):
+    """Hard-delete the tasks soft-deleted before ``cutoff``; returns how many."""
+    # Walks the partial deleted_at index; each batch is its own short
+    # transaction so creates can interleave between batches.
+    return sum(
+        delete_in_batches(
+            Task.all_objects.filter(deleted_at__lt=cutoff).order_by("deleted_at"),
+            batch_size,
+            pause,
+            delete=lambda batch: batch.hard_delete(),
+        )
+        for _ in each_shard()
+    )
@@ -0,0 +1,23 @@
+import time
+
+
+def delete_in_batches(queryset, batch_size, pause, delete=None):
+    """Delete ``queryset`` ``batch_size`` rows at a time.
+
+    Every batch is its own short statement, with ``pause`` seconds of sleep in
+    between, so other writers get the SQLite lock back in the meantime.
+    ``delete`` receives the queryset of one batch (defaults to ``.delete()``).
+
+    Returns the number of rows deleted.
+    """
+    delete = delete or (lambda batch: batch.delete())
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        delete(queryset.filter(pk__in=ids).order_by())
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            return deleted
+        time.sleep(pause)
@@ -0,0 +1,148 @@
+"""Opt-in write coalescing for task creation (``TASKS_COALESCE_CREATES``).
+
+On SQLite every transaction serializes on the single writer lock and pays an
+fsync. Under bursts, request threads hand their new ``Task`` to one flusher
+thread per process, which waits up to ``TASKS_COALESCE_WINDOW_MS`` for more
+and inserts the whole batch with a single ``bulk_create`` transaction.
+
+Each request still blocks until its own row is committed and gets its own
+result: if the batch fails, its rows are retried one by one so only the
+offending create raises. Rows are inserted in arrival order.
+
+A request that times out withdraws its row if no batch has taken it yet;
+otherwise it waits, once more at most as long, for that batch's outcome. It
+never reports a failure for a row that is inserted later, which a retrying
+client would duplicate. An error in a batch fails its requests, not the
+flusher thread.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, router, transaction
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+class CreateCoalescer:
+    def __init__(self, window_ms=None, max_batch=None, timeout=None):
+        self.window = (window_ms or settings.TASKS_COALESCE_WINDOW_MS) / 1000
+        self.max_batch = max_batch or settings.TASKS_COALESCE_MAX_BATCH
+        self.timeout = timeout or settings.TASKS_COALESCE_TIMEOUT
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, task):
+        """Insert ``task`` as part of the next batch; returns it saved."""
+        future = Future()
+        self._ensure_started()
+        self._queue.put((task, future))
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise  # withdrawn: it will not be inserted
+            # Already in a batch being written: wait for it, once more.
+            return future.result(self.timeout)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="task-create-coalescer", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self.flush(batch)
+            except Exception:
+                # flush() has failed the requests; the thread carries on.
+                logger.exception("Coalesced task creation failed")
+            finally:
+                close_old_connections()
+
+    def flush(self, batch):
+        # One transaction per database (several when sharding is on).
+        batches = defaultdict(list)
+        try:
+            for task, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue  # its request timed out and withdrew it
+                try:
+                    # May query the database (placing a new owner's shard).
+                    using = router.db_for_write(Task, instance=task)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    batches[using].append((task, future))
+            for using, rows in batches.items():
+                self._flush(rows, using)
+        except Exception as e:
+            # No request may be left waiting on a row nobody will write.
+            for _, future in batch:
+                if future.running():
+                    future.set_exception(e)
+            raise
+
+    def _flush(self, batch, using):
+        try:
+            with transaction.atomic(using=using):
+                Task.objects.using(using).bulk_create([task for task, _ in batch])
+        except Exception:
+            # Isolate the failure: each create gets its own outcome.
+            for task, future in batch:
+                task.pk = None
+                task._state.adding = True
+                try:
+                    task.save(using=using)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(task)
+        else:
+            for task, future in batch:
+                future.set_result(task)
+
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+
+def get_coalescer():
+    global _coalescer
+    with _coalescer_lock:
+        if _coalescer is None:
+            _coalescer = CreateCoalescer()
+        return _coalescer
+
+
+def create_task(task):
+    """Save a new task, through the coalescer when it is enabled."""
+    if not settings.TASKS_COALESCE_CREATES:
+        task.save()
+        return task
+    return get_coalescer().submit(task)
@@ -0,0 +1,156 @@
+"""Server-Sent Events fan-out of task changes.
+
+Each worker process runs one ``ChangeFeed``: a single asyncio task tails the
+``TaskChange`` log (the shared SQLite file is the cross-process channel) and
+pushes new entries onto the queues of the SSE connections it serves. An idle
+connection is therefore just a parked coroutine; the cost of watching the
+table is paid once per process, not once per client. Commits made in the same
+process wake the tailer immediately instead of waiting for the next poll.
+With sharding on it tails the log of every shard, each with its own cursor.
+"""
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from todo.sharding import aliases, shard_for
+
+from .models import TaskChange
+
+# Entries buffered per connection before a slow client gets disconnected;
+# it reconnects with Last-Event-ID and catches up from the change log.
+QUEUE_SIZE = 1000
+REPLAY_LIMIT = 1000
+
+
+def format_event(change):
+    """Serialize a ``TaskChange.as_json()`` dict as one SSE message."""
+    return (
+        f"id: {change['cursor']}\n"
+        f"event: {change['action']}\n"
+        f"data: {json.dumps(change)}\n\n"
+    )
+
+
+class ChangeFeed:
+    def __init__(self, poll_interval=None):
+        self.poll_interval = poll_interval or settings.TASKS_EVENTS_POLL_INTERVAL
+        self.subscribers = {}
+        self.cursors = None  # shard alias -> last entry seen there
+        self._loop = None
+        self._runner = None
+        self._wakeup = None
+
+    def subscribe(self, owner_id):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers[queue] = owner_id
+        loop = asyncio.get_running_loop()
+        if self._runner is None or self._runner.done() or self._loop is not loop:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._runner = loop.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.pop(queue, None)
+        if not self.subscribers and self._runner is not None:
+            self._runner.cancel()
+            self._runner = None
+            self.cursors = None
+
+    def notify(self):
+        """Wake the tailer; safe to call from any thread."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @sync_to_async
+    def _latest(self):
+        return {alias: TaskChange.latest_cursor(alias) or 0 for alias in aliases()}
+
+    @sync_to_async
+    def _fetch(self, alias, cursor):
+        changes = TaskChange.objects.using(alias).filter(pk__gt=cursor).order_by("pk")
+        return [
+            (change.owner_id, change.as_json()) for change in changes[:REPLAY_LIMIT]
+        ]
+
+    async def _run(self):
+        if self.cursors is None:
+            self.cursors = await self._latest()
+        while self.subscribers:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            for alias, cursor in self.cursors.items():
+                changes = await self._fetch(alias, cursor)
+                for owner_id, change in changes:
+                    self.cursors[alias] = change["cursor"]
+                    self.dispatch(owner_id, change)
+                if len(changes) == REPLAY_LIMIT:
+                    self._wakeup.set()
+
+    def dispatch(self, owner_id, change):
+        for queue, subscriber in list(self.subscribers.items()):
+            if subscriber != owner_id:
+                continue
+            try:
+                queue.put_nowait(change)
+            except asyncio.QueueFull:
+                # Too slow: end its stream, the reconnect replays the gap.
+                self.subscribers.pop(queue, None)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+
+feed = ChangeFeed()
+
+
+def notify_feed(sender, using=None, **kwargs):
+    transaction.on_commit(feed.notify, using=using, robust=True)
+
+
+@sync_to_async
+def replay(owner_id, since):
+    changes = TaskChange.objects.using(shard_for(owner_id))
+    changes = changes.filter(owner_id=owner_id, pk__gt=since)
+    return list(changes.order_by("pk")[:REPLAY_LIMIT])
+
+
+async def event_stream(owner_id, since=None):
+    """Yield SSE messages for ``owner_id``, replaying from ``since`` first."""
+    # Subscribe before replaying so nothing committed in between is lost;
+    # the cursor check below drops what the replay already sent.
+    queue = feed.subscribe(owner_id)
+    try:
+        yield f"retry: {settings.TASKS_EVENTS_RETRY_MS}\n\n"
+        while since is not None:
+            changes = await replay(owner_id, since)
+            for change in changes:
+                since = change.pk
+                yield format_event(change.as_json())
+            if len(changes) < REPLAY_LIMIT:
+                break
+        while True:
+            try:
+                change = await asyncio.wait_for(
+                    queue.get(), settings.TASKS_EVENTS_HEARTBEAT
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if change is None:
+                return
+            if since is not None and change["cursor"] <= since:
+                continue
+            yield format_event(change)
+    finally:
+        feed.unsubscribe(queue)
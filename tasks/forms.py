@@ -1,13 +1,70 @@
 from django import forms
 
-from .models import Task
+from .models import Tag, Task, TaskList
 
 
 class TaskForm(forms.ModelForm):
     title = forms.CharField(
         widget=forms.TextInput(attrs={"placeholder": "Add new task"})
     )
+    # Version the client last saw; the update only applies if it still holds.
+    version = forms.IntegerField(required=False, min_value=1, widget=forms.HiddenInput)
+    due_at = forms.DateTimeField(
+        required=False,
+        widget=forms.DateTimeInput(
+            attrs={"type": "datetime-local"}, format="%Y-%m-%dT%H:%M"
+        ),
+    )
+
+    # Comma-separated tag names, created on the fly for the task's owner.
+    tags = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={"placeholder": "Tags, comma separated"}),
+    )
 
     class Meta:
         model = Task
-        fields = "__all__"
+        fields = ["title", "complete", "due_at"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is not None:
+            self.initial["tags"] = ", ".join(t.name for t in self.instance.tags.all())
+
+    def clean_tags(self):
+        names = [name.strip() for name in self.cleaned_data["tags"].split(",")]
+        names = list(dict.fromkeys(name for name in names if name))
+        max_length = Tag._meta.get_field("name").max_length
+        if any(len(name) > max_length for name in names):
+            raise forms.ValidationError(
+                f"Tags are at most {max_length} characters long."
+            )
+        return names
+
+    def save(self, commit=True):
+        version = self.cleaned_data.get("version")
+        if self.instance.pk is not None and version is not None:
+            # A new task starts at version 1 whatever was posted.
+            self.instance.version = version
+        if "due_at" in self.changed_data:
+            # A new due date deserves a new reminder.
+            self.instance.reminded_at = None
+        return super().save(commit)
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        tags = [
+            Tag.objects.get_or_create(owner=self.instance.owner, name=name)[0]
+            for name in self.cleaned_data["tags"]
+        ]
+        self.instance.tags.set(tags)
+
+
+class TaskListForm(forms.ModelForm):
+    name = forms.CharField(
+        widget=forms.TextInput(attrs={"placeholder": "New list name"})
+    )
+
+    class Meta:
+        model = TaskList
+        fields = ["name"]
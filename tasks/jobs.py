@@ -0,0 +1,236 @@
+"""Lightweight background jobs, stored in the database (no broker needed).
+
+Heavy operations register a handler with ``@job("kind")`` and are queued
+with ``enqueue()``; the request returns at once with the job id and the
+client polls ``/jobs/<id>/``. ``manage.py run_jobs`` executes them in a
+thread pool. Jobs are claimed with a conditional UPDATE, so several worker
+processes can share the table; failures are retried with exponential
+backoff up to ``max_attempts``, and each kind may cap how many of its jobs
+run at the same time. A worker beats a heartbeat on the jobs it runs; only
+those it stopped beating for (its process died) are handed to another.
+"""
+
+import io
+import logging
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import close_old_connections
+from django.db.models import Count, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from todo.sharding import using_owner
+
+from .archive import archive_completed, purge_deleted
+from .batching import delete_in_batches
+from .models import Job, Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def job(kind, concurrency=None):
+    """Register the decorated function as the handler of ``kind`` jobs.
+
+    The handler is called with the job payload as keyword arguments and
+    returns a JSON-serializable result. ``concurrency`` caps how many jobs
+    of this kind may run at once across all workers.
+    """
+
+    def register(handler):
+        registry[kind] = (handler, concurrency)
+        return handler
+
+    return register
+
+
+def enqueue(kind, payload=None, owner=None, max_attempts=None):
+    if kind not in registry:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        owner=owner if owner is not None and owner.is_authenticated else None,
+        max_attempts=max_attempts or settings.TASKS_JOBS_MAX_ATTEMPTS,
+    )
+
+
+class Worker:
+    def __init__(self, workers=None, poll_interval=None):
+        self.workers = workers or settings.TASKS_JOBS_WORKERS
+        self.poll_interval = poll_interval or settings.TASKS_JOBS_POLL_INTERVAL
+        self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="job")
+        self.running = {}
+        self.beat_every = settings.TASKS_JOBS_STALE_AFTER / 4
+        self.last_beat = time.monotonic()
+
+    def requeue_stale(self):
+        """Give back jobs whose worker died while running them."""
+        cutoff = timezone.now() - timedelta(seconds=settings.TASKS_JOBS_STALE_AFTER)
+        return Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=cutoff).update(
+            status=Job.QUEUED, started_at=None, heartbeat_at=None
+        )
+
+    def heartbeat(self):
+        """Mark the jobs this worker is running as still alive."""
+        pks = [running.pk for running in self.running.values()]
+        if pks:
+            Job.objects.filter(pk__in=pks, status=Job.RUNNING).update(
+                heartbeat_at=timezone.now()
+            )
+        self.last_beat = time.monotonic()
+
+    def claim(self, limit):
+        """Atomically mark up to ``limit`` runnable jobs as running.
+
+        A capped kind is checked inside the claiming UPDATE itself, so
+        concurrent workers cannot both take its last free slot.
+        """
+        candidates = Job.objects.filter(
+            status=Job.QUEUED, run_after__lte=timezone.now()
+        ).order_by("run_after", "pk")
+        claimed = []
+        full = set()
+        for candidate in candidates[: limit * 4]:
+            if len(claimed) == limit:
+                break
+            if candidate.kind in full:
+                continue
+            claim = Job.objects.filter(pk=candidate.pk, status=Job.QUEUED)
+            cap = registry.get(candidate.kind, (None, None))[1]
+            if cap is not None:
+                running = (
+                    Job.objects.filter(kind=candidate.kind, status=Job.RUNNING)
+                    .order_by()
+                    .values("kind")
+                    .annotate(n=Count("pk"))
+                    .values("n")
+                )
+                claim = claim.alias(running=Coalesce(Subquery(running), 0)).filter(
+                    running__lt=cap
+                )
+            now = timezone.now()
+            won = claim.update(
+                status=Job.RUNNING,
+                started_at=now,
+                heartbeat_at=now,
+                attempts=candidate.attempts + 1,
+            )
+            if won:
+                candidate.status = Job.RUNNING
+                candidate.attempts += 1
+                claimed.append(candidate)
+            elif cap is not None:
+                full.add(candidate.kind)  # or taken by another worker
+        return claimed
+
+    def execute(self, job):
+        try:
+            handler = registry[job.kind][0]
+            # On the owner's shard; maintenance kinds visit every shard.
+            with using_owner(job.owner_id):
+                result = handler(**job.payload)
+        except Exception:
+            self.failed(job, traceback.format_exc())
+        else:
+            job.status = Job.DONE
+            job.result = result
+            job.finished_at = timezone.now()
+            job.save(update_fields=["status", "result", "finished_at"])
+        finally:
+            close_old_connections()
+
+    def failed(self, job, error):
+        logger.warning("Job %s (%s) failed, attempt %s", job.pk, job.kind, job.attempts)
+        job.error = error
+        if job.attempts < job.max_attempts:
+            backoff = settings.TASKS_JOBS_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=backoff)
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "run_after", "finished_at"])
+
+    def run_once(self):
+        """Start whatever fits in the free slots; returns how many started."""
+        self.running = {f: j for f, j in self.running.items() if not f.done()}
+        free = self.workers - len(self.running)
+        if free <= 0:
+            return 0
+        claimed = self.claim(free)
+        for claimed_job in claimed:
+            self.running[self.pool.submit(self.execute, claimed_job)] = claimed_job
+        return len(claimed)
+
+    def drain(self):
+        """Run jobs until nothing is runnable and every started job is done."""
+        while self.run_once() or self.running:
+            pending = set(self.running)
+            while pending := wait(pending, timeout=self.beat_every).not_done:
+                self.heartbeat()
+            for future in list(self.running):
+                future.result()
+            self.running.clear()
+
+    def run_forever(self):
+        while True:
+            self.requeue_stale()
+            if not self.run_once():
+                time.sleep(self.poll_interval)
+            if time.monotonic() - self.last_beat >= self.beat_every:
+                self.heartbeat()
+            close_old_connections()
+
+
+# Handlers. Each kind writes to SQLite, so one at a time is plenty.
+
+
+@job("clear_completed", concurrency=1)
+def clear_completed(owner_id=None, task_list_id=None):
+    """Soft-delete the completed tasks of one list, in small batches."""
+    done = Task.objects.filter(
+        owner_id=owner_id, task_list_id=task_list_id, complete=True
+    ).order_by("pk")
+    deleted = delete_in_batches(
+        done, settings.TASKS_PURGE_BATCH_SIZE, settings.TASKS_PURGE_PAUSE
+    )
+    return {"deleted": deleted}
+
+
+@job("purge_deleted_tasks", concurrency=1)
+def purge_deleted_tasks(older_than_days=None):
+    if older_than_days is None:
+        older_than_days = settings.TASKS_PURGE_AFTER_DAYS
+    purged = purge_deleted(
+        timezone.now() - timedelta(days=older_than_days),
+        settings.TASKS_PURGE_BATCH_SIZE,
+        settings.TASKS_PURGE_PAUSE,
+    )
+    return {"purged": purged}
+
+
+@job("archive_completed_tasks", concurrency=1)
+def archive_completed_tasks(older_than_days=None):
+    if older_than_days is None:
+        older_than_days = settings.TASKS_ARCHIVE_AFTER_DAYS
+    archived = archive_completed(
+        timezone.now() - timedelta(days=older_than_days),
+        settings.TASKS_ARCHIVE_BATCH_SIZE,
+        settings.TASKS_ARCHIVE_PAUSE,
+    )
+    return {"archived": archived}
+
+
+@job("compact_task_changes", concurrency=1)
+def compact_task_changes(older_than_days=None):
+    options = {} if older_than_days is None else {"older_than_days": older_than_days}
+    out = io.StringIO()
+    call_command("compact_task_changes", stdout=out, **options)
+    return {"output": out.getvalue().strip()}
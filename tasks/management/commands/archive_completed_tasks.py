@@ -0,0 +1,53 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.archive import archive_completed
+
+
+class Command(BaseCommand):
+    help = (
+        "Move tasks completed long ago to the archive table, in small "
+        "batches, pausing between batches so the SQLite writer lock is "
+        "never held for long."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=float,
+            default=settings.TASKS_ARCHIVE_AFTER_DAYS,
+            help="Only archive tasks completed at least this many days ago.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.TASKS_ARCHIVE_BATCH_SIZE,
+            help="Tasks moved per transaction.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=settings.TASKS_ARCHIVE_PAUSE,
+            help="Seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=None,
+            help="Keep running, starting a new pass every N seconds.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+            archived = archive_completed(
+                cutoff, options["batch_size"], options["pause"]
+            )
+            self.stdout.write(f"Archived {archived} completed task(s).")
+            if options["every"] is None:
+                return
+            time.sleep(options["every"])
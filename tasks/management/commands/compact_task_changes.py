@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.batching import delete_in_batches
+from tasks.models import TaskChange
+from todo.sharding import each_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Drop change-log entries older than the retention window. Clients "
+        "whose cursor predates the oldest kept entry get a 410 and resync."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=float,
+            default=settings.TASKS_CHANGE_LOG_RETENTION_DAYS,
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.TASKS_PURGE_BATCH_SIZE
+        )
+        parser.add_argument("--pause", type=float, default=settings.TASKS_PURGE_PAUSE)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+        compacted = 0
+        for _ in each_shard():
+            latest = TaskChange.objects.order_by("-pk").values_list("pk", flat=True)
+            # The newest entry is always kept: it anchors the cursor horizon.
+            doomed = TaskChange.objects.filter(
+                at__lt=cutoff, pk__lt=latest[:1]
+            ).order_by("pk")
+            compacted += delete_in_batches(
+                doomed, options["batch_size"], options["pause"]
+            )
+        self.stdout.write(f"Compacted {compacted} change-log entries.")
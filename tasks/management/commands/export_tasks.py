@@ -0,0 +1,36 @@
+import json
+from operator import itemgetter
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from tasks.models import Task
+from todo.sharding import gather
+
+FIELDS = [
+    "id",
+    "owner_id",
+    "task_list_id",
+    "title",
+    "complete",
+    "created",
+    "completed_at",
+    "due_at",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Write tasks as JSON lines, in id order. Reads every shard and "
+        "merges the streams, so memory use stays flat."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, help="Only this user's tasks.")
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.order_by("pk").values(*FIELDS)
+        if options["owner"] is not None:
+            tasks = tasks.filter(owner_id=options["owner"])
+        for row in gather(tasks, key=itemgetter("id")):
+            self.stdout.write(json.dumps(row, cls=DjangoJSONEncoder))
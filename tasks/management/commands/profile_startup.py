@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SETUP = "import django; django.setup()"
+STAGES = (
+    "import json; from todo.warmup import profile_stages; "
+    "print(json.dumps(profile_stages(warm={warm}, database={database!r})))"
+)
+MIGRATE = (
+    "import django; from django.core.management import call_command; "
+    "from todo.warmup import use_database; use_database({database!r}); "
+    "django.setup(); call_command('migrate', verbosity=0)"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Report where a cold worker spends its start-up time: module import "
+        "times, then each stage up to the second request (settings, app and "
+        "models imports included), without and with the TASKS_WARMUP "
+        "warm-up. Every measure runs in a fresh interpreter."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=15,
+            help="Number of top-level imports listed.",
+        )
+        parser.add_argument(
+            "--min-ms",
+            type=float,
+            default=1.0,
+            help="Hide the module imports of a stage faster than this.",
+        )
+        parser.add_argument(
+            "--database-file",
+            default=None,
+            help="Run the requests against this SQLite file instead of the "
+            "default database; it is migrated first.",
+        )
+
+    def python(self, *args):
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": os.environ.get(
+                "DJANGO_SETTINGS_MODULE", "todo.settings"
+            ),
+        }
+        return subprocess.run(
+            [sys.executable, *args],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+    def import_times(self):
+        """``(cumulative seconds, module)`` of the imports ``-X importtime``
+        reports at the top level (statement imports only: the settings,
+        apps and models modules are timed by the stages instead)."""
+        stderr = self.python("-X", "importtime", "-c", SETUP).stderr
+        for line in stderr.splitlines():
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            _, cumulative, name = line.split("|")
+            if not name.startswith("  "):
+                yield int(cumulative) / 1e6, name.strip()
+
+    def handle(self, *args, **options):
+        imports = sorted(self.import_times(), reverse=True)
+        self.stdout.write("Top-level imports during django.setup() (ms):")
+        for seconds, module in imports[: options["top"]]:
+            self.stdout.write(f"{seconds * 1000:>10.1f}  {module}")
+
+        database = options["database_file"]
+        if database is not None:
+            database = str(database)
+            self.python("-c", MIGRATE.format(database=database))
+        for warm in (False, True):
+            script = STAGES.format(warm=warm, database=database)
+            stdout = self.python("-c", script).stdout
+            stages = json.loads(stdout.splitlines()[-1])
+            title = "with warm-up" if warm else "cold"
+            self.stdout.write(f"Start-up stages, {title} (ms):")
+            for stage, seconds in stages:
+                if stage.startswith(" ") and seconds * 1000 < options["min_ms"]:
+                    continue
+                self.stdout.write(f"{seconds * 1000:>10.1f}  {stage}")
@@ -0,0 +1,53 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.archive import purge_deleted
+
+
+class Command(BaseCommand):
+    help = (
+        "Hard-delete soft-deleted tasks in small batches, pausing between "
+        "batches so the SQLite writer lock is never held for long."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=float,
+            default=settings.TASKS_PURGE_AFTER_DAYS,
+            help="Only purge tasks deleted at least this many days ago.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.TASKS_PURGE_BATCH_SIZE,
+            help="Rows removed per transaction.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=settings.TASKS_PURGE_PAUSE,
+            help="Seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=None,
+            help="Keep running, starting a new pass every N seconds.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            purged = purge_deleted(
+                timezone.now() - timedelta(days=options["older_than_days"]),
+                options["batch_size"],
+                options["pause"],
+            )
+            self.stdout.write(f"Purged {purged} deleted task(s).")
+            if options["every"] is None:
+                return
+            time.sleep(options["every"])
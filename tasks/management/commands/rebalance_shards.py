@@ -0,0 +1,125 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.utils import timezone
+
+from tasks.models import ArchivedTask, ShardPlacement, Tag, Task, TaskList, TaskTag
+from todo.sharding import seed_id_ranges, shard_for
+
+
+class Command(BaseCommand):
+    help = (
+        "Show how owners and tasks are spread over TASKS_SHARDS, or move "
+        "one owner's task data to another shard."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, help="User id of the owner to move.")
+        parser.add_argument("--to", help="Shard alias to move the owner to.")
+        parser.add_argument(
+            "--settle",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before sweeping up writes that were already "
+            "on their way to the old shard during the move.",
+        )
+
+    def handle(self, *args, **options):
+        shards = settings.TASKS_SHARDS
+        if not shards:
+            raise CommandError("Sharding is off: TASKS_SHARDS is empty.")
+        for alias in shards:
+            seed_id_ranges(alias)
+        if options["owner"] is None:
+            self.report(shards)
+            return
+        if options["to"] not in shards:
+            raise CommandError(f"--to must be one of {', '.join(shards)}.")
+        if not get_user_model().objects.filter(pk=options["owner"]).exists():
+            raise CommandError(f"No user with id {options['owner']}.")
+        moved = self.move_owner(options["owner"], options["to"], options["settle"])
+        self.stdout.write(
+            f"Moved {moved} row(s) of owner {options['owner']} to {options['to']}."
+        )
+
+    def report(self, shards):
+        owners = dict(
+            ShardPlacement.objects.values_list("alias")
+            .annotate(n=models.Count("pk"))
+            .order_by()
+        )
+        for alias in shards:
+            tasks = Task.all_objects.using(alias).count()
+            self.stdout.write(
+                f"{alias}: {owners.get(alias, 0)} owner(s), {tasks} task(s)"
+            )
+
+    def move_owner(self, owner_id, target, settle):
+        source = shard_for(owner_id)
+
+        def flip():
+            ShardPlacement.objects.filter(owner_id=owner_id).update(
+                alias=target, moved_at=timezone.now()
+            )
+
+        moved = 0
+        if source != target:
+            moved = self.move_rows(owner_id, source, target, flip)
+        # Requests that looked the shard up before the flip may still write
+        # to the old one: give them time, then move what they left behind.
+        time.sleep(settle)
+        for alias in settings.TASKS_SHARDS:
+            if alias != target:
+                moved += self.move_rows(owner_id, alias, target)
+        return moved
+
+    def move_rows(self, owner_id, source, target, flip=None):
+        """Copy the owner's rows to ``target``, then delete them from ``source``.
+
+        The source's writer lock is held from the first read to the delete,
+        so no write to those rows can slip in between. Re-running after a
+        failure is safe: copies an interrupted run left on the target are
+        replaced, as the source still holds the live rows.
+        """
+        with transaction.atomic(using=source):
+            with connections[source].cursor() as cursor:
+                # Any write statement takes the lock, even one changing nothing.
+                cursor.execute("UPDATE tasks_task SET id = id WHERE id = -1")
+            tasks = Task.all_objects.using(source).filter(owner_id=owner_id)
+            rows = [
+                (TaskList, TaskList.objects.using(source).filter(owner_id=owner_id)),
+                (Tag, Tag.objects.using(source).filter(owner_id=owner_id)),
+                (Task, tasks),
+                (TaskTag, TaskTag.objects.using(source).filter(task__in=tasks)),
+                (
+                    ArchivedTask,
+                    ArchivedTask.objects.using(source).filter(owner_id=owner_id),
+                ),
+            ]
+            rows = [(model, list(queryset)) for model, queryset in rows]
+            with transaction.atomic(using=target):
+                for model, objs in reversed(rows):
+                    models.QuerySet.delete(
+                        model._base_manager.using(target).filter(
+                            pk__in=[obj.pk for obj in objs]
+                        )
+                    )
+                for model, objs in rows:
+                    # Copied as they are: counters, ranks and ids included,
+                    # without the bookkeeping of TaskQuerySet.bulk_create.
+                    models.QuerySet.bulk_create(
+                        model._base_manager.using(target), objs, batch_size=500
+                    )
+            if flip is not None:
+                with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                    flip()
+            for model, objs in reversed(rows):
+                models.QuerySet.delete(
+                    model._base_manager.using(source).filter(
+                        pk__in=[obj.pk for obj in objs]
+                    )
+                )
+        return sum(len(objs) for _, objs in rows)
@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.models import Task
+from todo.sharding import each_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Renumber task ranks evenly within every list, so drag-to-reorder "
+        "keeps finding room between neighbours. Lists already even are "
+        "left untouched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.TASKS_PURGE_BATCH_SIZE,
+            help="Rows renumbered per UPDATE.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=settings.TASKS_PURGE_PAUSE,
+            help="Seconds to sleep between lists.",
+        )
+
+    def handle(self, *args, **options):
+        renumbered = 0
+        for _ in each_shard():
+            lists = (
+                Task.objects.values_list("owner_id", "task_list_id")
+                .distinct()
+                .order_by()
+            )
+            for owner_id, task_list_id in lists:
+                moved = Task.objects.filter(
+                    owner_id=owner_id, task_list_id=task_list_id
+                ).rebalance_ranks(options["batch_size"])
+                renumbered += moved
+                if moved:
+                    time.sleep(options["pause"])
+        self.stdout.write(f"Renumbered {renumbered} task rank(s).")
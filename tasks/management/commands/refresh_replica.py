@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from todo.routers import REPLICA
+from todo.sqlite_backup import copy_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the local read replica: an online copy of the default "
+        "SQLite database made with the backup API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="Replica file (defaults to DATABASES['replica']['NAME']).",
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=None,
+            nargs="?",
+            const=settings.TASKS_REPLICA_REFRESH_INTERVAL,
+            help="Keep refreshing every N seconds.",
+        )
+        parser.add_argument("--pages", type=int, default=256)
+        parser.add_argument("--sleep", type=float, default=0.005)
+
+    def handle(self, *args, **options):
+        target = options["output"] or settings.DATABASES[REPLICA]["NAME"]
+        while True:
+            started = time.monotonic()
+            copy_database(target, pages=options["pages"], sleep=options["sleep"])
+            self.stdout.write(
+                f"Replica {target} refreshed in {time.monotonic() - started:.3f}s."
+            )
+            if options["every"] is None:
+                return
+            time.sleep(options["every"])
@@ -0,0 +1,66 @@
+import sqlite3
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from todo.sqlite_backup import restore, verify
+
+
+class Command(BaseCommand):
+    help = (
+        "Restore a backup made by backup_db over a database, online, after "
+        "checking its .sha256 file and its integrity."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("backup", help="A .sqlite3 or .sqlite3.gz backup.")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            "--no-verify",
+            action="store_false",
+            dest="verify",
+            help="Restore a backup that has no .sha256 file.",
+        )
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="Do not ask for confirmation.",
+        )
+        parser.add_argument("--pages", type=int, default=settings.TASKS_BACKUP_PAGES)
+        parser.add_argument("--sleep", type=float, default=settings.TASKS_BACKUP_SLEEP)
+
+    def handle(self, *args, **options):
+        path = Path(options["backup"])
+        alias = options["database"]
+        if not path.is_file():
+            raise CommandError(f"No backup at {path}.")
+        if alias not in settings.DATABASES:
+            raise CommandError(f"Unknown database {alias!r}.")
+        matches = verify(path)
+        if matches is False:
+            raise CommandError(f"{path} does not match its checksum.")
+        if matches is None and options["verify"]:
+            raise CommandError(
+                f"{path} has no .sha256 file; pass --no-verify to restore it anyway."
+            )
+        if options["interactive"]:
+            answer = input(
+                f"This replaces everything in database {alias!r} with {path}.\n"
+                "Type 'yes' to continue, or 'no' to cancel: "
+            )
+            if answer != "yes":
+                self.stdout.write("Restore cancelled.")
+                return
+        started = time.monotonic()
+        try:
+            restore(path, alias, pages=options["pages"], sleep=options["sleep"])
+        except sqlite3.Error as e:
+            raise CommandError(f"Restore of {alias} failed: {e}") from e
+        self.stdout.write(
+            f"{alias} restored from {path} in {time.monotonic() - started:.3f}s."
+        )
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.jobs import Worker, enqueue, registry
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs in a thread pool. Several run_jobs "
+        "processes may share the queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.TASKS_JOBS_WORKERS,
+            help="Jobs run concurrently by this process.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.TASKS_JOBS_POLL_INTERVAL,
+            help="Seconds to wait before looking for work again when idle.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run what is currently runnable, then exit.",
+        )
+        parser.add_argument(
+            "--enqueue",
+            choices=sorted(registry),
+            help="Queue a job of this kind (default payload) and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["enqueue"]:
+            job = enqueue(options["enqueue"])
+            self.stdout.write(f"Queued job {job.pk} ({job.kind}).")
+            return
+        worker = Worker(options["workers"], options["poll_interval"])
+        if options["once"]:
+            worker.requeue_stale()
+            worker.drain()
+            self.stdout.write("No runnable jobs left.")
+            return
+        self.stdout.write(f"Running jobs with {worker.workers} worker thread(s).")
+        worker.run_forever()
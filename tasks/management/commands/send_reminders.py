@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Send due-date reminders through TASKS_REMINDER_BACKEND, sleeping "
+        "until the next one is due."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lookahead",
+            type=float,
+            default=settings.TASKS_REMINDER_LOOKAHEAD,
+            help="Seconds ahead covered by each index scan.",
+        )
+        parser.add_argument(
+            "--rescan",
+            type=float,
+            default=settings.TASKS_REMINDER_RESCAN,
+            help="Seconds between scans (picks up new and changed due dates).",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send the reminders due now, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler(
+            lookahead=options["lookahead"], rescan=options["rescan"]
+        )
+        if options["once"]:
+            sent = scheduler.run_once()
+            self.stdout.write(f"Sent {sent} reminder(s).")
+            return
+        scheduler.run_forever()
@@ -0,0 +1,80 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from todo.server import Arbiter
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the site with pre-forked worker processes sharing one socket, "
+        "each with a thread pool. SIGHUP reloads the workers, SIGTERM stops."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "addrport",
+            nargs="?",
+            default="127.0.0.1:8000",
+            help="host:port or port to listen on (default 127.0.0.1:8000).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.TASKS_SERVE_WORKERS or os.cpu_count() or 1,
+            help="Worker processes (default: one per CPU).",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=settings.TASKS_SERVE_THREADS,
+            help="Connections served concurrently by each worker.",
+        )
+        parser.add_argument(
+            "--keepalive",
+            type=float,
+            default=settings.TASKS_SERVE_KEEPALIVE,
+            help="Seconds an idle keep-alive connection is kept open.",
+        )
+        parser.add_argument(
+            "--max-requests",
+            type=int,
+            default=settings.TASKS_SERVE_MAX_REQUESTS,
+            help="Recycle a worker after about this many requests (0: never).",
+        )
+        parser.add_argument(
+            "--graceful-timeout",
+            type=float,
+            default=settings.TASKS_SERVE_GRACEFUL_TIMEOUT,
+            help="Seconds busy workers get to finish on reload or shutdown.",
+        )
+        parser.add_argument(
+            "--access-log",
+            action="store_true",
+            help="Log every request to stderr.",
+        )
+
+    def handle(self, *args, **options):
+        if not hasattr(os, "fork"):
+            raise CommandError("serve needs os.fork(); use runserver on Windows.")
+        host, _, port = options["addrport"].rpartition(":")
+        if not port.isdigit():
+            raise CommandError(f"{options['addrport']!r} is not a valid port.")
+        arbiter = Arbiter(
+            settings.WSGI_APPLICATION,
+            host.strip("[]") or "127.0.0.1",
+            int(port),
+            workers=max(options["workers"], 1),
+            threads=max(options["threads"], 1),
+            keepalive=options["keepalive"],
+            max_requests=options["max_requests"],
+            graceful_timeout=options["graceful_timeout"],
+            access_log=options["access_log"],
+            log=self.log,
+        )
+        arbiter.run()
+
+    def log(self, message):
+        self.stdout.write(message)
+        self.stdout.flush()
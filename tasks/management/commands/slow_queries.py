@@ -0,0 +1,65 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Rank the fingerprints of the slow query log by total time, with "
+        "the views issuing them and the plan of their slowest run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--log",
+            default=settings.TASKS_SLOW_QUERY_LOG,
+            help="Log file; its rotated copies (.1, .2, ...) are read too.",
+        )
+        parser.add_argument("--top", type=int, default=10)
+
+    def entries(self, path):
+        path = Path(path)
+        files = [path, *sorted(path.parent.glob(f"{path.name}.[0-9]*"))]
+        for file in files:
+            if not file.exists():
+                continue
+            with file.open(encoding="utf-8") as lines:
+                for line in lines:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by a crash
+
+    def handle(self, *args, **options):
+        ranked = {}
+        for entry in self.entries(options["log"]):
+            stats = ranked.setdefault(
+                entry["fingerprint"],
+                {"total": 0.0, "count": 0, "slowest": entry, "views": set()},
+            )
+            stats["total"] += entry["ms"]
+            stats["count"] += 1
+            if entry["ms"] > stats["slowest"]["ms"]:
+                stats["slowest"] = entry
+            stats["views"].add(entry["url_name"] or entry["view"] or "-")
+        if not ranked:
+            self.stdout.write("No slow queries logged.")
+            return
+        top = sorted(ranked.items(), key=lambda item: -item[1]["total"])
+        for digest, stats in top[: options["top"]]:
+            slowest = stats["slowest"]
+            self.stdout.write(
+                f"{digest}  total {stats['total']:.0f} ms  "
+                f"{stats['count']} run(s)  "
+                f"avg {stats['total'] / stats['count']:.1f} ms  "
+                f"max {slowest['ms']:.1f} ms  "
+                f"views: {', '.join(sorted(stats['views']))}"
+            )
+            self.stdout.write(f"  {slowest['normalized']}")
+            for line in slowest["plan"] or []:
+                # A SCAN with no index is what a missing index looks like.
+                scan = line.lstrip().startswith("SCAN") and " USING " not in line
+                flag = "!" if scan else " "
+                self.stdout.write(f"  {flag} {line}")
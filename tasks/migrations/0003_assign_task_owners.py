@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def assign_owners(apps, schema_editor):
+    """Hand the pre-existing (global) tasks to the ``TASKS_DEFAULT_OWNER`` account.
+
+    Without that setting, or that account, the tasks stay unowned, i.e. they
+    remain the shared list shown to anonymous visitors.
+    """
+    Task = apps.get_model("tasks", "Task")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+
+    username = settings.TASKS_DEFAULT_OWNER
+    if not username:
+        return
+    owner = User.objects.filter(**{User.USERNAME_FIELD: username}).first()
+    if owner is None:
+        return
+
+    Task.objects.filter(owner__isnull=True).update(owner=owner)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tasks", "0002_task_owner"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(assign_owners, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def rank_by_creation(apps, schema_editor):
+    """Keep the current (insertion) order: rank = id, RANK_STEP apart."""
+    Task = apps.get_model("tasks", "Task")
+    Task.objects.update(rank=F("id"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tasks", "0010_tags"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="rank",
+            field=models.FloatField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(rank_by_creation, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["owner", "task_list", "rank", "id"],
+                name="task_owner_list_rank",
+            ),
+        ),
+    ]
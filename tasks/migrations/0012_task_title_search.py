@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:49
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tasks", "0011_task_rank"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                django.db.models.functions.comparison.Collate("title", "NOCASE"),
+                condition=models.Q(("deleted_at__isnull", True)),
+                name="task_title_nocase",
+            ),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def start_completion_clock(apps, schema_editor):
+    """No completion date was kept so far: the archiving delay starts now."""
+    Task = apps.get_model("tasks", "Task")
+    Task.objects.filter(complete=True).update(completed_at=django.utils.timezone.now())
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tasks", "0012_task_title_search"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedTask",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=200)),
+                ("created", models.DateTimeField()),
+                ("completed_at", models.DateTimeField()),
+                ("due_at", models.DateTimeField(blank=True, null=True)),
+                ("tags", models.JSONField(default=list)),
+                (
+                    "archived_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="completed_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(start_completion_clock, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("complete", True), ("deleted_at__isnull", True)),
+                fields=["completed_at"],
+                name="task_completed_archive",
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedtask",
+            name="owner",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedtask",
+            name="task_list",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="tasks.tasklist",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedtask",
+            index=models.Index(
+                fields=["owner", "-completed_at"], name="archivedtask_owner_done"
+            ),
+        ),
+    ]
@@ -1,11 +1,797 @@
-from django.db import models
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router, transaction
+from django.db.models import Case, Count, F, Value, When
+from django.db.models.functions import Coalesce, Collate
+from django.urls import reverse
+from django.utils import timezone
+
+from .signals import changes_recorded
+
+
+class OwnedQuerySet(models.QuerySet):
+    def for_user(self, user):
+        # Anonymous visitors share the unowned rows, everybody else only
+        # ever touches their own rows through the (owner, ...) index.
+        if user is not None and user.is_authenticated:
+            return self.filter(owner=user)
+        return self.filter(owner__isnull=True)
+
+
+class TaskListQuerySet(OwnedQuerySet):
+    def _release_tasks(self):
+        """Soft-delete the lists' tasks and detach them from the lists.
+
+        Left attached, ``Task.task_list``'s CASCADE would hard-delete them
+        with the lists: no change log entries, no purge grace period.
+        """
+        tasks = Task.all_objects.using(self.db).filter(task_list__in=self)
+        tasks.delete()
+        tasks.update(task_list=None)
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            self._release_tasks()
+            return super().delete()
+
+    delete.alters_data = True
+
+
+class TaskList(models.Model):
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="task_lists",
+        null=True,
+        blank=True,
+        # No database constraint: with sharding (todo.sharding) the row and
+        # its user may live in different databases.
+        db_constraint=False,
+    )
+    name = models.CharField(max_length=100)
+    # Denormalized counters, kept current by Task.save()/delete() so the
+    # overview never has to aggregate over the tasks table.
+    open_count = models.PositiveIntegerField(default=0, editable=False)
+    done_count = models.PositiveIntegerField(default=0, editable=False)
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = TaskListQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "name"], name="tasklist_owner_name"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def delete(self, using=None, keep_parents=False):
+        """Delete the list; its tasks are soft-deleted (see ``TaskListQuerySet``)."""
+        using = using or router.db_for_write(TaskList, instance=self)
+        with transaction.atomic(using=using):
+            TaskList.objects.using(using).filter(pk=self.pk)._release_tasks()
+            return super().delete(using, keep_parents)
+
+    delete.alters_data = True
+
+    def get_absolute_url(self):
+        return reverse("task_list", args=[self.pk])
+
+    @staticmethod
+    def adjust_counts(bucket, delta, using=None):
+        """Add ``delta`` to the counter of a ``(task_list_id, complete)`` bucket."""
+        if bucket is None or bucket[0] is None or not delta:
+            return
+        task_list_id, complete = bucket
+        field = "done_count" if complete else "open_count"
+        TaskList.objects.using(using).filter(pk=task_list_id).update(
+            **{field: F(field) + delta}
+        )
+
+
+class Tag(models.Model):
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="tags",
+        null=True,
+        blank=True,
+        db_constraint=False,  # see TaskList.owner
+        db_index=False,
+    )
+    name = models.CharField(max_length=50)
+
+    objects = OwnedQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "name"], name="tag_owner_name"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+# Fields copied into the change log for create/update entries.
+SYNCED_FIELDS = (
+    "id",
+    "owner_id",
+    "title",
+    "complete",
+    "task_list_id",
+    "version",
+    "due_at",
+)
+
+
+# Ranks are floats spaced RANK_STEP apart; a move takes the midpoint of its
+# new neighbours. After ~50 moves into the same gap the midpoint no longer
+# fits and the list is renumbered (see TaskQuerySet.rebalance_ranks).
+RANK_STEP = 1.0
+
+
+def rank_between(before, after):
+    """A rank strictly between two neighbours (``None`` is an open end)."""
+    if before is None and after is None:
+        return RANK_STEP
+    if before is None:
+        return after - RANK_STEP
+    if after is None:
+        return before + RANK_STEP
+    rank = (before + after) / 2
+    if not before < rank < after:
+        return None
+    return rank
+
+
+# Rows per statement of TaskQuerySet.update_versioned().
+VERSIONED_BATCH = 400
+
+
+class VersionConflict(Exception):
+    """A conditional write found the task(s) at another version (or gone)."""
+
+    def __init__(self, ids):
+        super().__init__(f"Task(s) changed concurrently: {sorted(ids)}")
+        self.ids = set(ids)
+
+
+class TaskQuerySet(OwnedQuerySet):
+    def _counted_buckets(self):
+        """``(task_list_id, complete, n)`` for the live, listed rows."""
+        return list(
+            self.filter(deleted_at__isnull=True, task_list__isnull=False)
+            .values_list("task_list", "complete")
+            .annotate(n=Count("pk"))
+            .order_by()
+        )
+
+    def _adjust_counts(self, before, after):
+        delta = Counter()
+        for task_list_id, complete, n in before:
+            delta[(task_list_id, complete)] -= n
+        for task_list_id, complete, n in after:
+            delta[(task_list_id, complete)] += n
+        for bucket, n in delta.items():
+            TaskList.adjust_counts(bucket, n, using=self.db)
+
+    def next_rank(self, owner_id, task_list_id):
+        """The rank that appends a task at the end of its list."""
+        last = (
+            Task.objects.using(self.db)
+            .filter(owner_id=owner_id, task_list_id=task_list_id)
+            .order_by("-rank", "-id")
+            .values_list("rank", flat=True)
+            .first()
+        )
+        return rank_between(last, None)
+
+    def rebalance_ranks(self, batch_size=500):
+        """Renumber the ranks ``RANK_STEP`` apart, in (rank, id) order.
+
+        Only rows whose rank changes are written, ``batch_size`` per UPDATE,
+        in one transaction so the order never shows half renumbered. Ranks
+        only order tasks, so this is not a user edit: no version bump, no
+        change-log entry. Returns the number of rows renumbered.
+        """
+        with transaction.atomic(using=self.db):
+            ordered = self.order_by("rank", "id").values_list("pk", "rank")
+            changes = [
+                (pk, n * RANK_STEP)
+                for n, (pk, rank) in enumerate(ordered, start=1)
+                if rank != n * RANK_STEP
+            ]
+            for start in range(0, len(changes), batch_size):
+                batch = changes[start : start + batch_size]
+                models.QuerySet.update(
+                    Task.all_objects.using(self.db).filter(
+                        pk__in=[pk for pk, _ in batch]
+                    ),
+                    rank=Case(*(When(pk=pk, then=Value(rank)) for pk, rank in batch)),
+                )
+        return len(changes)
+
+    rebalance_ranks.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Bulk INSERT that keeps list counters and the change log in step."""
+        with transaction.atomic(using=self.db):
+            next_ranks = {}
+            for obj in objs:
+                obj._stamp_completed()
+                if obj.rank is None:
+                    key = (obj.owner_id, obj.task_list_id)
+                    if key not in next_ranks:
+                        next_ranks[key] = self.next_rank(*key)
+                    obj.rank = next_ranks[key]
+                    next_ranks[key] += RANK_STEP
+            objs = super().bulk_create(objs, *args, **kwargs)
+            buckets = Counter(obj._bucket() for obj in objs)
+            for bucket, n in buckets.items():
+                TaskList.adjust_counts(bucket, n, using=self.db)
+            TaskChange.record(
+                TaskChange.CREATE,
+                [obj._sync_row() for obj in objs if obj.deleted_at is None],
+                using=self.db,
+            )
+        for obj in objs:
+            obj._counted = obj._bucket()
+        return objs
+
+    bulk_create.alters_data = True
+
+    def update(self, **kwargs):
+        """Bulk UPDATE that keeps list counters and the change log in step.
+
+        Every updated row also moves to its next ``version``.
+        """
+        kwargs.setdefault("version", F("version") + 1)
+        if isinstance(kwargs.get("complete"), bool):
+            # Rows that were already complete keep their completion time.
+            kwargs.setdefault(
+                "completed_at",
+                Coalesce(F("completed_at"), Value(timezone.now()))
+                if kwargs["complete"]
+                else None,
+            )
+        with transaction.atomic(using=self.db):
+            ids = list(self.values_list("pk", flat=True))
+            if not ids:
+                return 0
+            rows = Task.all_objects.using(self.db).filter(pk__in=ids)
+            before = rows._counted_buckets()
+            was_live = set(
+                rows.filter(deleted_at__isnull=True).values_list("pk", flat=True)
+            )
+            updated = super().update(**kwargs)
+            rows._adjust_counts(before, rows._counted_buckets())
+
+            changes = defaultdict(list)
+            for row in rows.values(*SYNCED_FIELDS, "deleted_at"):
+                if row["deleted_at"] is None:
+                    if row["id"] in was_live:
+                        changes[TaskChange.UPDATE].append(row)
+                    else:
+                        changes[TaskChange.CREATE].append(row)
+                elif row["id"] in was_live:
+                    changes[TaskChange.DELETE].append(row)
+            for action, changed in changes.items():
+                TaskChange.record(action, changed, using=self.db)
+        return updated
+
+    update.alters_data = True
+
+    def update_versioned(self, versions, **kwargs):
+        """Conditional bulk UPDATE: ``versions`` maps pk to expected version.
+
+        All or nothing; raises ``VersionConflict`` naming the stale rows.
+        Runs ``VERSIONED_BATCH`` rows per statement: each row adds a term to
+        the WHERE clause, and SQLite caps the depth of an expression.
+        """
+        pks = list(versions)
+        stale = set()
+        updated = 0
+        with transaction.atomic(using=self.db):
+            for start in range(0, len(pks), VERSIONED_BATCH):
+                batch = pks[start : start + VERSIONED_BATCH]
+                expected = models.Q(pk__in=[])
+                for pk in batch:
+                    expected |= models.Q(pk=pk, version=versions[pk])
+                matching = self.filter(expected)
+                stale |= set(batch) - set(matching.values_list("pk", flat=True))
+                if not stale:
+                    updated += matching.update(**kwargs)
+            if stale:
+                raise VersionConflict(stale)
+            if updated != len(versions):
+                # Lost a race after the check: roll the whole batch back.
+                raise VersionConflict(versions)
+        return updated
+
+    update_versioned.alters_data = True
+
+    def delete(self):
+        """Soft delete: a single UPDATE stamping ``deleted_at``."""
+        deleted = self.filter(deleted_at__isnull=True).update(deleted_at=timezone.now())
+        return deleted, {Task._meta.label: deleted}
+
+    delete.alters_data = True
+
+    def hard_delete(self):
+        """Really remove the rows (used by the purge)."""
+        with transaction.atomic(using=self.db):
+            buckets = self._counted_buckets()
+            live = list(self.filter(deleted_at__isnull=True).values(*SYNCED_FIELDS))
+            deleted = super().delete()
+            self._adjust_counts(buckets, [])
+            TaskChange.record(TaskChange.DELETE, live, using=self.db)
+        return deleted
+
+    hard_delete.alters_data = True
+
+
+class TaskManager(models.Manager.from_queryset(TaskQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
 
 
 # Create your models here.
 class Task(models.Model):
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="tasks",
+        null=True,
+        blank=True,
+        db_constraint=False,  # see TaskList.owner
+    )
+    task_list = models.ForeignKey(
+        TaskList,
+        on_delete=models.CASCADE,
+        related_name="tasks",
+        null=True,
+        blank=True,
+    )
     title = models.CharField(max_length=200)
     complete = models.BooleanField(default=False)
     created = models.DateTimeField(auto_now_add=True)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Optimistic concurrency: bumped by every write, checked by every update.
+    version = models.PositiveIntegerField(default=1, editable=False)
+    due_at = models.DateTimeField(null=True, blank=True)
+    # Set once the reminder for due_at went out (tasks.reminders).
+    reminded_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Manual order within a list; new tasks go last (see rank_between).
+    rank = models.FloatField(editable=False)
+    # When complete was last set; old completed tasks get archived.
+    completed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    tags = models.ManyToManyField(
+        Tag, through="TaskTag", related_name="tasks", blank=True
+    )
+
+    # Soft-deleted rows are invisible everywhere except through all_objects.
+    objects = TaskManager()
+    all_objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["owner", "complete", "created"],
+                name="task_owner_complete_created",
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            models.Index(
+                fields=["deleted_at"],
+                name="task_deleted_at_purge",
+                condition=models.Q(deleted_at__isnull=False),
+            ),
+            # The list page: one list of one owner, in manual order.
+            models.Index(
+                fields=["owner", "task_list", "rank", "id"],
+                name="task_owner_list_rank",
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            # Case-insensitive prefix search (admin "^title").
+            models.Index(
+                Collate("title", "NOCASE"),
+                name="task_title_nocase",
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            # Only the reminders still to send: the scheduler's range scans
+            # never touch done, deleted or already reminded tasks.
+            models.Index(
+                fields=["due_at"],
+                name="task_due_reminder",
+                condition=models.Q(
+                    due_at__isnull=False,
+                    reminded_at__isnull=True,
+                    complete=False,
+                    deleted_at__isnull=True,
+                ),
+            ),
+            # The archiver's range scan over the completed tasks.
+            models.Index(
+                fields=["completed_at"],
+                name="task_completed_archive",
+                condition=models.Q(complete=True, deleted_at__isnull=True),
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {"task_list_id", "complete", "deleted_at"} <= set(field_names):
+            instance._counted = instance._bucket()
+        return instance
+
+    def _bucket(self):
+        """The ``(task_list_id, complete)`` counter this row belongs in."""
+        if self.deleted_at is not None:
+            return None
+        return (self.task_list_id, self.complete)
+
+    def _counted_bucket(self, using):
+        """The bucket this row is currently counted in, per the database."""
+        if self._state.adding:
+            return None
+        if hasattr(self, "_counted"):
+            return self._counted
+        row = (
+            Task.all_objects.using(using)
+            .filter(pk=self.pk)
+            .values_list("task_list_id", "complete", "deleted_at")
+            .first()
+        )
+        if row is None or row[2] is not None:
+            return None
+        return row[:2]
+
+    def _stamp_completed(self):
+        if not self.complete:
+            self.completed_at = None
+        elif self.completed_at is None:
+            self.completed_at = timezone.now()
+
+    def _sync_row(self):
+        return {field: getattr(self, field) for field in SYNCED_FIELDS}
+
+    def _do_update(self, base_qs, using, pk_val, values, *args, **kwargs):
+        # UPDATE ... WHERE id = %s AND version = %s
+        expected = getattr(self, "_expected_version", None)
+        if expected is None:
+            return super()._do_update(base_qs, using, pk_val, values, *args, **kwargs)
+        base_qs = base_qs.filter(version=expected)
+        if not super()._do_update(base_qs, using, pk_val, values, *args, **kwargs):
+            raise VersionConflict([pk_val])
+        return True
+
+    def save(self, *args, **kwargs):
+        """Save; updating a row checks it is still at ``self.version``."""
+        using = kwargs.get("using") or router.db_for_write(Task, instance=self)
+        versioned = not self._state.adding
+        if versioned:
+            self._expected_version = self.version
+            self.version += 1
+        self._stamp_completed()
+        try:
+            with transaction.atomic(using=using):
+                if self.rank is None:
+                    self.rank = Task.objects.using(using).next_rank(
+                        self.owner_id, self.task_list_id
+                    )
+                before = self._counted_bucket(using)
+                super().save(*args, **kwargs)
+                after = self._bucket()
+                if before != after:
+                    TaskList.adjust_counts(before, -1, using=using)
+                    TaskList.adjust_counts(after, 1, using=using)
+                if after is not None:
+                    action = TaskChange.CREATE if before is None else TaskChange.UPDATE
+                    TaskChange.record(action, [self._sync_row()], using=using)
+                elif before is not None:
+                    TaskChange.record(
+                        TaskChange.DELETE, [self._sync_row()], using=using
+                    )
+        except Exception:
+            if versioned:
+                self.version = self._expected_version
+            raise
+        finally:
+            self._expected_version = None
+        self._counted = after
+
+    def delete(self, using=None, keep_parents=False):
+        """Soft delete: stamp ``deleted_at`` on this single row.
+
+        Like ``save()``, it only applies to the version that was loaded.
+        """
+        using = using or router.db_for_write(Task, instance=self)
+        deleted_at = timezone.now()
+        with transaction.atomic(using=using):
+            bucket = self._counted_bucket(using)
+            # Plain QuerySet.update: the bookkeeping is done right here,
+            # without the extra reads of the bulk path.
+            live = Task.all_objects.using(using).filter(
+                pk=self.pk, deleted_at__isnull=True
+            )
+            deleted = models.QuerySet.update(
+                live.filter(version=self.version),
+                deleted_at=deleted_at,
+                version=F("version") + 1,
+            )
+            if not deleted and live.exists():
+                raise VersionConflict([self.pk])
+            if deleted:
+                self.deleted_at = deleted_at
+                self.version += 1
+                TaskList.adjust_counts(bucket, -1, using=using)
+                TaskChange.record(TaskChange.DELETE, [self._sync_row()], using=using)
+        self._counted = None
+        return deleted, {Task._meta.label: deleted}
+
+    delete.alters_data = True
+
+
+class TaskTag(models.Model):
+    # The composite indexes below replace the single-column FK indexes:
+    # (task, tag) serves prefetching a page's tags, (tag, task) tag filters.
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, db_index=False)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["task", "tag"], name="tasktag_task_tag"),
+        ]
+        indexes = [
+            models.Index(fields=["tag", "task"], name="tasktag_tag_task"),
+        ]
+
+    def __str__(self):
+        return f"{self.task_id} #{self.tag_id}"
+
+
+class ArchivedTask(models.Model):
+    """A completed task moved out of the tasks table by ``tasks.archive``.
+
+    Keeps the task's id, so a restored task comes back under the same id.
+    Read-only apart from ``restore()``.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+        null=True,
+        blank=True,
+        db_constraint=False,  # see TaskList.owner
+        db_index=False,
+    )
+    task_list = models.ForeignKey(
+        TaskList,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+        db_index=False,
+    )
+    title = models.CharField(max_length=200)
+    created = models.DateTimeField()
+    completed_at = models.DateTimeField()
+    due_at = models.DateTimeField(null=True, blank=True)
+    # Tag names: the tags themselves may be renamed or deleted meanwhile.
+    tags = models.JSONField(default=list)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    objects = OwnedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["owner", "-completed_at"], name="archivedtask_owner_done"
+            ),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @classmethod
+    def from_task(cls, task):
+        return cls(
+            id=task.pk,
+            owner_id=task.owner_id,
+            task_list_id=task.task_list_id,
+            title=task.title,
+            created=task.created,
+            completed_at=task.completed_at or timezone.now(),
+            due_at=task.due_at,
+            tags=sorted(tag.name for tag in task.tags.all()),
+        )
+
+    def restore(self):
+        """Move back to the tasks table, last in its list; returns the task.
+
+        It counts as completed now, or the next archiving pass would take
+        it away again.
+        """
+        using = router.db_for_write(Task, instance=self)
+        with transaction.atomic(using=using):
+            task = Task(
+                id=self.pk,
+                owner_id=self.owner_id,
+                task_list_id=self.task_list_id,
+                title=self.title,
+                complete=True,
+                due_at=self.due_at,
+            )
+            task.save(using=using, force_insert=True)
+            # auto_now_add stamped the restore time; keep the original.
+            models.QuerySet.update(
+                Task.objects.using(using).filter(pk=task.pk), created=self.created
+            )
+            task.created = self.created
+            task.tags.set(
+                Tag.objects.using(using).get_or_create(
+                    owner_id=self.owner_id, name=name
+                )[0]
+                for name in self.tags
+            )
+            self.delete(using=using)
+        return task
+
+    restore.alters_data = True
+
+
+class ShardPlacement(models.Model):
+    """The shard holding an owner's tasks (``todo.sharding``); on default."""
+
+    owner = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="+",
+    )
+    alias = models.CharField(max_length=100)
+    moved_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.owner_id} -> {self.alias}"
+
+
+class TaskChange(models.Model):
+    """Append-only log of task mutations; ``id`` is the sync cursor.
+
+    SQLite AUTOINCREMENT keys never go backwards and writes are serialized,
+    so a client that has seen cursor ``n`` only needs ``id > n``.
+    """
+
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+    ACTION_CHOICES = [(CREATE, "Create"), (UPDATE, "Update"), (DELETE, "Delete")]
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+        null=True,
+        blank=True,
+        db_constraint=False,  # see TaskList.owner
+        db_index=False,
+    )
+    # Not a foreign key: entries outlive the (purged) task rows.
+    task_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    at = models.DateTimeField(default=timezone.now)
+
+    objects = OwnedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "id"], name="taskchange_owner_cursor"),
+            models.Index(fields=["at"], name="taskchange_at"),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.action} task {self.task_id}"
+
+    @classmethod
+    def record(cls, action, rows, using=None):
+        """Append one entry per row (dicts holding ``SYNCED_FIELDS``)."""
+        entries = [
+            cls(
+                owner_id=row["owner_id"],
+                task_id=row["id"],
+                action=action,
+                data={}
+                if action == cls.DELETE
+                else {
+                    "title": row["title"],
+                    "complete": row["complete"],
+                    "task_list": row["task_list_id"],
+                    "version": row["version"],
+                    "due_at": row["due_at"],
+                },
+            )
+            for row in rows
+        ]
+        if entries:
+            cls.objects.using(using).bulk_create(entries)
+            changes_recorded.send(sender=cls, using=using)
+
+    @classmethod
+    def latest_cursor(cls, using=None):
+        changes = cls.objects.using(using).order_by("-pk")
+        return changes.values_list("pk", flat=True).first()
+
+    def as_json(self):
+        return {
+            "cursor": self.pk,
+            "task": self.task_id,
+            "action": self.action,
+            "data": self.data,
+            "at": self.at.isoformat(),
+        }
+
+
+class Job(models.Model):
+    """A unit of background work run by ``manage.py run_jobs`` (tasks.jobs)."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+        null=True,
+        blank=True,
+    )
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # worker alive
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OwnedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="job_status_run_after"),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} ({self.status})"
+
+    def as_json(self):
+        return {
+            "id": self.pk,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "result": self.result,
+            "error": self.error.strip().splitlines()[-1] if self.error else None,
+            "created": self.created.isoformat(),
+            "finished": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,181 @@
+"""Due-date reminders, sent by ``manage.py send_reminders``.
+
+The scheduler never scans the tasks table: every ``TASKS_REMINDER_RESCAN``
+seconds it range-scans the partial ``task_due_reminder`` index (pending
+reminders only) for tasks due within ``TASKS_REMINDER_LOOKAHEAD``, keeps them
+in a heap and sleeps until the earliest one. Its cost follows the number of
+reminders coming up, not the number of tasks.
+
+Delivery goes through ``TASKS_REMINDER_BACKEND``, built with the keyword
+arguments in ``TASKS_REMINDER_OPTIONS``. Reminders are claimed before the
+send, so two schedulers never both send one; a failed send gives them back
+for the next scan.
+"""
+
+import heapq
+import json
+import logging
+import sys
+import time
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from todo.sharding import aliases
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+class BaseBackend:
+    def send(self, tasks):
+        """Deliver one reminder per task."""
+        raise NotImplementedError
+
+
+class ConsoleBackend(BaseBackend):
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, tasks):
+        for task in tasks:
+            self.stream.write(f"Reminder: {task.title!r} is due {task.due_at:%c}\n")
+        self.stream.flush()
+
+
+class FileBackend(BaseBackend):
+    """Append reminders to ``path``, one JSON object per line."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, tasks):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for task in tasks:
+                entry = {
+                    "task": task.pk,
+                    "owner": task.owner_id,
+                    "title": task.title,
+                    "due_at": task.due_at.isoformat(),
+                }
+                f.write(json.dumps(entry) + "\n")
+
+
+class MemoryBackend(BaseBackend):
+    """Keep sent reminders in ``MemoryBackend.outbox`` (for tests)."""
+
+    outbox = []
+
+    def send(self, tasks):
+        self.outbox.extend(tasks)
+
+
+def get_backend():
+    backend = import_string(settings.TASKS_REMINDER_BACKEND)
+    return backend(**settings.TASKS_REMINDER_OPTIONS)
+
+
+def pending():
+    # Matches the condition of the task_due_reminder partial index.
+    return Task.objects.filter(
+        due_at__isnull=False, reminded_at__isnull=True, complete=False
+    )
+
+
+class ReminderScheduler:
+    def __init__(self, backend=None, lookahead=None, rescan=None, batch_size=None):
+        self.backend = backend or get_backend()
+        self.lookahead = timedelta(
+            seconds=lookahead or settings.TASKS_REMINDER_LOOKAHEAD
+        )
+        self.rescan = timedelta(seconds=rescan or settings.TASKS_REMINDER_RESCAN)
+        self.batch_size = batch_size or settings.TASKS_REMINDER_BATCH_SIZE
+        self.heap = []
+        self.next_scan = None
+
+    def scan(self, now):
+        """Reload the heap with the reminders due before ``now + lookahead``.
+
+        Entries are ``(due_at, pk, shard)``, merged across the shards.
+        """
+        soon = (
+            pending()
+            .filter(due_at__lte=now + self.lookahead)
+            .order_by("due_at")
+            .values_list("due_at", "pk")
+        )
+        per_shard = [
+            [(due_at, pk, alias) for due_at, pk in soon.using(alias)[: self.batch_size]]
+            for alias in aliases()
+        ]
+        rows = list(
+            islice(heapq.merge(*per_shard, key=lambda row: row[0]), self.batch_size)
+        )
+        self.heap = rows  # sorted, hence already a heap
+        self.next_scan = now + self.rescan
+        if len(rows) == self.batch_size:
+            # More are waiting behind this batch: look again once it is sent.
+            self.next_scan = min(self.next_scan, rows[-1][0])
+
+    def send_due(self, now):
+        """Send the reminders due by ``now``; returns how many were sent."""
+        due = defaultdict(list)
+        while self.heap and self.heap[0][0] <= now:
+            _, pk, alias = heapq.heappop(self.heap)
+            due[alias].append(pk)
+        if not due:
+            return 0
+        claimed = []
+        for alias, pks in due.items():
+            ready = pending().using(alias).filter(pk__in=pks, due_at__lte=now)
+            for task in ready.order_by("due_at"):
+                # Conditional update: another scheduler may have sent it
+                # already. A plain UPDATE, the marker is not a user edit.
+                marked = models.QuerySet.update(
+                    Task.objects.using(alias).filter(
+                        pk=task.pk, reminded_at__isnull=True
+                    ),
+                    reminded_at=now,
+                )
+                if marked:
+                    claimed.append(task)
+        if not claimed:
+            return 0
+        try:
+            self.backend.send(claimed)
+        except Exception:
+            # Unclaim them: the next scan picks them up again.
+            logger.exception("Sending %s reminder(s) failed", len(claimed))
+            for task in claimed:
+                models.QuerySet.update(
+                    Task.objects.using(task._state.db).filter(
+                        pk=task.pk, reminded_at=now
+                    ),
+                    reminded_at=None,
+                )
+            self.next_scan = now + self.rescan
+            return 0
+        return len(claimed)
+
+    def run_once(self, now=None):
+        now = now or timezone.now()
+        if self.next_scan is None or now >= self.next_scan:
+            self.scan(now)
+        return self.send_due(now)
+
+    def next_wakeup(self):
+        if self.heap:
+            return min(self.heap[0][0], self.next_scan)
+        return self.next_scan
+
+    def run_forever(self):
+        while True:
+            self.run_once()
+            delay = (self.next_wakeup() - timezone.now()).total_seconds()
+            time.sleep(max(delay, 0))
@@ -0,0 +1,4 @@
+from django.dispatch import Signal
+
+# Sent after TaskChange entries were appended (still inside the transaction).
+changes_recorded = Signal()
@@ -1,65 +1,117 @@
-from django.test import TestCase
-from django.urls import reverse
+import asyncio
+import gzip
+import http.client
+import json
+import math
+import os
+import pstats
+import re
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from importlib.util import find_spec
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-from tasks.models import Task
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection, models, router
+from django.http import HttpResponse
+from django.template import engines
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from tasks.coalesce import CreateCoalescer
+from tasks.events import event_stream, feed
+from tasks.jobs import Worker, enqueue, registry
+from tasks.models import (
+    ArchivedTask,
+    Job,
+    ShardPlacement,
+    Tag,
+    Task,
+    TaskChange,
+    TaskList,
+    TaskTag,
+    VersionConflict,
+)
+from tasks.reminders import MemoryBackend, ReminderScheduler, pending
+from tasks.rows import TaskRow
+from todo import profiling, slowlog, sqlite_backup
+from todo.routers import PIN_COOKIE, ReplicaRoutingMiddleware
+from todo.sharding import SHARD_ID_SPAN, seed_id_ranges
+from todo.throttle import SharedStore
+from todo.warmup import warm_up
 
 
 def tc(test_id):
     """Décorateur pour ajouter un ID de test"""
+
     def decorator(test_func):
         test_func.test_number = test_id
         return test_func
+
     return decorator
 
-class TaskURLTests(TestCase):
 
+class TaskURLTests(TestCase):
     def setUp(self):
         """Configuration initiale pour tous les tests"""
-        self.task = Task.objects.create(
-            title="Test task",
-            complete=False
-        )
+        self.task = Task.objects.create(title="Test task", complete=False)
 
     @tc("TC001")
     def test_home_page_url(self):
         """Test que la page d'accueil fonctionne"""
-        response = self.client.get('/')
+        response = self.client.get("/")
         self.assertEqual(response.status_code, 200)
 
     @tc("TC002")
     def test_update_task_url(self):
         """Test que l'URL de mise à jour fonctionne"""
-        url = reverse('update_task', args=[str(self.task.id)])
+        url = reverse("update_task", args=[str(self.task.id)])
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
 
     @tc("TC003")
     def test_delete_task_url(self):
         """Test que l'URL de suppression fonctionne"""
-        url = reverse('delete', args=[str(self.task.id)])
+        url = reverse("delete", args=[str(self.task.id)])
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
 
     @tc("TC004")
     def test_update_task_post(self):
         """Test la mise à jour via POST"""
-        url = reverse('update_task', args=[str(self.task.id)])
-        response = self.client.post(url, {
-            'title': 'Updated task',
-            'complete': True
-        })
+        url = reverse("update_task", args=[str(self.task.id)])
+        response = self.client.post(url, {"title": "Updated task", "complete": True})
         # Vérifie la redirection après mise à jour (302 = redirect)
         self.assertEqual(response.status_code, 302)
 
         # Vérifie que la tâche a été mise à jour
         updated_task = Task.objects.get(id=self.task.id)
-        self.assertEqual(updated_task.title, 'Updated task')
+        self.assertEqual(updated_task.title, "Updated task")
         self.assertEqual(updated_task.complete, True)
 
     @tc("TC005")
     def test_delete_task_post(self):
         """Test la suppression via POST"""
-        url = reverse('delete', args=[str(self.task.id)])
+        url = reverse("delete", args=[str(self.task.id)])
         response = self.client.post(url)
         # Vérifie la redirection après suppression
         self.assertEqual(response.status_code, 302)
@@ -70,10 +122,7 @@ class TaskURLTests(TestCase):
     def test_create_task_post(self):
         """Test la création d'une tâche via POST"""
         initial_count = Task.objects.count()
-        response = self.client.post('/', {
-            'title': 'New task',
-            'complete': False
-        })
+        response = self.client.post("/", {"title": "New task", "complete": False})
         # Vérifie la redirection après création
         self.assertEqual(response.status_code, 302)
         # Vérifie qu'une nouvelle tâche a été créée
@@ -81,14 +130,10 @@ class TaskURLTests(TestCase):
 
 
 class TaskModelTests(TestCase):
-
     @tc("TC007")
     def test_task_creation(self):
         """Test la création d'un modèle Task"""
-        task = Task.objects.create(
-            title="Test task",
-            complete=False
-        )
+        task = Task.objects.create(title="Test task", complete=False)
         self.assertEqual(task.title, "Test task")
         self.assertEqual(task.complete, False)
         self.assertIsNotNone(task.created)
@@ -98,3 +143,1410 @@ class TaskModelTests(TestCase):
         """Test la représentation en string du modèle"""
         task = Task.objects.create(title="Test task")
         self.assertEqual(str(task), "Test task")
+
+
+class TaskOwnershipTests(TestCase):
+    def setUp(self):
+        """Deux utilisateurs avec chacun une tâche"""
+        self.alice = User.objects.create_user("alice", password="secret-pass")
+        self.bob = User.objects.create_user("bob", password="secret-pass")
+        self.alice_task = Task.objects.create(title="Tâche Alice", owner=self.alice)
+        self.bob_task = Task.objects.create(title="Tâche Bob", owner=self.bob)
+
+    @tc("TC019")
+    def test_list_only_shows_own_tasks(self):
+        """Test que la liste ne montre que les tâches de l'utilisateur"""
+        self.client.force_login(self.alice)
+        response = self.client.get("/")
+        self.assertEqual(
+            [task.id for task in response.context["tasks"]], [self.alice_task.id]
+        )
+
+    @tc("TC020")
+    def test_create_assigns_owner(self):
+        """Test que la création associe la tâche à l'utilisateur connecté"""
+        self.client.force_login(self.bob)
+        self.client.post("/", {"title": "Nouvelle tâche Bob"})
+        task = Task.objects.get(title="Nouvelle tâche Bob")
+        self.assertEqual(task.owner, self.bob)
+
+    @tc("TC021")
+    def test_cannot_touch_other_users_task(self):
+        """Test qu'un utilisateur ne peut pas modifier la tâche d'un autre"""
+        self.client.force_login(self.alice)
+        update_url = reverse("update_task", args=[str(self.bob_task.id)])
+        delete_url = reverse("delete", args=[str(self.bob_task.id)])
+        self.assertEqual(self.client.post(update_url, {"title": "x"}).status_code, 404)
+        self.assertEqual(self.client.post(delete_url).status_code, 404)
+        self.assertTrue(Task.objects.filter(id=self.bob_task.id).exists())
+
+
+class TaskListTests(TestCase):
+    def setUp(self):
+        """Une liste nommée vide"""
+        self.task_list = TaskList.objects.create(name="Courses")
+
+    def assertCounts(self, open_count, done_count):
+        self.task_list.refresh_from_db()
+        self.assertEqual(
+            (self.task_list.open_count, self.task_list.done_count),
+            (open_count, done_count),
+        )
+
+    @tc("TC022")
+    def test_create_in_list_updates_counts(self):
+        """Test que la création dans une liste met à jour ses compteurs"""
+        url = reverse("task_list", args=[self.task_list.id])
+        response = self.client.post(url, {"title": "Lait"})
+        self.assertRedirects(response, url)
+        task = Task.objects.get(title="Lait")
+        self.assertEqual(task.task_list, self.task_list)
+        self.assertCounts(1, 0)
+
+    @tc("TC023")
+    def test_complete_and_delete_move_counts(self):
+        """Test que terminer puis supprimer une tâche ajuste les compteurs"""
+        task = Task.objects.create(title="Pain", task_list=self.task_list)
+        Task.objects.create(title="Oeufs", task_list=self.task_list)
+        self.assertCounts(2, 0)
+
+        url = reverse("update_task", args=[str(task.id)])
+        self.client.post(url, {"title": "Pain", "complete": True})
+        self.assertCounts(1, 1)
+
+        self.client.post(reverse("delete", args=[str(task.id)]))
+        self.assertCounts(1, 0)
+
+        Task.objects.filter(task_list=self.task_list).delete()
+        self.assertCounts(0, 0)
+
+    @tc("TC024")
+    def test_overview_reads_denormalized_counts(self):
+        """Test que la page des listes n'agrège pas la table des tâches"""
+        Task.objects.create(title="Pain", task_list=self.task_list, complete=True)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("lists"))
+            self.assertContains(response, "✅ 1")
+
+
+class SoftDeleteTests(TestCase):
+    def setUp(self):
+        """Une liste contenant une tâche"""
+        self.task_list = TaskList.objects.create(name="Travail")
+        self.task = Task.objects.create(title="Rapport", task_list=self.task_list)
+
+    @tc("TC025")
+    def test_delete_is_soft(self):
+        """Test que la suppression marque la tâche sans effacer la ligne"""
+        self.client.post(reverse("delete", args=[str(self.task.id)]))
+        self.assertFalse(Task.objects.filter(id=self.task.id).exists())
+        deleted = Task.all_objects.get(id=self.task.id)
+        self.assertIsNotNone(deleted.deleted_at)
+        self.task_list.refresh_from_db()
+        self.assertEqual(self.task_list.open_count, 0)
+        # Une tâche supprimée n'est plus accessible
+        url = reverse("update_task", args=[str(self.task.id)])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    @tc("TC026")
+    def test_purge_removes_only_expired_deletions(self):
+        """Test que la purge efface par lots les suppressions anciennes"""
+        old = [Task.objects.create(title=f"Ancienne {i}") for i in range(5)]
+        Task.objects.filter(id__in=[t.id for t in old]).delete()
+        Task.all_objects.filter(id__in=[t.id for t in old]).update(
+            deleted_at=timezone.now() - timedelta(days=30)
+        )
+        self.task.delete()
+
+        out = StringIO()
+        call_command("purge_deleted_tasks", batch_size=2, pause=0, stdout=out)
+
+        self.assertIn("Purged 5", out.getvalue())
+        self.assertEqual(list(Task.all_objects.all()), [self.task])
+        self.task_list.refresh_from_db()
+        self.assertEqual(self.task_list.open_count, 0)
+
+
+class ChangeLogTests(TestCase):
+    def actions(self, since=0):
+        response = self.client.get(reverse("changes"), {"since": since})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data["cursor"], [(c["action"], c["task"]) for c in data["changes"]]
+
+    @tc("TC027")
+    def test_views_append_to_change_log(self):
+        """Test que création, modification et suppression alimentent le journal"""
+        self.client.post("/", {"title": "Journalisée"})
+        task = Task.objects.get(title="Journalisée")
+        cursor, _ = self.actions()
+
+        self.client.post(
+            reverse("update_task", args=[str(task.id)]),
+            {"title": "Journalisée", "complete": True},
+        )
+        self.client.post(reverse("delete", args=[str(task.id)]))
+
+        new_cursor, changes = self.actions(since=cursor)
+        self.assertEqual(changes, [("update", task.id), ("delete", task.id)])
+        self.assertEqual(self.actions(since=new_cursor)[1], [])
+
+    @tc("TC028")
+    def test_bulk_update_is_logged_and_counted(self):
+        """Test que les mises à jour en masse sont journalisées et comptées"""
+        task_list = TaskList.objects.create(name="Lot")
+        for i in range(3):
+            Task.objects.create(title=f"Lot {i}", task_list=task_list)
+        cursor = TaskChange.objects.latest("pk").pk
+
+        Task.objects.filter(task_list=task_list).update(complete=True)
+
+        task_list.refresh_from_db()
+        self.assertEqual((task_list.open_count, task_list.done_count), (0, 3))
+        _, changes = self.actions(since=cursor)
+        self.assertEqual([action for action, _ in changes], ["update"] * 3)
+
+    @tc("TC029")
+    def test_compacted_cursor_is_rejected(self):
+        """Test qu'un curseur antérieur à la compaction renvoie 410"""
+        for i in range(3):
+            Task.objects.create(title=f"Ancienne {i}")
+        TaskChange.objects.update(at=timezone.now() - timedelta(days=60))
+        call_command("compact_task_changes", stdout=StringIO())
+
+        self.assertEqual(TaskChange.objects.count(), 1)
+        response = self.client.get(reverse("changes"), {"since": 0})
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.json()["cursor"], TaskChange.objects.get().pk)
+
+    @tc("TC072")
+    def test_deleting_list_soft_deletes_its_tasks(self):
+        """Test que supprimer une liste (admin) supprime ses tâches en douceur"""
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        lists = [TaskList.objects.create(name=f"Liste {i}") for i in range(3)]
+        tasks = [
+            Task.objects.create(title=f"Tâche {i}", task_list=task_list)
+            for i, task_list in enumerate(lists)
+        ]
+        cursor = TaskChange.objects.latest("pk").pk
+
+        self.client.post(
+            reverse("admin:tasks_tasklist_delete", args=[lists[0].pk]), {"post": "yes"}
+        )
+        TaskList.objects.filter(pk__in=[lists[1].pk, lists[2].pk]).delete()
+
+        self.assertFalse(TaskList.objects.exists())
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(Task.all_objects.filter(task_list=None).count(), 3)
+        self.client.logout()  # tâches sans propriétaire
+        _, changes = self.actions(since=cursor)
+        self.assertEqual(sorted(changes), sorted(("delete", task.id) for task in tasks))
+
+
+class TaskEventsTests(TestCase):
+    async def next_event(self, stream):
+        chunk = await asyncio.wait_for(stream.__anext__(), timeout=5)
+        return chunk
+
+    @tc("TC030")
+    async def test_stream_replays_then_pushes_changes(self):
+        """Test que le flux SSE rejoue depuis le curseur puis pousse les nouveautés"""
+        response = await self.async_client.get(reverse("events"), {"since": 0})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        first = await sync_to_async(Task.objects.create)(title="Avant connexion")
+        stream = event_stream(owner_id=None, since=0)
+        try:
+            self.assertTrue((await self.next_event(stream)).startswith("retry:"))
+            replayed = await self.next_event(stream)
+            self.assertIn("event: create", replayed)
+            self.assertIn(f'"task": {first.id}', replayed)
+
+            with mock.patch.object(feed, "poll_interval", 0.05):
+                second = await sync_to_async(Task.objects.create)(title="En direct")
+                pushed = await self.next_event(stream)
+            payload = json.loads(pushed.split("data: ", 1)[1])
+            self.assertEqual(payload["action"], "create")
+            self.assertEqual(payload["task"], second.id)
+        finally:
+            await stream.aclose()
+        self.assertEqual(feed.subscribers, {})
+
+    @tc("TC031")
+    def test_stream_is_refused_under_wsgi(self):
+        """Test que le flux SSE répond 204 hors ASGI"""
+        response = self.client.get(reverse("events"))
+        self.assertEqual(response.status_code, 204)
+
+
+class OptimisticConcurrencyTests(TestCase):
+    def setUp(self):
+        """Une tâche déjà modifiée une fois (version 2)"""
+        self.task = Task.objects.create(title="Partagée")
+        self.task.title = "Partagée v2"
+        self.task.save()
+        self.url = reverse("update_task", args=[str(self.task.id)])
+
+    @tc("TC032")
+    def test_stale_update_returns_409(self):
+        """Test qu'une modification basée sur une version périmée renvoie 409"""
+        self.assertEqual(self.task.version, 2)
+        response = self.client.post(self.url, {"title": "Écrasement", "version": 1})
+        self.assertEqual(response.status_code, 409)
+        self.assertContains(response, "modifiée entre-temps", status_code=409)
+        self.assertEqual(Task.objects.get(id=self.task.id).title, "Partagée v2")
+
+        response = self.client.post(self.url, {"title": "À jour", "version": 2})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Task.objects.get(id=self.task.id).version, 3)
+
+        # Une création ignore la version envoyée et refuse une version invalide
+        self.client.post(reverse("list"), {"title": "Neuve", "version": 7})
+        self.assertEqual(Task.objects.get(title="Neuve").version, 1)
+        response = self.client.post(
+            reverse("list"), {"title": "Invalide", "version": -1}, HTTP_X_FRAGMENT="row"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @tc("TC076")
+    def test_invalid_update_keeps_posted_version(self):
+        """Test qu'un formulaire invalide réaffiché garde la version envoyée"""
+        response = self.client.post(self.url, {"title": "", "version": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'name="version" value="1"')
+
+        # Renvoyer le formulaire corrigé détecte toujours le conflit
+        response = self.client.post(self.url, {"title": "Corrigée", "version": 1})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Task.objects.get(id=self.task.id).title, "Partagée v2")
+
+    @tc("TC033")
+    def test_stale_update_json_conflict(self):
+        """Test que le conflit est renvoyé en JSON avec l'état courant"""
+        response = self.client.post(
+            self.url,
+            {"title": "Écrasement", "version": 1},
+            HTTP_ACCEPT="application/json",
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["task"]["version"], 2)
+
+    @tc("TC034")
+    def test_stale_delete_and_bulk_update_are_rejected(self):
+        """Test que suppression et mise à jour en masse vérifient la version"""
+        url = reverse("delete", args=[str(self.task.id)])
+        self.assertEqual(self.client.post(url, {"version": 1}).status_code, 409)
+        self.assertTrue(Task.objects.filter(id=self.task.id).exists())
+
+        other = Task.objects.create(title="Autre")
+        with self.assertRaises(VersionConflict) as raised:
+            Task.objects.all().update_versioned(
+                {self.task.id: 1, other.id: 1}, complete=True
+            )
+        self.assertEqual(raised.exception.ids, {self.task.id})
+        self.assertFalse(Task.objects.filter(complete=True).exists())
+
+        Task.objects.all().update_versioned({self.task.id: 2}, complete=True)
+        self.assertEqual(Task.objects.get(id=self.task.id).version, 3)
+
+        # Par lots : un conflit dans le second annule aussi le premier
+        with mock.patch("tasks.models.VERSIONED_BATCH", 1):
+            with self.assertRaises(VersionConflict):
+                Task.objects.all().update_versioned(
+                    {other.id: 1, self.task.id: 2}, title="Lot"
+                )
+        self.assertFalse(Task.objects.filter(title="Lot").exists())
+
+
+class ReplicaRoutingTests(TestCase):
+    def read_alias(self, method, path, cookies=None, lag=0.5):
+        """Alias choisi pour lire les tâches pendant la requête"""
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(path)
+        seen = {}
+
+        def view(request):
+            seen["alias"] = router.db_for_read(Task)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        with mock.patch("todo.routers.replica_lag", return_value=lag):
+            middleware.process_view(request, view, (), {})
+            response = middleware(request)
+        self.assertEqual(router.db_for_read(Task), "default")
+        return seen["alias"], response
+
+    @tc("TC035")
+    def test_read_only_views_use_fresh_replica(self):
+        """Test que les pages en lecture seule lisent le réplica s'il est à jour"""
+        self.assertEqual(self.read_alias("get", "/")[0], "replica")
+        self.assertEqual(self.read_alias("get", "/", lag=60)[0], "default")
+        self.assertEqual(self.read_alias("get", reverse("changes"))[0], "default")
+
+    @tc("TC036")
+    def test_writes_pin_client_to_primary(self):
+        """Test qu'après une écriture le client reste sur la base principale"""
+        alias, response = self.read_alias("post", "/")
+        self.assertEqual(alias, "default")
+        self.assertIn(PIN_COOKIE, response.cookies)
+        alias, _ = self.read_alias("get", "/", cookies={PIN_COOKIE: "1"})
+        self.assertEqual(alias, "default")
+
+
+class ReplicaRefreshTests(TransactionTestCase):
+    # La copie en ligne a besoin de données validées (hors transaction de test)
+
+    @tc("TC037")
+    def test_refresh_replica_copies_database(self):
+        """Test que refresh_replica produit une copie cohérente de la base"""
+        Task.objects.create(title="Copiée")
+        with tempfile.TemporaryDirectory() as tmp:
+            target = Path(tmp) / "replica.sqlite3"
+            call_command("refresh_replica", output=str(target), stdout=StringIO())
+            copy = sqlite3.connect(target)
+            try:
+                titles = copy.execute("SELECT title FROM tasks_task").fetchall()
+            finally:
+                copy.close()
+        self.assertEqual(titles, [("Copiée",)])
+
+
+class WriteCoalescingTests(TransactionTestCase):
+    @tc("TC038")
+    def test_concurrent_creates_share_transactions(self):
+        """Test que des créations simultanées sont regroupées en un seul INSERT"""
+        coalescer = CreateCoalescer(window_ms=200)
+        flushes = []
+        flush = coalescer.flush
+
+        def counting_flush(batch):
+            flushes.append(len(batch))
+            flush(batch)
+
+        coalescer.flush = counting_flush
+        titles = [f"Rafale {i}" for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            saved = list(
+                pool.map(lambda title: coalescer.submit(Task(title=title)), titles)
+            )
+
+        self.assertTrue(all(task.pk for task in saved))
+        self.assertEqual(Task.objects.filter(title__startswith="Rafale").count(), 8)
+        self.assertEqual(sum(flushes), 8)
+        self.assertLess(len(flushes), 8)
+
+    @tc("TC039")
+    def test_failed_create_only_fails_its_request(self):
+        """Test qu'une création en échec n'entraîne pas les autres du lot"""
+        batch = [
+            (Task(title="Valide 1"), Future()),
+            (Task(title="Orpheline", task_list_id=999999), Future()),
+            (Task(title="Valide 2"), Future()),
+        ]
+        CreateCoalescer().flush(batch)
+
+        (first, ok1), (_, failed), (second, ok2) = batch
+        self.assertEqual(ok1.result(), first)
+        self.assertEqual(ok2.result(), second)
+        self.assertIsNotNone(failed.exception())
+        self.assertLess(first.pk, second.pk)
+        self.assertEqual(
+            sorted(Task.objects.values_list("title", flat=True)),
+            ["Valide 1", "Valide 2"],
+        )
+
+    @tc("TC073")
+    def test_timed_out_create_is_withdrawn_or_awaited(self):
+        """Test qu'une création expirée est retirée du lot, ou son résultat attendu"""
+        coalescer = CreateCoalescer(timeout=0.2)
+        with mock.patch.object(coalescer, "_ensure_started"):  # pas de flusher
+            with self.assertRaises(TimeoutError):
+                coalescer.submit(Task(title="Retirée"))
+        coalescer.flush([coalescer._queue.get_nowait()])
+        self.assertFalse(Task.objects.exists())
+
+        # Déjà prise dans un lot : la requête attend l'issue au-delà du délai
+        flush = coalescer._flush
+
+        def slow_flush(batch, using):
+            time.sleep(0.3)
+            flush(batch, using)
+
+        coalescer._flush = slow_flush
+        saved = coalescer.submit(Task(title="Attendue"))
+        self.assertEqual(list(Task.objects.values_list("pk", flat=True)), [saved.pk])
+
+    @tc("TC074")
+    def test_batch_error_fails_requests_not_flusher(self):
+        """Test qu'une erreur de lot fait échouer ses requêtes, pas le flusher"""
+        coalescer = CreateCoalescer(window_ms=1, timeout=2)
+        with mock.patch(
+            "tasks.coalesce.router.db_for_write", side_effect=RuntimeError("shard")
+        ):
+            with self.assertRaisesMessage(RuntimeError, "shard"):
+                coalescer.submit(Task(title="Perdue"))
+        with mock.patch.object(coalescer, "_flush", side_effect=RuntimeError("lot")):
+            with self.assertLogs("tasks.coalesce", "ERROR"):
+                with self.assertRaisesMessage(RuntimeError, "lot"):
+                    coalescer.submit(Task(title="Perdue aussi"))
+
+        saved = coalescer.submit(Task(title="Suivante"))
+        self.assertTrue(coalescer._thread.is_alive())
+        self.assertEqual(list(Task.objects.values_list("pk", flat=True)), [saved.pk])
+
+
+class BackgroundJobTests(TransactionTestCase):
+    # Les jobs s'exécutent dans les threads du worker : données validées requises
+
+    def flaky(self):
+        raise RuntimeError("Échec volontaire")
+
+    @tc("TC040")
+    def test_clear_completed_runs_as_job(self):
+        """Test que l'effacement des tâches terminées est mis en file puis exécuté"""
+        Task.objects.create(title="Terminée", complete=True)
+        Task.objects.create(title="En cours")
+
+        response = self.client.post(
+            reverse("clear_completed"), HTTP_ACCEPT="application/json"
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], Job.QUEUED)
+        self.assertEqual(Task.objects.count(), 2)
+
+        Worker(workers=2).drain()
+
+        status = self.client.get(response.json()["url"]).json()
+        self.assertEqual(status["status"], Job.DONE)
+        self.assertEqual(status["result"], {"deleted": 1})
+        self.assertEqual(
+            list(Task.objects.values_list("title", flat=True)), ["En cours"]
+        )
+
+    @tc("TC041")
+    @override_settings(TASKS_JOBS_RETRY_BACKOFF=0)
+    def test_failing_job_is_retried_then_failed(self):
+        """Test qu'un job en échec est relancé jusqu'à max_attempts puis abandonné"""
+        with mock.patch.dict(registry, {"flaky": (self.flaky, None)}):
+            job = enqueue("flaky", max_attempts=2)
+            with self.assertLogs("tasks.jobs", "WARNING"):
+                Worker(workers=1).drain()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("Échec volontaire", job.error)
+
+    @tc("TC042")
+    def test_concurrency_limit_per_kind(self):
+        """Test qu'un type de job limité à 1 n'est jamais lancé deux fois à la fois"""
+        with mock.patch.dict(registry, {"exclusive": (dict, 1)}):
+            first, second = enqueue("exclusive"), enqueue("exclusive")
+            claimed = Worker(workers=4).claim(4)
+
+        self.assertEqual([job.pk for job in claimed], [first.pk])
+        second.refresh_from_db()
+        self.assertEqual(second.status, Job.QUEUED)
+
+        # Un autre worker prend la place entre la lecture et l'UPDATE
+        Job.objects.update(status=Job.QUEUED)
+        rival = []
+
+        def other_worker(execute, sql, params, many, context):
+            if sql.startswith("UPDATE") and not rival:
+                rival.append(first.pk)
+                Job.objects.filter(pk=first.pk).update(status=Job.RUNNING)
+            return execute(sql, params, many, context)
+
+        with mock.patch.dict(registry, {"exclusive": (dict, 1)}):
+            with connection.execute_wrapper(other_worker):
+                self.assertEqual(Worker(workers=4).claim(4), [])
+        self.assertEqual(Job.objects.filter(status=Job.RUNNING).count(), 1)
+
+    @tc("TC075")
+    @override_settings(TASKS_JOBS_STALE_AFTER=60)
+    def test_only_jobs_without_heartbeat_are_requeued(self):
+        """Test que seul un job dont le worker ne bat plus est remis en file"""
+        with mock.patch.dict(registry, {"long": (dict, None)}):
+            orphan, alive = enqueue("long"), enqueue("long")
+            worker = Worker(workers=2)
+            worker.running = {Future(): job for job in worker.claim(2)}
+        long_ago = timezone.now() - timedelta(minutes=10)
+        Job.objects.update(started_at=long_ago, heartbeat_at=long_ago)
+
+        # Le premier n'a plus de worker ; le second, long, bat encore
+        del worker.running[next(iter(worker.running))]
+        worker.heartbeat()
+        self.assertEqual(worker.requeue_stale(), 1)
+
+        orphan.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual(orphan.status, Job.QUEUED)
+        self.assertEqual(alive.status, Job.RUNNING)
+        self.assertEqual(alive.started_at, long_ago)
+
+
+class DueDateTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+
+    @tc("TC043")
+    def test_list_flags_overdue_and_upcoming(self):
+        """Test que la liste signale les tâches en retard et à venir"""
+        Task.objects.create(title="Retard", due_at=self.now - timedelta(hours=1))
+        Task.objects.create(title="Bientôt", due_at=self.now + timedelta(hours=2))
+        Task.objects.create(title="Plus tard", due_at=self.now + timedelta(days=9))
+
+        response = self.client.get(reverse("list"))
+        self.assertContains(response, '<span class="due due-overdue">', count=1)
+        self.assertContains(response, '<span class="due due-upcoming">', count=1)
+        self.assertContains(response, '<span class="due">', count=1)
+
+    @tc("TC044")
+    def test_scheduler_sends_each_due_reminder_once(self):
+        """Test que le planificateur envoie chaque rappel échu une seule fois"""
+        due = Task.objects.create(title="Échue", due_at=self.now - timedelta(minutes=1))
+        soon = Task.objects.create(
+            title="Proche", due_at=self.now + timedelta(seconds=30)
+        )
+        Task.objects.create(
+            title="Faite", complete=True, due_at=self.now - timedelta(minutes=1)
+        )
+        Task.objects.create(title="Lointaine", due_at=self.now + timedelta(days=2))
+        backend = MemoryBackend()
+        backend.outbox = []
+        scheduler = ReminderScheduler(backend=backend, lookahead=60, rescan=3600)
+
+        self.assertEqual(scheduler.run_once(self.now), 1)
+        self.assertEqual(scheduler.next_wakeup(), soon.due_at)
+        self.assertEqual(scheduler.run_once(self.now + timedelta(seconds=31)), 1)
+        self.assertEqual(scheduler.run_once(self.now + timedelta(seconds=40)), 0)
+        self.assertEqual([task.pk for task in backend.outbox], [due.pk, soon.pk])
+
+        # Changer l'échéance via le formulaire réarme le rappel
+        url = reverse("update_task", args=[str(due.id)])
+        self.client.post(url, {"title": "Échue", "due_at": "2030-01-01T09:00"})
+        due.refresh_from_db()
+        self.assertIsNone(due.reminded_at)
+        self.assertEqual(due.version, 2)
+
+        # Un envoi en échec rend le rappel au passage suivant
+        late = Task.objects.create(
+            title="Retentée", due_at=self.now + timedelta(seconds=50)
+        )
+        scheduler = ReminderScheduler(backend=backend, lookahead=60, rescan=3600)
+        later = self.now + timedelta(seconds=55)
+        with mock.patch.object(backend, "send", side_effect=OSError):
+            with self.assertLogs("tasks.reminders", "ERROR"):
+                self.assertEqual(scheduler.run_once(later), 0)
+        late.refresh_from_db()
+        self.assertIsNone(late.reminded_at)
+        self.assertEqual(scheduler.run_once(later + timedelta(hours=1)), 1)
+        self.assertEqual(backend.outbox[-1].pk, late.pk)
+
+    @tc("TC045")
+    def test_reminder_scan_uses_partial_index(self):
+        """Test que la recherche des rappels passe par l'index partiel"""
+        query = pending().filter(due_at__lte=self.now).order_by("due_at")
+        plan = query.explain()
+        self.assertIn("task_due_reminder", plan)
+        self.assertNotIn("SCAN tasks_task", plan)
+
+
+class TagTests(TestCase):
+    def tag_tasks(self, count):
+        tags = [Tag.objects.create(name=f"tag{i}") for i in range(3)]
+        tasks = Task.objects.bulk_create(
+            [Task(title=f"Étiquetée {i}") for i in range(count)]
+        )
+        TaskTag.objects.bulk_create(
+            TaskTag(task=task, tag=tag) for task in tasks for tag in tags
+        )
+        return tags
+
+    @tc("TC046")
+    def test_list_queries_do_not_grow_with_tasks(self):
+        """Test que 1000 tâches étiquetées s'affichent en un nombre fixe de requêtes"""
+        self.tag_tasks(10)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse("list"))
+
+        Task.objects.all().hard_delete()
+        Tag.objects.all().delete()
+        self.tag_tasks(1000)
+        with self.assertNumQueries(len(small)):
+            response = self.client.get(reverse("list"))
+        self.assertContains(response, 'class="tag-chip"', count=3000)
+
+    @tc("TC047")
+    def test_create_and_filter_by_tag(self):
+        """Test la création de tâches étiquetées et le filtrage par tag"""
+        self.client.post(
+            reverse("list"), {"title": "Courses", "tags": "maison, urgent"}
+        )
+        self.client.post(reverse("list"), {"title": "Rapport", "tags": "travail"})
+        maison = Tag.objects.get(name="maison")
+        self.assertEqual(
+            set(Tag.objects.values_list("name", flat=True)),
+            {"maison", "urgent", "travail"},
+        )
+
+        response = self.client.get(reverse("list"), {"tag": maison.pk})
+        self.assertContains(response, 'data-task-title="Courses"')
+        self.assertNotContains(response, 'data-task-title="Rapport"')
+
+        plan = Task.objects.filter(tags=maison).explain()
+        self.assertIn("tasktag_tag_task", plan)
+
+
+class FragmentTests(TestCase):
+    """Réponses partielles (en-tête X-Fragment) pour le script de la liste"""
+
+    fragment = {"HTTP_X_FRAGMENT": "row"}
+
+    @tc("TC056")
+    def test_create_fragment_cost_ignores_list_size(self):
+        """Test qu'une création renvoie sa seule ligne, même coût à 5 ou 500 tâches"""
+        Task.objects.bulk_create([Task(title=f"Existante {i}") for i in range(5)])
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(
+                reverse("list"), {"title": "Petite", "tags": "travail"}, **self.fragment
+            )
+
+        Task.objects.bulk_create([Task(title=f"Existante {i}") for i in range(500)])
+        with self.assertNumQueries(len(small)):
+            response = self.client.post(
+                reverse("list"), {"title": "Grande", "tags": "maison"}, **self.fragment
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertContains(response, 'class="item-row"', count=1, status_code=201)
+        self.assertContains(response, 'data-task-title="Grande"', status_code=201)
+        self.assertContains(response, "#maison", status_code=201)
+        self.assertNotContains(response, "Existante", status_code=201)
+
+        response = self.client.post(reverse("list"), {"title": ""}, **self.fragment)
+        self.assertEqual(response.status_code, 400)
+        # Sans l'en-tête, le flux classique (redirection) est inchangé
+        response = self.client.post(reverse("list"), {"title": "Sans script"})
+        self.assertRedirects(response, "/")
+
+    @tc("TC057")
+    def test_update_and_delete_fragments(self):
+        """Test que modification et suppression renvoient la ligne ou un 204"""
+        task = Task.objects.create(title="Avant")
+        response = self.client.post(
+            reverse("update_task", args=[str(task.id)]),
+            {"title": "Après", "complete": "on", "version": task.version},
+            **self.fragment,
+        )
+        self.assertContains(response, 'class="item-row"', count=1)
+        self.assertContains(response, '<s aria-label="Tâche terminée: Après">')
+        self.assertContains(response, f'data-task-version="{task.version + 1}"')
+
+        response = self.client.post(
+            reverse("delete", args=[str(task.id)]),
+            {"version": task.version + 1},
+            **self.fragment,
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Task.objects.filter(pk=task.pk).exists())
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.task_list = TaskList.objects.create(name="Maison")
+        self.old = Task.objects.create(
+            title="Vieille", complete=True, task_list=self.task_list
+        )
+        self.old.tags.set([Tag.objects.create(name="jardin")])
+        self.recent = Task.objects.create(
+            title="Récente", complete=True, task_list=self.task_list
+        )
+        self.open = Task.objects.create(title="Ouverte", task_list=self.task_list)
+        Task.objects.filter(pk=self.old.pk).update(
+            completed_at=timezone.now() - timedelta(days=40)
+        )
+
+    @tc("TC058")
+    def test_archive_moves_old_completed_tasks(self):
+        """Test que seules les tâches terminées depuis 30 jours sont archivées"""
+        out = StringIO()
+        call_command("archive_completed_tasks", batch_size=1, pause=0, stdout=out)
+        self.assertIn("Archived 1 completed task(s).", out.getvalue())
+
+        self.assertEqual(
+            set(Task.all_objects.values_list("title", flat=True)),
+            {"Récente", "Ouverte"},
+        )
+        archived = ArchivedTask.objects.get()
+        self.assertEqual((archived.pk, archived.tags), (self.old.pk, ["jardin"]))
+        self.task_list.refresh_from_db()
+        self.assertEqual(self.task_list.done_count, 1)
+        self.assertTrue(
+            TaskChange.objects.filter(
+                task_id=self.old.pk, action=TaskChange.DELETE
+            ).exists()
+        )
+
+        plan = Task.objects.filter(
+            complete=True, completed_at__lt=timezone.now()
+        ).explain()
+        self.assertIn("task_completed_archive", plan)
+
+    @tc("TC059")
+    def test_archive_search_and_restore(self):
+        """Test la recherche dans les archives et la restauration d'une tâche"""
+        call_command("archive_completed_tasks", stdout=StringIO())
+        response = self.client.get(reverse("archive"), {"q": "vieil"})
+        self.assertContains(response, 'data-task-id="%d"' % self.old.pk)
+        response = self.client.get(reverse("archive"), {"q": "absente"})
+        self.assertNotContains(response, "data-task-id=")
+
+        self.assertEqual(
+            self.client.get(reverse("restore_task", args=[self.old.pk])).status_code,
+            405,
+        )
+        response = self.client.post(reverse("restore_task", args=[self.old.pk]))
+        self.assertRedirects(response, self.task_list.get_absolute_url())
+        task = Task.objects.get(pk=self.old.pk)
+        self.assertEqual(task.created, self.old.created)
+        self.assertEqual([tag.name for tag in task.tags.all()], ["jardin"])
+        self.assertFalse(ArchivedTask.objects.exists())
+        # Restaurée, elle repart pour 30 jours avant le prochain archivage
+        call_command("archive_completed_tasks", stdout=StringIO())
+        self.assertTrue(Task.objects.filter(pk=self.old.pk).exists())
+
+
+class TaskOrderingTests(TestCase):
+    def setUp(self):
+        self.tasks = [Task.objects.create(title=f"T{i}") for i in range(4)]
+
+    def titles(self):
+        response = self.client.get(reverse("list"))
+        return [task.title for task in response.context["tasks"]]
+
+    def move(self, task, prev=None, next=None):
+        return self.client.post(
+            reverse("move_task", args=[str(task.id)]),
+            {
+                "prev": prev.id if prev else "",
+                "next": next.id if next else "",
+            },
+        )
+
+    @tc("TC048")
+    def test_move_writes_only_the_moved_task(self):
+        """Test qu'un déplacement ne modifie que le rang de la tâche déplacée"""
+        t0, t1, t2, t3 = self.tasks
+        before = dict(Task.objects.values_list("pk", "rank"))
+
+        response = self.move(t3, prev=t0, next=t1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles(), ["T0", "T3", "T1", "T2"])
+        after = dict(Task.objects.values_list("pk", "rank"))
+        self.assertEqual([pk for pk in before if before[pk] != after[pk]], [t3.pk])
+
+        self.move(t0, prev=t2)
+        self.assertEqual(self.titles(), ["T3", "T1", "T2", "T0"])
+
+        # Voisins inversés ou identiques : 400, sans rien écrire
+        before = dict(Task.objects.values_list("pk", "rank"))
+        self.assertEqual(self.move(t3, prev=t2, next=t1).status_code, 400)
+        self.assertEqual(self.move(t3, prev=t1, next=t1).status_code, 400)
+        self.assertEqual(dict(Task.objects.values_list("pk", "rank")), before)
+        Task.objects.create(title="T4")
+        self.assertEqual(self.titles()[-1], "T4")
+
+    @tc("TC049")
+    def test_exhausted_gap_triggers_rebalance(self):
+        """Test que l'épuisement de l'écart entre deux rangs renumérote la liste"""
+        t0, t1, t2, t3 = self.tasks
+        # Deux rangs adjacents : plus aucun flottant entre T0 et T1
+        models.QuerySet.update(
+            Task.objects.filter(pk=t1.pk), rank=math.nextafter(t0.rank, 2.0)
+        )
+
+        self.assertEqual(self.move(t3, prev=t0, next=t1).status_code, 200)
+        self.assertEqual(self.titles(), ["T0", "T3", "T1", "T2"])
+
+        # La commande espace de nouveau les rangs sans changer l'ordre
+        models.QuerySet.update(Task.objects.filter(pk=t2.pk), rank=1000.5)
+        call_command("rebalance_task_ranks", pause=0, stdout=StringIO())
+        self.assertEqual(self.titles(), ["T0", "T3", "T1", "T2"])
+        self.assertEqual(
+            list(Task.objects.order_by("rank").values_list("rank", flat=True)),
+            [1.0, 2.0, 3.0, 4.0],
+        )
+
+
+class TaskAdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", password="x")
+        self.client.force_login(self.admin)
+        self.url = reverse("admin:tasks_task_changelist")
+        Task.objects.bulk_create(
+            [Task(title=f"Tâche-{i}", owner=self.admin) for i in range(60)]
+        )
+
+    def run_action(self, action, tasks):
+        return self.client.post(
+            self.url,
+            {
+                "action": action,
+                "_selected_action": [task.pk for task in tasks],
+            },
+        )
+
+    @tc("TC050")
+    def test_changelist_never_counts_whole_table(self):
+        """Test que la liste d'administration ne compte jamais toute la table"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {"q": "tâche-1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["cl"].result_list), 11)
+        counts = [q["sql"] for q in queries if "COUNT(" in q["sql"]]
+        self.assertTrue(counts)
+        self.assertTrue(all("LIMIT" in sql for sql in counts), counts)
+
+        plan = Task.objects.filter(title__istartswith="tâche-1").explain()
+        self.assertIn("task_title_nocase", plan)
+
+    @tc("TC051")
+    def test_bulk_actions_are_set_based(self):
+        """Test que les actions groupées coûtent autant pour 5 que pour 50 tâches"""
+        tasks = list(Task.objects.order_by("pk"))
+        with CaptureQueriesContext(connection) as few:
+            self.run_action("mark_complete", tasks[:5])
+        with self.assertNumQueries(len(few)):
+            self.run_action("mark_complete", tasks[5:55])
+        self.assertEqual(Task.objects.filter(complete=True).count(), 55)
+        # Même contrôle de version que les modifications unitaires
+        self.assertEqual(Task.objects.get(pk=tasks[0].pk).version, 2)
+
+        # L'action par défaut (qui charge chaque ligne) est retirée
+        self.run_action("delete_selected", tasks[:5])
+        self.assertEqual(Task.objects.count(), 60)
+        self.run_action("soft_delete", tasks[:10])
+        self.assertEqual(Task.objects.count(), 50)
+        self.assertEqual(Task.all_objects.count(), 60)
+
+
+class StartupTests(TestCase):
+    @tc("TC052")
+    def test_warm_up_compiles_templates(self):
+        """Test que le préchauffage résout les URLs et compile les gabarits"""
+        loader = engines["django"].engine.template_loaders[0]
+        loader.reset()
+
+        # Aucune connexion ouverte d'avance : elle ne servirait à aucune requête
+        with self.assertNumQueries(0):
+            stages = warm_up()
+        self.assertEqual(
+            [stage for stage, _ in stages if not stage.startswith(" ")],
+            ["warm-up: urls", "warm-up: templates", "warm-up: orm"],
+        )
+        self.assertIn("tasks/list.html", loader.get_template_cache)
+
+    @tc("TC053")
+    def test_profile_startup_reports_stages(self):
+        """Test que profile_startup détaille le démarrage jusqu'à la 1re requête"""
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            # Le sous-processus ne voit pas la base de test : une base migrée à part
+            call_command(
+                "profile_startup",
+                top=3,
+                stdout=out,
+                database_file=str(Path(tmp) / "startup.sqlite3"),
+            )
+        report = out.getvalue()
+        self.assertIn("import tasks.models", report)
+        self.assertIn("first request", report)
+        self.assertIn("warm-up: templates", report)
+
+
+class ServeTests(SimpleTestCase):
+    """manage.py serve dans un sous-processus, sur un port libre"""
+
+    def start(self, *args):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-u",
+                "manage.py",
+                "serve",
+                f"127.0.0.1:{self.port}",
+                *args,
+            ],
+            cwd=Path(__file__).resolve().parents[1],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        self.addCleanup(server.kill)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), 0.5).close()
+                return server
+            except OSError:
+                time.sleep(0.05)
+        self.fail("le serveur ne répond pas")
+
+    def request(self, conn, method, path):
+        conn.request(method, path, body=b"" if method == "POST" else None)
+        response = conn.getresponse()
+        response.read()
+        return response
+
+    @tc("TC054")
+    def test_serve_keeps_connections_alive(self):
+        """Test que serve répond à plusieurs requêtes sur une même connexion"""
+        server = self.start("--workers", "2", "--threads", "2")
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        self.assertEqual(self.request(conn, "GET", "/missing/").status, 404)
+        sock = conn.sock
+        # Pas de jeton CSRF : 403, sans toucher à la base
+        self.assertEqual(self.request(conn, "POST", "/").status, 403)
+        self.assertIs(conn.sock, sock)
+        conn.close()
+
+        # Corps annoncé trop gros : 413 avant de le lire
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        conn.putrequest("POST", "/")
+        conn.putheader("Content-Length", 10 * 2**20)
+        conn.endheaders()
+        self.assertEqual(conn.getresponse().status, 413)
+        conn.close()
+
+        server.send_signal(signal.SIGTERM)
+        self.assertEqual(server.wait(10), 0)
+
+    @tc("TC055")
+    def test_serve_recycles_and_reloads_workers(self):
+        """Test que serve recycle ses workers après max-requests et au SIGHUP"""
+        server = self.start("--workers", "1", "--max-requests", "2")
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        self.request(conn, "GET", "/missing/")
+        last = self.request(conn, "GET", "/missing/")
+        self.assertEqual(last.getheader("Connection"), "close")
+        conn.close()
+
+        server.send_signal(signal.SIGHUP)
+        time.sleep(0.5)
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        self.assertEqual(self.request(conn, "GET", "/missing/").status, 404)
+        conn.close()
+
+        server.send_signal(signal.SIGTERM)
+        self.assertEqual(server.wait(10), 0)
+        log = server.stdout.read()
+        self.assertIn("exited (0)", log)
+        self.assertIn("Reloading", log)
+
+
+@override_settings(TASKS_SHARDS=["default", "shard1"])
+class ShardingTests(TransactionTestCase):
+    databases = {"default", "shard1"}
+
+    def setUp(self):
+        """Alice sur default, Bob sur shard1"""
+        seed_id_ranges("shard1")
+        self.alice = User.objects.create_user("alice", password="secret-pass")
+        self.bob = User.objects.create_user("bob", password="secret-pass")
+        ShardPlacement.objects.create(owner=self.alice, alias="default")
+        ShardPlacement.objects.create(owner=self.bob, alias="shard1")
+
+    def create(self, user, title):
+        self.client.force_login(user)
+        self.client.post("/", {"title": title})
+
+    @tc("TC060")
+    def test_tasks_live_on_their_owners_shard(self):
+        """Test que chaque tâche est écrite et relue sur le shard de son propriétaire"""
+        self.create(self.alice, "Tâche Alice")
+        self.create(self.bob, "Tâche Bob")
+
+        self.assertEqual(
+            list(Task.objects.using("default").values_list("title", flat=True)),
+            ["Tâche Alice"],
+        )
+        bob_task = Task.objects.using("shard1").get()
+        self.assertEqual(bob_task.title, "Tâche Bob")
+        self.assertGreaterEqual(bob_task.pk, SHARD_ID_SPAN)
+        self.assertTrue(
+            TaskChange.objects.using("shard1").filter(task_id=bob_task.pk).exists()
+        )
+
+        response = self.client.get("/")
+        self.assertEqual([task.id for task in response.context["tasks"]], [bob_task.id])
+        self.client.force_login(self.alice)
+        self.assertNotContains(self.client.get("/"), "Tâche Bob")
+
+    @tc("TC061")
+    def test_rebalance_moves_owner_and_export_gathers(self):
+        """Test que rebalance_shards déplace un propriétaire sans changer ses ids"""
+        self.create(self.alice, "Tâche Alice")
+        self.create(self.bob, "Tâche Bob")
+        task = Task.objects.using("default").get()
+        task.tags.set([Tag.objects.create(name="urgent", owner=self.alice)])
+        # Copie périmée laissée par un déplacement interrompu : remplacée
+        models.QuerySet.bulk_create(
+            Task._base_manager.using("shard1"),
+            [Task(pk=task.pk, title="Périmée", owner=self.alice, rank=task.rank)],
+        )
+
+        call_command(
+            "rebalance_shards",
+            owner=self.alice.pk,
+            to="shard1",
+            settle=0,
+            stdout=StringIO(),
+        )
+        self.assertFalse(Task.all_objects.using("default").exists())
+        self.assertFalse(Tag.objects.using("default").exists())
+        moved = Task.objects.using("shard1").get(title="Tâche Alice")
+        self.assertEqual(moved.pk, task.pk)
+        self.assertEqual([tag.name for tag in moved.tags.all()], ["urgent"])
+        self.assertEqual(ShardPlacement.objects.get(owner=self.alice).alias, "shard1")
+        self.client.force_login(self.alice)
+        self.assertContains(self.client.get("/"), "Tâche Alice")
+
+        out = StringIO()
+        call_command("export_tasks", stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row["title"] for row in rows], ["Tâche Alice", "Tâche Bob"])
+
+
+class ListRowTests(TestCase):
+    @tc("TC062")
+    def test_list_renders_projected_rows(self):
+        """Test que la liste rend des lignes projetées et non des instances du modèle"""
+        task = Task.objects.create(title="Projetée", due_at=timezone.now())
+        task.tags.set([Tag.objects.create(name="léger")])
+
+        response = self.client.get(reverse("list"))
+        [row] = response.context["tasks"]
+        self.assertIsInstance(row, TaskRow)
+        self.assertFalse(hasattr(row, "__dict__"))
+        self.assertEqual(
+            (row.id, row.title, row.version, [tag.name for tag in row.tags]),
+            (task.id, "Projetée", task.version, ["léger"]),
+        )
+        self.assertContains(
+            response, 'href="%s"' % reverse("update_task", args=[task.id])
+        )
+        self.assertContains(response, 'href="%s"' % reverse("delete", args=[task.id]))
+        # Le scénario TC018 lit le titre juste après l'id
+        self.assertRegex(
+            response.content.decode(),
+            r'data-task-id="%d"\s+data-task-title="Projetée"' % task.id,
+        )
+
+        # Même ligne que le fragment rendu à partir de l'instance
+        fragment = self.client.post(
+            reverse("update_task", args=[task.id]),
+            {
+                "title": "Projetée",
+                "tags": "léger",
+                "due_at": timezone.localtime(task.due_at).strftime("%Y-%m-%dT%H:%M"),
+            },
+            HTTP_X_FRAGMENT="row",
+        )
+        self.assertContains(fragment, 'data-task-version="%d"' % (task.version + 1))
+        self.assertContains(fragment, "#léger")
+
+
+@skipUnless(find_spec("jinja2"), "jinja2 n'est pas installé")
+class JinjaTemplateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="secret-pass")
+        self.client.force_login(self.user)
+        self.task_list = TaskList.objects.create(name="Maison", owner=self.user)
+        self.task = Task.objects.create(
+            title='Dire "bonjour" à l\'équipe <b>',
+            owner=self.user,
+            due_at=timezone.now() - timedelta(hours=1),
+        )
+        self.task.tags.set([Tag.objects.create(name="urgent", owner=self.user)])
+        Task.objects.create(title="Finie", complete=True, owner=self.user)
+        Task.objects.create(
+            title="Dans la liste",
+            owner=self.user,
+            task_list=self.task_list,
+            due_at=timezone.now() + timedelta(days=30),
+        )
+
+    def pages(self):
+        csrf = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]+"')
+        responses = [
+            self.client.get(reverse("list")),
+            self.client.get(reverse("list"), {"tag": self.task.tags.get().pk}),
+            self.client.get(self.task_list.get_absolute_url()),
+            self.client.get(reverse("update_task", args=[self.task.pk])),
+            self.client.post(
+                reverse("update_task", args=[self.task.pk]),
+                {"title": "", "version": self.task.version + 1},  # gardée
+            ),
+            self.client.get(reverse("delete", args=[self.task.pk])),
+            self.client.post(reverse("delete", args=[self.task.pk]), {"version": 0}),
+        ]
+        return [
+            (response.status_code, csrf.sub(b"csrf", response.content))
+            for response in responses
+        ]
+
+    @tc("TC063")
+    def test_jinja2_pages_match_django_pages(self):
+        """Test que les pages Jinja2 produisent exactement le HTML des pages Django"""
+        django_pages = self.pages()
+        jinja2 = engines["jinja2"]
+        with (
+            override_settings(TASKS_TEMPLATE_ENGINE="jinja2"),
+            mock.patch.object(
+                jinja2, "get_template", wraps=jinja2.get_template
+            ) as loads,
+        ):
+            jinja2_pages = self.pages()
+        self.assertTrue(loads.called)
+        self.assertEqual(
+            [status for status, _ in django_pages], [200, 200, 200, 200, 200, 200, 409]
+        )
+        for django_page, jinja2_page in zip(django_pages, jinja2_pages):
+            self.assertEqual(jinja2_page, django_page)
+
+
+class AdmissionTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "throttle.sqlite3"
+        throttled = override_settings(
+            TASKS_THROTTLE=True,
+            TASKS_THROTTLE_STORE=self.path,
+            TASKS_THROTTLE_RATES={"read": (0.01, 3), "write": (0.01, 2)},
+            TASKS_THROTTLE_MAX_WRITES=2,
+        )
+        throttled.enable()
+        self.addCleanup(throttled.disable)
+
+    @tc("TC064")
+    def test_rate_limit_per_client_and_route_class(self):
+        """Test les seaux de jetons par client et par type de route, partagés"""
+        # Un autre processus vide le seau d'écriture de ce client
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys; from todo.throttle import SharedStore; "
+                "s = SharedStore(sys.argv[1]); "
+                '[s.take("write:addr:127.0.0.1", 0.01, 2) for _ in range(2)]',
+                str(self.path),
+            ],
+            cwd=Path(__file__).resolve().parents[1],
+            check=True,
+        )
+        response = self.client.post(reverse("list"), {"title": "Refusée"})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 1)
+        self.assertFalse(Task.objects.exists())
+
+        statuses = [self.client.get(reverse("list")).status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        other = self.client_class(REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(other.get(reverse("list")).status_code, 200)
+
+    @tc("TC065")
+    def test_write_concurrency_cap(self):
+        """Test que les écritures au-delà du plafond échouent vite en 503"""
+        store = SharedStore(self.path)
+        held = [store.acquire(2), store.acquire(2)]
+        response = self.client.post(reverse("list"), {"title": "En attente"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+        # Le créneau d'un processus mort est récupéré ; la requête rend le sien
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        store.connect().execute(
+            "UPDATE slot SET pid = ? WHERE id = ?", [dead.pid, held[0]]
+        )
+        response = self.client.post(reverse("list"), {"title": "Admise"})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Task.objects.filter(title="Admise").exists())
+        self.assertIsNotNone(store.acquire(2))
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.staff = User.objects.create_superuser("admin", password="x")
+        self.user = User.objects.create_user("alice", password="x")
+
+    @tc("TC066")
+    def test_staff_header_profiles_request(self):
+        """Test qu'une requête du staff avec X-Profile est profilée et enregistrée"""
+        with override_settings(TASKS_PROFILE_DIR=self.dir):
+            self.client.force_login(self.staff)
+            response = self.client.get(reverse("list"), HTTP_X_PROFILE="1")
+            self.assertNotIn("X-Profile", response)  # désactivé par défaut
+            with override_settings(TASKS_PROFILE=True):
+                # Chargé au démarrage : un nouveau client, comme un worker neuf
+                self.client = self.client_class()
+                self.client.force_login(self.user)
+                self.client.get(reverse("list"), HTTP_X_PROFILE="1")
+                self.assertEqual(list(self.dir.iterdir()), [])
+
+                self.client.force_login(self.staff)
+                # Un seul profileur par processus : la requête concurrente passe
+                with profiling._active:
+                    response = self.client.get(reverse("list"), HTTP_X_PROFILE="1")
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn("X-Profile", response)
+                response = self.client.get(reverse("list"), HTTP_X_PROFILE="1")
+        name = response["X-Profile"]
+        self.assertRegex(name, r"-GET-list-\d+ms-")
+        stats = pstats.Stats(str(self.dir / name))
+        self.assertIn("index", {func for _, _, func in stats.stats})
+
+    @tc("TC067")
+    @override_settings(TASKS_PROFILE=True, TASKS_PROFILE_SAMPLE_RATE=1.0)
+    def test_admin_lists_and_downloads_profiles(self):
+        """Test la liste et le téléchargement des profils, réservés au staff"""
+        with override_settings(TASKS_PROFILE_DIR=self.dir):
+            self.client.get(reverse("list"))  # échantillonnée
+            [saved] = [path.name for path in self.dir.iterdir()]
+            self.client.force_login(self.user)
+            response = self.client.get(reverse("profiles"))
+            self.assertRedirects(
+                response, reverse("admin:login") + "?next=" + reverse("profiles")
+            )
+
+            self.client.force_login(self.staff)
+            response = self.client.get(reverse("profiles"))
+            self.assertContains(response, reverse("profile_download", args=[saved]))
+            download = self.client.get(reverse("profile_download", args=[saved]))
+            self.assertEqual(
+                b"".join(download.streaming_content), (self.dir / saved).read_bytes()
+            )
+            self.assertEqual(
+                self.client.get("/admin/profiles/..%2Fdb.sqlite3").status_code, 404
+            )
+
+            # Un profil supprimé par un autre worker pendant la liste est ignoré
+            entries = list(os.scandir(self.dir))
+            (self.dir / saved).unlink()
+            with mock.patch("todo.profiling.os.scandir", return_value=entries):
+                listed = [name for name, _, _ in profiling.saved_profiles()]
+            self.assertEqual(len(listed), len(entries) - 1)
+            self.assertNotIn(saved, listed)
+
+
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.log = Path(tmp.name) / "slow.log"
+        logged = override_settings(TASKS_SLOW_QUERY_MS=0, TASKS_SLOW_QUERY_LOG=self.log)
+        logged.enable()
+        self.addCleanup(logged.disable)
+
+    def entries(self):
+        return [json.loads(line) for line in self.log.read_text().splitlines()]
+
+    @tc("TC068")
+    def test_slow_queries_logged_with_plan_and_view(self):
+        """Test que les requêtes lentes sont journalisées avec plan, vue et empreinte"""
+        task = Task.objects.create(title="Lente")
+        self.client.get(reverse("update_task", args=[task.pk]))
+
+        [entry] = [e for e in self.entries() if 'FROM "tasks_task"' in e["sql"]]
+        self.assertEqual(entry["url_name"], "update_task")
+        self.assertEqual(entry["view"], "update_task")
+        self.assertTrue(
+            any("USING INTEGER PRIMARY KEY" in line for line in entry["plan"])
+        )
+        self.assertNotIn(str(task.pk), json.dumps(entry["normalized"]))
+
+        self.assertEqual(
+            slowlog.fingerprint("SELECT 1 FROM t WHERE id IN (%s, %s) AND a = 'x'"),
+            slowlog.fingerprint("SELECT 1 FROM t WHERE id IN (%s) AND a = 'yz'"),
+        )
+
+    @tc("TC069")
+    def test_slow_queries_report_ranks_fingerprints(self):
+        """Test que slow_queries classe les empreintes et signale les parcours"""
+        request = RequestFactory().get(reverse("list"))
+        request.resolver_match = resolve(request.path)
+        with connection.execute_wrapper(slowlog.SlowQueryLog(request, 0)):
+            for word in ("a", "b", "c"):
+                list(Task.all_objects.filter(title__contains=word))
+        scans = [e for e in self.entries() if "LIKE" in e["sql"]]
+        self.assertEqual(len({e["fingerprint"] for e in scans}), 1)
+
+        out = StringIO()
+        call_command("slow_queries", log=str(self.log), top=50, stdout=out)
+        report = out.getvalue()
+        self.assertIn(f"{scans[0]['fingerprint']}  total", report)
+        self.assertIn("3 run(s)", report)
+        self.assertIn("views: list", report)
+        self.assertIn("! SCAN tasks_task", report)
+
+
+class BackupTests(TransactionTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def backup(self, **options):
+        call_command(
+            "backup_db", output_dir=str(self.dir), stdout=StringIO(), **options
+        )
+        return sqlite_backup.backups(self.dir, "default")[0]
+
+    @tc("TC070")
+    def test_backup_db_compresses_checksums_and_rotates(self):
+        """Test que backup_db produit une copie compressée, vérifiée et tournante"""
+        Task.objects.create(title="Sauvegardée")
+        old = self.dir / "default-20000101-000000.sqlite3"
+        old.write_bytes(b"ancienne")
+        sqlite_backup.checksum_path(old).write_text("0  ancienne\n")
+
+        path = self.backup(compress=True, keep=1)
+        self.assertEqual(path.suffixes, [".sqlite3", ".gz"])
+        self.assertTrue(sqlite_backup.verify(path))
+        self.assertFalse(old.exists())
+        self.assertFalse(sqlite_backup.checksum_path(old).exists())
+
+        copy = self.dir / "copie.sqlite3"
+        with gzip.open(path) as packed:
+            copy.write_bytes(packed.read())
+        database = sqlite3.connect(copy)
+        try:
+            titles = database.execute("SELECT title FROM tasks_task").fetchall()
+        finally:
+            database.close()
+        self.assertEqual(titles, [("Sauvegardée",)])
+
+    @tc("TC071")
+    def test_restore_db_replaces_data_after_checksum(self):
+        """Test que restore_db restaure une sauvegarde et refuse une copie altérée"""
+        Task.objects.create(title="Avant")
+        path = self.backup(compress=True)
+        Task.all_objects.all().delete()
+        Task.objects.create(title="Après")
+
+        call_command("restore_db", str(path), interactive=False, stdout=StringIO())
+        self.assertEqual(list(Task.objects.values_list("title", flat=True)), ["Avant"])
+
+        with path.open("ab") as file:
+            file.write(b"!")
+        with self.assertRaisesMessage(CommandError, "does not match its checksum"):
+            call_command("restore_db", str(path), interactive=False)
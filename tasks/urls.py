@@ -4,6 +4,15 @@ from . import views
 
 urlpatterns = [
     path("", views.index, name="list"),
+    path("lists/", views.taskLists, name="lists"),
+    path("lists/<int:list_pk>/", views.index, name="task_list"),
     path("update_task/<str:pk>/", views.updateTask, name="update_task"),
     path("delete_task/<str:pk>/", views.deleteTask, name="delete"),
+    path("move_task/<str:pk>/", views.moveTask, name="move_task"),
+    path("clear_completed/", views.clearCompleted, name="clear_completed"),
+    path("jobs/<int:pk>/", views.jobStatus, name="job"),
+    path("archive/", views.archive, name="archive"),
+    path("archive/<int:pk>/restore/", views.restoreTask, name="restore_task"),
+    path("changes/", views.taskChanges, name="changes"),
+    path("events/", views.taskEvents, name="events"),
 ]
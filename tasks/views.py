@@ -1,12 +1,101 @@
-from django.shortcuts import redirect, render
+from datetime import timedelta
 
-from .forms import TaskForm
-from .models import Task
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
+from django.db import models
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils import timezone
+
+from .coalesce import create_task
+from .events import event_stream
+from .forms import TaskForm, TaskListForm
+from .jobs import enqueue
+from .models import (
+    ArchivedTask,
+    Job,
+    Tag,
+    Task,
+    TaskChange,
+    TaskList,
+    VersionConflict,
+    rank_between,
+)
+from .rows import TaskRow, task_rows
+
+
+def user_tasks(request):
+    """Tasks visible to the requesting user (owner-partitioned)."""
+    return Task.objects.for_user(request.user)
+
+
+def list_url(task_list_id):
+    """URL of a task list page; the unfiled tasks live on "/"."""
+    if task_list_id is None:
+        return "/"
+    return reverse("task_list", args=[task_list_id])
+
+
+def tag_chips():
+    """Prefetch for the tag chips of task rows."""
+    return Prefetch("tags", queryset=Tag.objects.order_by("name"))
+
+
+def due_context():
+    """What task rows need to flag overdue and upcoming tasks."""
+    now = timezone.now()
+    upcoming_hours = settings.TASKS_UPCOMING_HOURS
+    return {
+        "now": now,
+        "upcoming_until": now + timedelta(hours=upcoming_hours),
+        "upcoming_hours": upcoming_hours,
+    }
+
+
+def render_page(request, template_name, context, status=None):
+    """``render()`` through the engine picked by ``TASKS_TEMPLATE_ENGINE``.
+
+    Only the pages that have a Jinja2 version (``tasks/jinja2/``) use it.
+    """
+    engine = settings.TASKS_TEMPLATE_ENGINE
+    return render(request, template_name, context, status=status, using=engine)
+
+
+def wants_fragment(request):
+    """In-page script asking for the affected row instead of a redirect."""
+    return request.headers.get("X-Fragment") == "row"
+
+
+def render_row(request, task, status=200):
+    """Just the ``item-row`` of ``task``: the cost of one row, not the list."""
+    prefetch_related_objects([task], tag_chips())
+    context = {"task": TaskRow.from_task(task), **due_context()}
+    return render_page(request, "tasks/task_row.html", context, status=status)
 
 
 # Create your views here.
-def index(request):
-    tasks = Task.objects.all()
+def index(request, list_pk=None):
+    task_list = None
+    if list_pk is not None:
+        task_list = get_object_or_404(
+            TaskList.objects.for_user(request.user), pk=list_pk
+        )
+    tasks = user_tasks(request).filter(task_list=task_list).order_by("rank", "id")
+    tag = None
+    if request.GET.get("tag", "").isdigit():
+        tag = get_object_or_404(
+            Tag.objects.for_user(request.user), pk=request.GET["tag"]
+        )
+        # Walks the (tag, task) index of the through table.
+        tasks = tasks.filter(tags=tag)
 
     form = TaskForm()
 
@@ -14,33 +103,271 @@ def index(request):
         form = TaskForm(request.POST)
         if form.is_valid():
             # adds to the database if valid
-            form.save()
-        return redirect("/")
+            task = form.save(commit=False)
+            if request.user.is_authenticated:
+                task.owner = request.user
+            task.task_list = task_list
+            create_task(task)
+            form.save_m2m()
+            if wants_fragment(request):
+                return render_row(request, task, status=201)
+        elif wants_fragment(request):
+            return JsonResponse({"errors": form.errors}, status=400)
+        return redirect(list_url(list_pk))
+
+    context = {
+        # Projected rows, not model instances: see tasks.rows.
+        "tasks": task_rows(tasks),
+        "form": form,
+        "task_list": task_list,
+        "tag": tag,
+        "cursor": TaskChange.latest_cursor(),
+        **due_context(),
+    }
+    return render_page(request, "tasks/list.html", context)
+
+
+def taskLists(request):
+    task_lists = TaskList.objects.for_user(request.user).order_by("name")
+
+    form = TaskListForm()
+
+    if request.method == "POST":
+        form = TaskListForm(request.POST)
+        if form.is_valid():
+            task_list = form.save(commit=False)
+            if request.user.is_authenticated:
+                task_list.owner = request.user
+            task_list.save()
+            return redirect(task_list.get_absolute_url())
+
+    context = {"task_lists": task_lists, "form": form}
+    return render(request, "tasks/lists.html", context)
+
+
+def wants_json(request):
+    return "application/json" in request.headers.get("Accept", "")
 
-    context = {"tasks": tasks, "form": form}
-    return render(request, "tasks/list.html", context)
+
+def task_json(task):
+    return {
+        "id": task.id,
+        "title": task.title,
+        "complete": task.complete,
+        "task_list": task.task_list_id,
+        "version": task.version,
+        "due_at": task.due_at,
+    }
+
+
+def conflict(request, current, template, context):
+    """409 answer to a write made against an outdated version of a task."""
+    if wants_json(request):
+        return JsonResponse(
+            {"error": "conflict", "task": task_json(current)}, status=409
+        )
+    context["conflict"] = True
+    return render_page(request, template, context, status=409)
 
 
 def updateTask(request, pk):
-    task = Task.objects.get(id=pk)
+    task = get_object_or_404(user_tasks(request), id=pk)
     form = TaskForm(instance=task)
 
     if request.method == "POST":
         form = TaskForm(request.POST, instance=task)
         if form.is_valid():
-            form.save()
-            return redirect("/")
+            try:
+                form.save()
+            except VersionConflict:
+                current = get_object_or_404(user_tasks(request), id=pk)
+                context = {"form": TaskForm(instance=current)}
+                return conflict(request, current, "tasks/update_task.html", context)
+            if wants_json(request):
+                return JsonResponse(task_json(task))
+            if wants_fragment(request):
+                return render_row(request, task)
+            return redirect(list_url(task.task_list_id))
 
     context = {"form": form}
-    return render(request, "tasks/update_task.html", context)
+    return render_page(request, "tasks/update_task.html", context)
 
 
 def deleteTask(request, pk):
-    item = Task.objects.get(id=pk)
+    item = get_object_or_404(user_tasks(request), id=pk)
 
     if request.method == "POST":
-        item.delete()
-        return redirect("/")
+        task_list_id = item.task_list_id
+        try:
+            item.version = int(request.POST.get("version") or item.version)
+            item.delete()
+        except ValueError:
+            return HttpResponseBadRequest("version must be an integer")
+        except VersionConflict:
+            current = get_object_or_404(user_tasks(request), id=pk)
+            context = {
+                "item": current.title,
+                "task_id": current.id,
+                "version": current.version,
+            }
+            return conflict(request, current, "tasks/delete.html", context)
+        if wants_json(request):
+            return JsonResponse({"deleted": item.id})
+        if wants_fragment(request):
+            return HttpResponse(status=204)  # the row is gone
+        return redirect(list_url(task_list_id))
+
+    context = {"item": item.title, "task_id": item.id, "version": item.version}
+    return render_page(request, "tasks/delete.html", context)
+
+
+def clearCompleted(request):
+    """Queue the removal of a list's completed tasks (a background job)."""
+    if request.method != "POST":
+        return HttpResponse(status=405, headers={"Allow": "POST"})
+    task_list = None
+    if request.POST.get("task_list"):
+        task_list = get_object_or_404(
+            TaskList.objects.for_user(request.user), pk=request.POST["task_list"]
+        )
+    job = enqueue(
+        "clear_completed",
+        {
+            "owner_id": request.user.pk if request.user.is_authenticated else None,
+            "task_list_id": task_list.pk if task_list else None,
+        },
+        owner=request.user,
+    )
+    if wants_json(request):
+        return JsonResponse(
+            {**job.as_json(), "url": reverse("job", args=[job.pk])}, status=202
+        )
+    return redirect(list_url(task_list.pk if task_list else None))
+
+
+def jobStatus(request, pk):
+    job = get_object_or_404(Job.objects.for_user(request.user), pk=pk)
+    return JsonResponse(job.as_json())
+
+
+def moveTask(request, pk):
+    """Drag-to-reorder: put the task between its new ``prev`` and ``next``.
+
+    Only the moved row is written; the list is renumbered only once the gap
+    between the two neighbours is too small to split.
+    """
+    if request.method != "POST":
+        return HttpResponse(status=405, headers={"Allow": "POST"})
+    task = get_object_or_404(user_tasks(request), id=pk)
+    siblings = user_tasks(request).filter(task_list=task.task_list_id)
+    neighbours = []
+    for name in ("prev", "next"):
+        neighbour_id = request.POST.get(name)
+        if not neighbour_id:
+            neighbours.append(None)
+        elif not neighbour_id.isdigit():
+            return HttpResponseBadRequest(f"{name} must be a task id")
+        else:
+            neighbours.append(get_object_or_404(siblings, id=neighbour_id).pk)
+
+    def ranks():
+        found = dict(siblings.filter(pk__in=neighbours).values_list("pk", "rank"))
+        return [found.get(pk) for pk in neighbours]
+
+    before, after = ranks()
+    if None not in neighbours and (before, neighbours[0]) >= (after, neighbours[1]):
+        # Lists are ordered by (rank, id); refused before anything is written.
+        return HttpResponseBadRequest("prev must come before next")
+    rank = rank_between(before, after)
+    if rank is None:
+        # A valid gap too small to split: renumber, then split the new one.
+        siblings.rebalance_ranks()
+        rank = rank_between(*ranks())
+    # Like rebalance_ranks: reordering is not a versioned edit.
+    models.QuerySet.update(Task.objects.filter(pk=task.pk), rank=rank)
+    return JsonResponse({"id": task.pk, "rank": rank})
+
+
+def archive(request):
+    """Read-only list of the caller's archived tasks, newest first."""
+    archived = ArchivedTask.objects.for_user(request.user).order_by(
+        "-completed_at", "-id"
+    )
+    query = request.GET.get("q", "").strip()
+    if query:
+        # Scans only this owner's rows, through the (owner, completed_at) index.
+        archived = archived.filter(title__icontains=query)
+    page = Paginator(archived, settings.TASKS_ARCHIVE_PAGE_SIZE).get_page(
+        request.GET.get("page")
+    )
+    context = {"page": page, "query": query}
+    return render(request, "tasks/archive.html", context)
+
+
+def restoreTask(request, pk):
+    if request.method != "POST":
+        return HttpResponse(status=405, headers={"Allow": "POST"})
+    archived = get_object_or_404(ArchivedTask.objects.for_user(request.user), pk=pk)
+    task = archived.restore()
+    return redirect(list_url(task.task_list_id))
+
+
+def taskChanges(request):
+    """Incremental sync: the caller's change-log entries after ``since``.
+
+    A 410 means ``since`` predates the compacted part of the log (or comes
+    from another shard); the client must reload the full list and continue
+    from the returned ``cursor``.
+    """
+    try:
+        since = int(request.GET.get("since", 0))
+        limit = max(1, min(int(request.GET.get("limit", 500)), 1000))
+    except ValueError:
+        return JsonResponse({"error": "since and limit must be integers"}, status=400)
+
+    oldest = TaskChange.objects.order_by("pk").values_list("pk", flat=True).first()
+    latest = TaskChange.latest_cursor()
+    # Ahead of the log: a cursor from the shard the owner was moved away from.
+    if oldest is not None and since < oldest - 1 or since > (latest or 0):
+        return JsonResponse({"error": "cursor expired", "cursor": latest}, status=410)
+
+    changes = list(
+        TaskChange.objects.for_user(request.user)
+        .filter(pk__gt=since)
+        .order_by("pk")[: limit + 1]
+    )
+    more = len(changes) > limit
+    changes = changes[:limit]
+    return JsonResponse(
+        {
+            "changes": [change.as_json() for change in changes],
+            "cursor": changes[-1].pk if changes else since,
+            "more": more,
+        }
+    )
+
+
+async def taskEvents(request):
+    """SSE stream of the caller's task changes (serve it through ASGI).
+
+    Resumes after ``Last-Event-ID`` (sent by EventSource on reconnect) or the
+    ``since`` query parameter. Under WSGI an endless stream would pin a
+    worker thread, so the client is told (204) not to reconnect instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    since = request.headers.get("Last-Event-ID") or request.GET.get("since")
+    try:
+        since = int(since) if since else None
+    except ValueError:
+        return HttpResponseBadRequest("since must be an integer")
 
-    context = {"item": item.title, 'task_id': item.id}
-    return render(request, "tasks/delete.html", context)
+    user = await request.auser()
+    owner_id = user.pk if user.is_authenticated else None
+    response = StreamingHttpResponse(
+        event_stream(owner_id, since), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
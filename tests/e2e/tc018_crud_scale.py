@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+"""
+TC018 - Test de montée en charge CRUD (extension paramétrée de TC016)
+
+Ce test reprend le scénario TC016 à grande échelle, via HTTP et sans navigateur :
+- Compter le nombre initial de tâches (N0)
+- Créer N tâches réparties sur K clients concurrents
+- Vérifier le comptage (N0 + N) ainsi que l'absence de pertes ou de doublons
+- Mesurer la latence et le débit de l'affichage de la liste
+- Modifier quelques tâches en concurrence (lecture, incrément, écriture) et
+  vérifier versions et valeurs finales : aucune mise à jour perdue
+- Supprimer les N tâches créées avec K clients concurrents
+- Vérifier le retour au nombre initial (N0)
+
+Usage:
+    python tests/e2e/tc018_crud_scale.py --tasks 1000 --clients 8 --updates 200
+"""
+
+import argparse
+import html
+import json
+import re
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.cookiejar import CookieJar
+
+# Configuration
+BASE_URL = "http://127.0.0.1:8000"
+TIMEOUT = 30
+TASK_PREFIX = "Scale Task E2E"
+DEFAULT_TASKS = 10
+DEFAULT_CLIENTS = 1
+DEFAULT_LIST_SAMPLES = 5
+DEFAULT_UPDATES = 20
+CONTENDED_TASKS = 3  # peu de tâches pour K clients : conflits garantis
+MAX_UPDATE_ATTEMPTS = 50
+
+ROW_PATTERN = re.compile(
+    r'data-task-id="(?P<id>\d+)"\s+data-task-title="(?P<title>[^"]*)"'
+)
+FORM_TITLE_PATTERN = re.compile(r'name="title"\s+value="(?P<title>[^"]*)"')
+FORM_VERSION_PATTERN = re.compile(r'name="version" value="(?P<version>\d+)"')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Ne suit pas les redirections : le 302 suffit à valider l'action."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class ScaleClient:
+    """Client HTTP avec sa propre session (cookies + jeton CSRF)."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect()
+        )
+        self.csrf_token = None
+
+    def _csrf(self):
+        if self.csrf_token is None:
+            self.list_page()
+            for cookie in self.cookies:
+                if cookie.name == "csrftoken":
+                    self.csrf_token = cookie.value
+        return self.csrf_token
+
+    def _post(self, path, fields):
+        fields = dict(fields, csrfmiddlewaretoken=self._csrf())
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=urllib.parse.urlencode(fields).encode(),
+            headers={"Referer": self.base_url + "/"},
+        )
+        try:
+            with self.opener.open(request, timeout=TIMEOUT) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            if e.code in (301, 302, 303):
+                return e.code
+            raise
+
+    def list_page(self):
+        """
+        Récupère la page de liste.
+
+        Returns:
+            str: HTML de la page
+        """
+        with self.opener.open(self.base_url + "/", timeout=TIMEOUT) as response:
+            return response.read().decode("utf-8")
+
+    def list_rows(self):
+        """
+        Retourne les tâches affichées.
+
+        Returns:
+            list: Couples (id, titre)
+        """
+        return [
+            (int(m.group("id")), html.unescape(m.group("title")))
+            for m in ROW_PATTERN.finditer(self.list_page())
+        ]
+
+    def create_task(self, title):
+        return self._post("/", {"title": title})
+
+    def edit_form(self, task_id):
+        """
+        Lit le formulaire de modification d'une tâche.
+
+        Returns:
+            tuple: (titre, version)
+        """
+        url = f"{self.base_url}/update_task/{task_id}/"
+        with self.opener.open(url, timeout=TIMEOUT) as response:
+            page = response.read().decode("utf-8")
+        title = FORM_TITLE_PATTERN.search(page).group("title")
+        version = FORM_VERSION_PATTERN.search(page).group("version")
+        return html.unescape(title), int(version)
+
+    def update_task(self, task_id, title, version):
+        """Renvoie 302, ou 409 si la tâche a changé depuis ``version``."""
+        try:
+            return self._post(
+                f"/update_task/{task_id}/", {"title": title, "version": version}
+            )
+        except urllib.error.HTTPError as e:
+            if e.code == 409:
+                return e.code
+            raise
+
+    def delete_task(self, task_id):
+        return self._post(f"/delete_task/{task_id}/", {})
+
+
+def latency_summary(samples):
+    """
+    Résume une série de latences (en secondes) en millisecondes.
+
+    Args:
+        samples: Liste des latences mesurées
+
+    Returns:
+        dict: count, mean, p50, p95, p99, max
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+        "p50_ms": round(pct(50), 2),
+        "p95_ms": round(pct(95), 2),
+        "p99_ms": round(pct(99), 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+class TC018TestRunner:
+    """Test runner pour TC018 - CRUD de N tâches avec K clients."""
+
+    def __init__(
+        self,
+        base_url=BASE_URL,
+        tasks=DEFAULT_TASKS,
+        clients=DEFAULT_CLIENTS,
+        list_samples=DEFAULT_LIST_SAMPLES,
+        updates=DEFAULT_UPDATES,
+    ):
+        """
+        Initialise le test runner.
+
+        Args:
+            base_url: URL de base de l'application
+            tasks: Nombre de tâches à créer puis supprimer (N)
+            clients: Nombre de clients concurrents (K)
+            list_samples: Nombre d'affichages de liste à chronométrer
+            updates: Nombre de modifications concurrentes (U)
+        """
+        self.base_url = base_url
+        self.tasks = tasks
+        self.clients = clients
+        self.list_samples = list_samples
+        self.updates = updates
+        self.conflicts = []
+        # Préfixe unique : plusieurs exécutions ne se marchent pas dessus
+        self.run_prefix = f"{TASK_PREFIX} {uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+
+    def _client(self):
+        """Un client (donc une session) par thread."""
+        if not hasattr(self._local, "client"):
+            self._local.client = ScaleClient(self.base_url)
+        return self._local.client
+
+    def _timed(self, action, argument):
+        start = time.perf_counter()
+        try:
+            action(self._client(), argument)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, f"{argument}: {e}"
+
+    def _run_phase(self, name, action, arguments):
+        """
+        Exécute une action pour chaque argument avec K clients concurrents.
+
+        Returns:
+            dict: Latences, débit et erreurs de la phase
+        """
+        print(f"   {name}: {len(arguments)} opérations, {self.clients} clients...")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.clients) as pool:
+            outcomes = list(pool.map(lambda a: self._timed(action, a), arguments))
+        elapsed = time.perf_counter() - start
+
+        errors = [error for _, error in outcomes if error]
+        stats = {
+            "latency": latency_summary([duration for duration, _ in outcomes]),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_ops_s": round(len(arguments) / elapsed, 1) if elapsed else None,
+            "errors": len(errors),
+        }
+        print(
+            f"   → {stats['throughput_ops_s']} ops/s, "
+            f"p95 {stats['latency'].get('p95_ms')} ms, {len(errors)} erreurs"
+        )
+        return stats, errors
+
+    def _increment(self, client, task_id):
+        """
+        Incrémente le compteur « #n » du titre, en réessayant sur conflit.
+
+        Une mise à jour perdue laisserait un compteur inférieur au nombre
+        d'écritures acceptées.
+        """
+        for _ in range(MAX_UPDATE_ATTEMPTS):
+            title, version = client.edit_form(task_id)
+            base, _, counter = title.partition(" #")
+            new_title = f"{base} #{int(counter or 0) + 1}"
+            if client.update_task(task_id, new_title, version) != 409:
+                return
+            self.conflicts.append(task_id)
+        raise RuntimeError(f"{MAX_UPDATE_ATTEMPTS} conflits de suite")
+
+    def _run_titles(self, rows):
+        return [title for _, title in rows if title.startswith(self.run_prefix)]
+
+    def run_test(self):
+        """
+        Exécute le test complet TC018.
+
+        Returns:
+            dict: Résultat du test avec statut et détails
+        """
+        result = {
+            "test_number": "18",
+            "test_name": f"TC018 - CRUD {self.tasks} tâches / {self.clients} clients",
+            "status": "passed",
+            "details": {"tasks": self.tasks, "clients": self.clients},
+            "errors": [],
+        }
+
+        def fail(message):
+            result["status"] = "failed"
+            result["errors"].append(message)
+            print(f"❌ {message}")
+
+        try:
+            observer = ScaleClient(self.base_url)
+
+            # Étape 1: Comptage initial
+            print("\n📝 Étape 1: Comptage initial des tâches")
+            initial_count = len(observer.list_rows())
+            result["details"]["initial_count"] = initial_count
+            print(f"📊 Nombre de tâches initial: {initial_count}")
+
+            # Étape 2: Création concurrente
+            print(f"\n➕ Étape 2: Création de {self.tasks} tâches")
+            titles = [f"{self.run_prefix} {i}" for i in range(1, self.tasks + 1)]
+            stats, errors = self._run_phase(
+                "create", lambda c, t: c.create_task(t), titles
+            )
+            result["details"]["create"] = stats
+            for error in errors[:20]:
+                fail(f"Échec création {error}")
+
+            # Étape 3: Comptage et détection des pertes / doublons
+            print("\n📊 Étape 3: Comptage après création")
+            rows = observer.list_rows()
+            count_after_creation = len(rows)
+            result["details"]["count_after_creation"] = count_after_creation
+            expected_count = initial_count + self.tasks
+            if count_after_creation != expected_count:
+                fail(
+                    f"Comptage après création: "
+                    f"{count_after_creation} != {expected_count}"
+                )
+
+            seen = {}
+            for title in self._run_titles(rows):
+                seen[title] = seen.get(title, 0) + 1
+            lost = [t for t in titles if t not in seen]
+            duplicated = sorted(t for t, n in seen.items() if n > 1)
+            result["details"]["lost_creations"] = len(lost)
+            result["details"]["duplicate_creations"] = len(duplicated)
+            if lost:
+                fail(f"{len(lost)} créations perdues (ex: {lost[:3]})")
+            if duplicated:
+                fail(f"{len(duplicated)} créations en double (ex: {duplicated[:3]})")
+
+            # Étape 4: Latence de l'affichage de la liste
+            print(f"\n📄 Étape 4: Affichage de la liste ({self.list_samples} fois)")
+            stats, errors = self._run_phase(
+                "list", lambda c, _: c.list_page(), list(range(self.list_samples))
+            )
+            result["details"]["list"] = stats
+            for error in errors[:20]:
+                fail(f"Échec affichage {error}")
+
+            ids = [
+                task_id for task_id, title in rows if title.startswith(self.run_prefix)
+            ]
+
+            # Étape 5: Modifications concurrentes des mêmes tâches
+            contended = ids[:CONTENDED_TASKS]
+            print(
+                f"\n✏️  Étape 5: {self.updates} modifications de {len(contended)} tâches"
+            )
+            before = {task_id: observer.edit_form(task_id) for task_id in contended}
+            updates = self.updates if contended else 0
+            targets = [contended[i % len(contended)] for i in range(updates)]
+            stats, errors = self._run_phase("update", self._increment, targets)
+            result["details"]["update"] = stats
+            result["details"]["update_conflicts"] = len(self.conflicts)
+            for error in errors[:20]:
+                fail(f"Échec modification {error}")
+
+            lost_updates = 0
+            for task_id in contended:
+                # Seules les modifications abouties comptent
+                done = targets.count(task_id) - sum(
+                    error.startswith(f"{task_id}:") for error in errors
+                )
+                title, version = observer.edit_form(task_id)
+                counter = int(title.partition(" #")[2] or 0)
+                if version != before[task_id][1] + done:
+                    fail(
+                        f"Tâche {task_id}: version {version} != "
+                        f"{before[task_id][1]} + {done}"
+                    )
+                if counter != done:
+                    lost_updates += done - counter
+                    fail(f"Tâche {task_id}: compteur {counter} != {done}")
+            result["details"]["lost_updates"] = lost_updates
+
+            # Étape 6: Suppression concurrente
+            print(f"\n🗑️  Étape 6: Suppression de {self.tasks} tâches")
+            stats, errors = self._run_phase(
+                "delete", lambda c, i: c.delete_task(i), ids
+            )
+            result["details"]["delete"] = stats
+            for error in errors[:20]:
+                fail(f"Échec suppression {error}")
+
+            # Étape 7: Retour au comptage initial
+            print("\n📊 Étape 7: Comptage final")
+            rows = observer.list_rows()
+            final_count = len(rows)
+            result["details"]["final_count"] = final_count
+            leftovers = self._run_titles(rows)
+            result["details"]["leftover_tasks"] = len(leftovers)
+            if final_count != initial_count:
+                fail(f"Comptage final: {final_count} != {initial_count}")
+            if leftovers:
+                fail(f"{len(leftovers)} tâches du test non supprimées")
+
+            if result["status"] == "passed":
+                print(
+                    "✅ Comptages corrects, aucune perte ni doublon, "
+                    "aucune mise à jour perdue"
+                )
+
+        except Exception as e:
+            result["status"] = "error"
+            result["errors"].append(str(e))
+            print(f"\n❌ Erreur critique: {e}")
+            print(f"💡 Assurez-vous que le serveur Django tourne sur {self.base_url}")
+
+        return result
+
+
+def export_results_to_json(result, filename="result_test_scale.json"):
+    """
+    Exporte les résultats du test au format JSON.
+
+    Args:
+        result: Dictionnaire contenant les résultats du test
+        filename: Nom du fichier JSON de sortie
+    """
+    output = {
+        "timestamp": datetime.now().isoformat(),
+        "total_tests": 1,
+        "summary": {
+            "passed": 1 if result["status"] == "passed" else 0,
+            "failed": 1 if result["status"] == "failed" else 0,
+            "errors": 1 if result["status"] == "error" else 0,
+        },
+        "tests": [
+            {
+                "test_number": result["test_number"],
+                "test_name": result["test_name"],
+                "test_class": "HttpE2E",
+                "test_method": "tc018_crud_scale",
+                "status": result["status"],
+                "error_message": "\n".join(result["errors"])
+                if result["errors"]
+                else None,
+                "description": "Test E2E de montée en charge CRUD "
+                "(N tâches, K clients concurrents)",
+                "details": result["details"],
+            }
+        ],
+    }
+
+    try:
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2, ensure_ascii=False)
+        print(f"\n✓ Résultats exportés vers {filename}")
+    except Exception as e:
+        print(f"\n⚠️  Erreur lors de l'export JSON: {e}")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="TC018 - CRUD à grande échelle")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument(
+        "--tasks",
+        type=int,
+        default=DEFAULT_TASKS,
+        help="Nombre de tâches N (10 à 10000)",
+    )
+    parser.add_argument(
+        "--clients",
+        type=int,
+        default=DEFAULT_CLIENTS,
+        help="Nombre de clients concurrents K",
+    )
+    parser.add_argument("--list-samples", type=int, default=DEFAULT_LIST_SAMPLES)
+    parser.add_argument(
+        "--updates",
+        type=int,
+        default=DEFAULT_UPDATES,
+        help="Nombre de modifications concurrentes U",
+    )
+    parser.add_argument("--output", default="result_test_scale.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Point d'entrée principal."""
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    print("=" * 70)
+    print(
+        f"TC018 - Test End-to-End: CRUD de {args.tasks} tâches, {args.clients} clients"
+    )
+    print("=" * 70)
+
+    runner = TC018TestRunner(
+        base_url=args.base_url,
+        tasks=args.tasks,
+        clients=max(1, args.clients),
+        list_samples=args.list_samples,
+        updates=args.updates,
+    )
+    result = runner.run_test()
+
+    print("\n" + "=" * 70)
+    print("RÉSULTAT DU TEST")
+    print("=" * 70)
+    print(f"Test: {result['test_name']}")
+    print(f"Statut: {result['status'].upper()}")
+    print("\nDétails:")
+    for key, value in result["details"].items():
+        print(f"  - {key}: {value}")
+
+    if result["errors"]:
+        print(f"\n❌ Erreurs ({len(result['errors'])}):")
+        for error in result["errors"]:
+            print(f"  - {error}")
+    else:
+        print("\n✅ Aucune erreur")
+    print("=" * 70)
+
+    export_results_to_json(result, args.output)
+    return 0 if result["status"] == "passed" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark : créations de tâches par seconde, avec et sans regroupement
+des écritures (TASKS_COALESCE_CREATES), pour 1, 8 et 64 clients concurrents.
+
+Le chemin d'écriture est appelé directement (sans HTTP) sur une base SQLite
+temporaire, pour isoler le coût des transactions.
+
+Usage:
+    python tests/perf/bench_coalescing.py --creates 2000 --clients 1 8 64
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
+
+
+def setup_database(path):
+    """Pointe Django vers une base temporaire et applique les migrations."""
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = path
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+
+
+def run(mode, clients, creates):
+    """
+    Crée ``creates`` tâches réparties sur ``clients`` threads.
+
+    Returns:
+        tuple: (créations par seconde, nombre d'erreurs)
+    """
+    from django.conf import settings
+    from django.db import connection
+
+    from tasks.coalesce import create_task
+    from tasks.models import Task
+
+    settings.TASKS_COALESCE_CREATES = mode == "coalesced"
+
+    def worker(i):
+        try:
+            create_task(Task(title=f"bench {mode} {clients} {i}"))
+            return 0
+        except Exception:
+            return 1
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        errors = sum(pool.map(worker, range(creates)))
+    elapsed = time.perf_counter() - start
+    return (creates - errors) / elapsed, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--creates", type=int, default=2000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_database(str(Path(tmp) / "bench.sqlite3"))
+
+        print(f"{'clients':>8} {'mode':>10} {'creates/s':>10} {'errors':>7}")
+        for clients in args.clients:
+            for mode in ("direct", "coalesced"):
+                rate, errors = run(mode, clients, args.creates)
+                print(f"{clients:>8} {mode:>10} {rate:>10.0f} {errors:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark : lecture et rendu de la liste des tâches (10k, 100k lignes).
+
+Compare les lignes projetées de ``tasks.rows`` (values_list + __slots__,
+liens construits à partir d'un préfixe) aux instances complètes du modèle
+avec prefetch des tags, rendues par la ligne d'origine (``{% url %}`` et
+filtre ``yesno`` à chaque ligne). Mesure le temps et le pic de mémoire.
+
+Usage:
+    python tests/perf/bench_list.py --sizes 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
+
+# La ligne telle qu'elle était avant tasks.rows, pour la comparaison.
+LEGACY = {
+    "{% if task.complete %}true{% else %}false{% endif %}": (
+        "{{ task.complete|yesno:'true,false' }}"
+    ),
+    "{{ task.update_url }}": "{% url 'update_task' task.id %}",
+    "{{ task.delete_url }}": "{% url 'delete' task.id %}",
+    "{% for task_tag in task.tags %}": "{% for task_tag in task.tags.all %}",
+}
+
+
+def setup_database(path):
+    """Pointe Django vers une base temporaire et applique les migrations."""
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = path
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+
+
+def fill(count):
+    """Ajoute ``count`` tâches, une sur trois avec deux tags."""
+    from tasks.models import Tag, Task, TaskTag
+
+    tags = [Tag.objects.get_or_create(name=name)[0] for name in ("maison", "urgent")]
+    for start in range(0, count, 5000):
+        tasks = Task.objects.bulk_create(
+            [Task(title=f"bench {i}") for i in range(start, min(count, start + 5000))]
+        )
+        TaskTag.objects.bulk_create(
+            TaskTag(task=task, tag=tag) for task in tasks[::3] for tag in tags
+        )
+
+
+def templates():
+    """(gabarit des lignes projetées, gabarit d'origine)"""
+    from django.template import engines
+    from django.template.loader import get_template
+
+    engine = engines["django"]
+    source = get_template("tasks/task_row.html").template.source
+    legacy = source
+    for new, old in LEGACY.items():
+        assert new in legacy, new
+        legacy = legacy.replace(new, old)
+    loop = "{%% for task in tasks %%}%s{%% endfor %%}"
+    return engine.from_string(loop % source), engine.from_string(loop % legacy)
+
+
+def measure(fetch, template, context):
+    """
+    Mesure le temps sans tracemalloc (qui le fausse), puis le pic à part.
+
+    Returns:
+        tuple: (ms de lecture, ms de rendu, Mo au pic)
+    """
+    start = time.perf_counter()
+    tasks = fetch()
+    fetched = time.perf_counter()
+    template.render({"tasks": tasks, **context})
+    rendered = time.perf_counter()
+    del tasks
+
+    tracemalloc.start()
+    template.render({"tasks": fetch(), **context})
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return (
+        (fetched - start) * 1000,
+        (rendered - fetched) * 1000,
+        peak / 2**20,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_database(str(Path(tmp) / "bench.sqlite3"))
+        from tasks.models import Task
+        from tasks.rows import task_rows
+        from tasks.views import due_context, tag_chips
+
+        rows_template, legacy_template = templates()
+        context = due_context()
+        queryset = Task.objects.filter(task_list=None).order_by("rank", "id")
+        paths = {
+            "rows": (lambda: task_rows(queryset), rows_template),
+            "models": (
+                lambda: list(queryset.prefetch_related(tag_chips())),
+                legacy_template,
+            ),
+        }
+        print(
+            f"{'tasks':>8} {'path':>7} {'fetch ms':>9} {'render ms':>10} {'peak MB':>8}"
+        )
+        total = 0
+        for size in sorted(args.sizes):
+            fill(size - total)
+            total = size
+            for name, (fetch, template) in paths.items():
+                fetch_ms, render_ms, peak = measure(fetch, template, context)
+                print(
+                    f"{size:>8} {name:>7} {fetch_ms:>9.0f} {render_ms:>10.0f} "
+                    f"{peak:>8.1f}"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
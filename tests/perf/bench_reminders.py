@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark : coût d'un passage du planificateur de rappels selon la taille
+de la table (10k, 100k, 1M tâches avec échéance).
+
+Compare le balayage par plage de l'index partiel ``task_due_reminder``
+(ReminderScheduler.scan) à une lecture complète des tâches à échéance.
+Le premier doit rester constant quand la table grossit.
+
+Usage:
+    python tests/perf/bench_reminders.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
+
+
+def setup_database(path):
+    """Pointe Django vers une base temporaire et applique les migrations."""
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = path
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+
+
+def fill(count, now):
+    """
+    Ajoute ``count`` tâches dont l'échéance est répartie sur un an.
+
+    Insertion SQL directe : seul le volume de la table compte ici.
+    """
+    from django.db import connection, transaction
+
+    rows = (
+        (
+            f"bench {i}",
+            random.random() < 0.3,
+            now,
+            1,
+            now + timedelta(seconds=random.uniform(-86400, 365 * 86400)),
+        )
+        for i in range(count)
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO tasks_task (title, complete, created, version, due_at) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def measure(now, repeat=20):
+    """
+    Returns:
+        tuple: (ms par scan indexé, ms par lecture complète, rappels trouvés)
+    """
+    from tasks.models import Task
+    from tasks.reminders import MemoryBackend, ReminderScheduler
+
+    scheduler = ReminderScheduler(backend=MemoryBackend())
+    start = time.perf_counter()
+    for _ in range(repeat):
+        scheduler.scan(now)
+    indexed = (time.perf_counter() - start) / repeat * 1000
+
+    horizon = now + scheduler.lookahead
+    start = time.perf_counter()
+    naive = [
+        pk
+        for pk, due_at, complete in Task.objects.values_list("pk", "due_at", "complete")
+        if due_at is not None and due_at <= horizon and not complete
+    ]
+    full = (time.perf_counter() - start) * 1000
+    return indexed, full, len(naive)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_database(str(Path(tmp) / "bench.sqlite3"))
+        from django.utils import timezone
+
+        now = timezone.now()
+        print(f"{'tasks':>10} {'scan ms':>9} {'full ms':>9} {'due':>7}")
+        total = 0
+        for size in sorted(args.sizes):
+            fill(size - total, now)
+            total = size
+            indexed, full, due = measure(now)
+            print(f"{size:>10} {indexed:>9.2f} {full:>9.0f} {due:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark : rendu de list.html par le moteur Django et par Jinja2.
+
+Les lignes sont construites en mémoire (``TaskRow``), sans base de données :
+seul le coût du moteur de gabarits est mesuré, pour 1k et 10k tâches.
+Nécessite le paquet jinja2.
+
+Usage:
+    python tests/perf/bench_templates.py --sizes 1000 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
+
+
+def rows(count, now):
+    """``count`` lignes : un tiers avec deux tags, un quart avec échéance."""
+    from tasks.rows import RowURLs, TagChip, TaskRow
+
+    urls = RowURLs()
+    tags = [TagChip(1, "maison"), TagChip(2, "urgent")]
+    return [
+        TaskRow(
+            i,
+            f"Tâche n°{i} <à faire>",
+            i % 2 == 0,
+            1,
+            now + timedelta(hours=i % 96 - 48) if i % 4 == 0 else None,
+            urls,
+            tags if i % 3 == 0 else (),
+        )
+        for i in range(count)
+    ]
+
+
+def measure(engine, context, request, repeat=5):
+    """
+    Returns:
+        tuple: (ms par rendu, taille du HTML en octets)
+    """
+    from django.template import engines
+
+    template = engines[engine].get_template("tasks/list.html")
+    html = template.render(context, request)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        template.render(context, request)
+    return (time.perf_counter() - start) / repeat * 1000, len(html.encode())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    args = parser.parse_args(argv)
+
+    import django
+
+    django.setup()
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+
+    from tasks.forms import TaskForm
+    from tasks.views import due_context
+
+    request = RequestFactory().get("/")
+    request.user = AnonymousUser()
+    print(f"{'tasks':>8} {'django ms':>10} {'jinja2 ms':>10} {'speed-up':>9}")
+    for size in args.sizes:
+        context = {"form": TaskForm(), "cursor": 0, **due_context()}
+        context["tasks"] = rows(size, context["now"])
+        django_ms, django_size = measure("django", context, request)
+        jinja2_ms, jinja2_size = measure("jinja2", context, request)
+        assert django_size == jinja2_size, "les deux rendus diffèrent"
+        print(
+            f"{size:>8} {django_ms:>10.1f} {jinja2_ms:>10.1f} "
+            f"{django_ms / jinja2_ms:>8.1f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,9 @@
 ASGI config for todo project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+With ``TASKS_WARMUP`` on, the worker is warmed up (todo.warmup) on import.
+The live task stream (``/events/``) is only served through this entry point,
+e.g. ``uvicorn todo.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -9,8 +12,15 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
+from todo.warmup import warm_up
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
 
 application = get_asgi_application()
+
+if settings.TASKS_WARMUP:
+    # Before the server hands this worker its first request.
+    warm_up()
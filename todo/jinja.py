@@ -0,0 +1,51 @@
+"""Jinja2 environment of the task pages (``TASKS_TEMPLATE_ENGINE = "jinja2"``).
+
+The Jinja2 versions of the templates live in ``tasks/jinja2/`` and render
+the same markup as their Django counterparts: ``url()`` stands for
+``{% url %}``, ``date`` for the filter of the same name, the backend
+provides ``csrf_input`` and the ``APP_VERSION`` context processor. Every
+printed value is escaped by ``finalize()``, as the Django engine would.
+"""
+
+from django.template.defaultfilters import date as date_filter
+from django.urls import reverse
+from django.utils.timezone import template_localtime
+from jinja2 import Environment, Undefined
+from markupsafe import escape
+
+
+def url(name, *args):
+    return reverse(name, args=args)
+
+
+def date(value, arg=None):
+    # Django converts to local time before its date filter; so do we.
+    return date_filter(template_localtime(value), arg)
+
+
+def finalize(value):
+    """Escape a printed value the way Django does.
+
+    Stands in for Jinja2's autoescaping, turned off below: markupsafe
+    writes quotes as ``&#34;`` / ``&#39;``, Django as ``&quot;`` /
+    ``&#x27;``, and escaping once here spares a second pass.
+    """
+    if hasattr(value, "__html__"):
+        return value.__html__()
+    if type(value) is int:
+        return value
+    escaped = str(escape(value))
+    return escaped.replace("&#34;", "&quot;").replace("&#39;", "&#x27;")
+
+
+def environment(**options):
+    options.update(
+        autoescape=False,
+        finalize=finalize,
+        keep_trailing_newline=True,
+        undefined=Undefined,
+    )
+    env = Environment(**options)
+    env.globals["url"] = url
+    env.filters["date"] = date
+    return env
@@ -0,0 +1,103 @@
+"""Profile real requests under ``cProfile``, on demand (``TASKS_PROFILE``).
+
+With ``TASKS_PROFILE`` on, ``ProfilingMiddleware`` profiles a request when
+a staff user sends ``X-Profile: 1``, and a random
+``TASKS_PROFILE_SAMPLE_RATE`` fraction of all requests. Each profile is
+saved as a pstats file in ``TASKS_PROFILE_DIR`` (the newest
+``TASKS_PROFILE_KEEP`` are kept) and listed on the admin's profiles page,
+where staff download them for ``python -m pstats`` or snakeviz.
+
+Off, the middleware is not even loaded. Under ASGI requests pass through
+unprofiled: the view runs in another thread than the middleware.
+"""
+
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.deprecation import MiddlewareMixin
+
+HEADER = "X-Profile"
+NAME_RE = re.compile(r"^[\w.-]+\.prof$")
+# cProfile allows one active profiler per process (Python 3.12+ raises
+# ValueError for a second); concurrent requests go unprofiled instead.
+_active = threading.Lock()
+
+
+def profile_dir():
+    return Path(settings.TASKS_PROFILE_DIR)
+
+
+def saved_profiles():
+    """``[(name, size, mtime), ...]`` of the saved profiles, newest first."""
+    try:
+        entries = [e for e in os.scandir(profile_dir()) if NAME_RE.match(e.name)]
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue  # pruned by another worker since the listing
+        profiles.append((entry.name, stat.st_size, stat.st_mtime))
+    profiles.sort(key=lambda profile: profile[2], reverse=True)
+    return profiles
+
+
+def profile_path(name):
+    """Path of the saved profile ``name``, or None for any other file."""
+    path = profile_dir() / name
+    if not NAME_RE.match(name) or not path.is_file():
+        return None
+    return path
+
+
+def save(profiler, request, elapsed):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    match = getattr(request, "resolver_match", None)
+    view = match.url_name if match and match.url_name else "unresolved"
+    name = (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{view}-"
+        f"{elapsed * 1000:.0f}ms-{os.getpid()}-{random.randrange(16**4):04x}.prof"
+    )
+    profiler.dump_stats(directory / name)
+    for old, _, _ in saved_profiles()[settings.TASKS_PROFILE_KEEP :]:
+        (directory / old).unlink(missing_ok=True)
+    return name
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """Goes right after ``AuthenticationMiddleware`` (staff are users)."""
+
+    def __init__(self, get_response):
+        if not settings.TASKS_PROFILE:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def wanted(self, request):
+        if random.random() < settings.TASKS_PROFILE_SAMPLE_RATE:
+            return True
+        return request.headers.get(HEADER) == "1" and request.user.is_staff
+
+    def __call__(self, request):
+        wanted = not self.async_mode and self.wanted(request)
+        if not wanted or not _active.acquire(blocking=False):
+            return super().__call__(request)
+        try:
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            response = profiler.runcall(self.get_response, request)
+            name = save(profiler, request, time.perf_counter() - start)
+        finally:
+            _active.release()
+        if request.user.is_staff:
+            response[HEADER] = name
+        return response
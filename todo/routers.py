@@ -0,0 +1,79 @@
+"""Send the read-only task pages to the ``replica`` database alias.
+
+``ReplicaRoutingMiddleware`` decides per request: a GET/HEAD of one of
+``TASKS_REPLICA_VIEWS`` reads from the replica, unless the client wrote
+recently (read-your-writes cookie) or the replica is too far behind.
+Everything else, and every write, stays on ``default``.
+"""
+
+import os
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+REPLICA = "replica"
+PIN_COOKIE = "pin_primary"
+
+_read_alias = ContextVar("read_alias", default=None)
+
+
+def replica_lag():
+    """Seconds since the replica file was last refreshed (inf if missing)."""
+    # settings_dict, not settings.DATABASES: under test the replica mirrors
+    # the test database instead of pointing at the replica file.
+    if REPLICA not in connections:
+        return float("inf")
+    try:
+        return time.time() - os.path.getmtime(
+            connections[REPLICA].settings_dict["NAME"]
+        )
+    except OSError:
+        return float("inf")
+
+
+class ReplicaRouter:
+    route_app_labels = {"tasks"}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in self.route_app_labels:
+            return _read_alias.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a file copy of default, never migrated itself.
+        return db != REPLICA
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in ("GET", "HEAD")
+            and request.resolver_match.url_name in settings.TASKS_REPLICA_VIEWS
+            and PIN_COOKIE not in request.COOKIES
+            and replica_lag() <= settings.TASKS_REPLICA_MAX_LAG
+        ):
+            request._read_alias_token = _read_alias.set(REPLICA)
+
+    def process_response(self, request, response):
+        token = getattr(request, "_read_alias_token", None)
+        if token is not None:
+            _read_alias.reset(token)
+        if request.method not in ("GET", "HEAD", "OPTIONS"):
+            # Read your own writes: stay on the primary for a little while.
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.TASKS_REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
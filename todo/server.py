@@ -0,0 +1,355 @@
+"""Pre-forking WSGI server built on the standard library (``manage.py serve``).
+
+The master binds one listening socket (``SO_REUSEPORT`` where available, so
+a new server can bind the port while an old one drains) and forks worker
+processes that all accept on it. Each worker serves connections from a
+thread pool and speaks HTTP/1.1 with keep-alive.
+
+Signals to the master:
+
+* ``SIGHUP``: graceful reload. A new set of workers is forked, then the old
+  ones stop accepting, finish their requests and exit. Modules the master
+  never imported (views, templates, ...) are loaded fresh by the new
+  workers; changes to settings or models need a restart.
+* ``SIGTERM`` / ``SIGINT``: graceful shutdown, workers still busy after
+  ``graceful_timeout`` seconds are killed.
+
+A worker leaves by itself after about ``max_requests`` requests (with a
+little jitter so they do not all recycle together) and is replaced.
+"""
+
+import errno
+import http.server
+import io
+import logging
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class WSGIRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Runs every request of one connection through the WSGI application."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        self.timeout = self.server.keepalive
+        super().setup()
+
+    def handle_one_request(self):
+        try:
+            self.raw_requestline = self.rfile.readline(65537)
+        except (TimeoutError, ConnectionError):
+            self.close_connection = True
+            return
+        if len(self.raw_requestline) > 65536:
+            self.send_error(414)
+            return
+        if not self.raw_requestline:
+            self.close_connection = True
+            return
+        if not self.parse_request():
+            return
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            self.send_error(411, "Chunked request bodies are not supported")
+            self.close_connection = True
+            return
+        length = self.headers.get("Content-Length") or "0"
+        if not length.isdigit():
+            self.send_error(400, "Bad Content-Length")
+            self.close_connection = True
+            return
+        if self.server.max_body is not None and int(length) > self.server.max_body:
+            # The body is read into memory: refuse it before reading it.
+            self.send_error(413)
+            self.close_connection = True
+            return
+        if not self.server.admit():
+            self.close_connection = True  # last one: say so in the response
+        self.run_wsgi()
+        self.wfile.flush()
+
+    def get_environ(self):
+        path, _, query = self.path.partition("?")
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        host, port = self.server.address
+        environ = {
+            "REQUEST_METHOD": self.command,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": unquote(path, "iso-8859-1"),
+            "QUERY_STRING": query,
+            "CONTENT_TYPE": self.headers.get("Content-Type", ""),
+            "CONTENT_LENGTH": str(len(body)),
+            "SERVER_NAME": host,
+            "SERVER_PORT": str(port),
+            "SERVER_PROTOCOL": self.request_version,
+            "REMOTE_ADDR": self.client_address[0],
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in self.headers.items():
+            key = "HTTP_" + name.upper().replace("-", "_")
+            if key in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH") or "_" in name:
+                continue  # no header smuggling through underscores
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    def run_wsgi(self):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and "sent" in response:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["status"], response["headers"] = status, headers
+            return write
+
+        def send_headers():
+            code, _, reason = response["status"].partition(" ")
+            self.send_response(int(code), reason)
+            names = {name.lower() for name, _ in response["headers"]}
+            response["chunked"] = (
+                "content-length" not in names
+                and self.request_version == "HTTP/1.1"
+                and self.command != "HEAD"
+                and int(code) not in (204, 304)
+            )
+            for name, value in response["headers"]:
+                if name.lower() == "connection" and value.lower() == "close":
+                    self.close_connection = True
+                self.send_header(name, value)
+            if response["chunked"]:
+                self.send_header("Transfer-Encoding", "chunked")
+            elif "content-length" not in names:
+                self.close_connection = True
+            if self.close_connection:
+                self.send_header("Connection", "close")
+            self.end_headers()
+            response["sent"] = True
+
+        def write(data):
+            if "sent" not in response:
+                send_headers()
+            if not data or self.command == "HEAD":
+                return
+            if response["chunked"]:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            else:
+                self.wfile.write(data)
+
+        result = self.server.application(self.get_environ(), start_response)
+        try:
+            for data in result:
+                write(data)
+            if "sent" not in response:
+                send_headers()
+            if response["chunked"]:
+                self.wfile.write(b"0\r\n\r\n")
+        finally:
+            # Fires request_finished: Django closes its DB connections.
+            if hasattr(result, "close"):
+                result.close()
+
+    def log_message(self, format, *args):
+        if self.server.access_log:
+            super().log_message(format, *args)
+
+
+class Worker:
+    """One forked process: accepts connections, serves them from a pool."""
+
+    def __init__(self, sock, app, threads, keepalive, max_requests, access_log):
+        self.sock = sock
+        self.app = app
+        self.threads = threads
+        self.keepalive = keepalive
+        self.max_requests = max_requests + random.randint(0, max_requests // 10)
+        self.access_log = access_log
+        self.max_body = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        self.address = sock.getsockname()[:2]
+        self.stopping = False
+        self.served = 0
+        self._lock = threading.Lock()
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def admit(self):
+        """Count a request; False once the worker is winding down."""
+        with self._lock:
+            self.served += 1
+            if self.max_requests and self.served >= self.max_requests:
+                self.stopping = True
+            return not self.stopping
+
+    def serve(self, conn, address, slots):
+        try:
+            WSGIRequestHandler(conn, address, self)
+        except (ConnectionError, TimeoutError):
+            pass  # the client went away mid-request
+        except Exception:
+            logger.exception("Error serving %s", address[0])
+        finally:
+            conn.close()
+            slots.release()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        self.application = import_string(self.app)
+        # Never take more connections than there are threads to serve them:
+        # the rest wait in the shared backlog for a less busy worker.
+        slots = threading.BoundedSemaphore(self.threads)
+        with ThreadPoolExecutor(self.threads, thread_name_prefix="http") as pool:
+            while not self.stopping:
+                if not slots.acquire(timeout=0.5):
+                    continue
+                try:
+                    ready, _, _ = select.select([self.sock], [], [], 0.5)
+                    conn, address = self.sock.accept() if ready else (None, None)
+                except (BlockingIOError, InterruptedError):
+                    conn = None  # another worker took it
+                if conn is None:
+                    slots.release()
+                    continue
+                conn.setblocking(True)
+                pool.submit(self.serve, conn, address, slots)
+        return 0
+
+
+class Arbiter:
+    """The master process: keeps ``workers`` workers alive."""
+
+    def __init__(
+        self,
+        app,
+        host,
+        port,
+        workers,
+        threads,
+        keepalive,
+        max_requests,
+        graceful_timeout,
+        access_log=False,
+        log=print,
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.worker_options = (threads, keepalive, max_requests, access_log)
+        self.graceful_timeout = graceful_timeout
+        self.log = log
+        self.workers = {}  # pid -> generation
+        self.generation = 0
+        self.retiring = {}  # pid -> kill deadline
+        self.signals = []
+
+    def bind(self):
+        sock = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(1024)
+        sock.setblocking(False)
+        return sock
+
+    def spawn(self):
+        # Forked children must not share the master's database handles.
+        connections.close_all()
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = self.generation
+            return
+        code = 1
+        try:
+            code = Worker(self.sock, self.app, *self.worker_options).run()
+        finally:
+            os._exit(code)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            generation = self.workers.pop(pid, None)
+            self.retiring.pop(pid, None)
+            if generation == self.generation:
+                self.log(f"Worker {pid} exited ({os.waitstatus_to_exitcode(status)}).")
+
+    def retire(self, pids):
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in pids:
+            self.retiring[pid] = deadline
+            self.kill(pid, signal.SIGTERM)
+
+    def kill(self, pid, sig):
+        try:
+            os.kill(pid, sig)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+
+    def run(self):
+        self.sock = self.bind()
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda signum, frame: self.signals.append(signum))
+        self.log(
+            f"Serving {self.app} on http://{self.host}:{self.port}/ with "
+            f"{self.worker_count} worker(s) x {self.worker_options[0]} thread(s)."
+        )
+        try:
+            while True:
+                self.reap()
+                while self.signals:
+                    signum = self.signals.pop(0)
+                    if signum == signal.SIGHUP:
+                        self.log("Reloading: replacing the workers.")
+                        self.generation += 1
+                        self.retire(list(self.workers))
+                    else:
+                        self.log("Shutting down.")
+                        self.retire(list(self.workers))
+                        return self.wait_retired()
+                current = [
+                    pid for pid, gen in self.workers.items() if gen == self.generation
+                ]
+                for _ in range(self.worker_count - len(current)):
+                    self.spawn()
+                for pid, deadline in list(self.retiring.items()):
+                    if time.monotonic() > deadline:
+                        self.kill(pid, signal.SIGKILL)
+                time.sleep(0.1)
+        finally:
+            self.sock.close()
+
+    def wait_retired(self):
+        while self.workers:
+            self.reap()
+            for pid, deadline in list(self.retiring.items()):
+                if time.monotonic() > deadline:
+                    self.kill(pid, signal.SIGKILL)
+            time.sleep(0.05)
+        return 0
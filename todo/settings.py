@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,11 +42,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "todo.slowlog.SlowQueryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "todo.profiling.ProfilingMiddleware",
+    "todo.throttle.AdmissionMiddleware",
+    "todo.sharding.ShardRoutingMiddleware",
+    "todo.routers.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -79,9 +85,23 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
-    }
+    },
+    # Read replica: a copy of default refreshed by `manage.py refresh_replica`.
+    # Until that file exists (or while it is stale) reads stay on default.
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.replica.sqlite3",
+        "TEST": {"MIRROR": "default"},
+    },
+    # A second task shard, only used once listed in TASKS_SHARDS.
+    "shard1": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.shard1.sqlite3",
+    },
 }
 
+DATABASE_ROUTERS = ["todo.sharding.ShardRouter", "todo.routers.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -129,13 +149,154 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 VERSION = "1.4.1"
 
+# Tasks created before per-user accounts are handed to the user with this
+# username by migration 0003; left unset, they stay unowned, i.e. the shared
+# list shown to anonymous visitors
+TASKS_DEFAULT_OWNER = None
+
+# Soft-deleted tasks are hard-deleted by `manage.py purge_deleted_tasks`
+TASKS_PURGE_AFTER_DAYS = 7
+TASKS_PURGE_BATCH_SIZE = 500
+TASKS_PURGE_PAUSE = 0.2  # seconds between batches
+
+# `manage.py compact_task_changes` drops sync log entries older than this
+TASKS_CHANGE_LOG_RETENTION_DAYS = 30
+
+# Server-Sent Events (/events/): how often each worker tails the change log,
+# the keep-alive period and the client reconnect delay
+TASKS_EVENTS_POLL_INTERVAL = 1.0  # seconds
+TASKS_EVENTS_HEARTBEAT = 15.0  # seconds
+TASKS_EVENTS_RETRY_MS = 3000
+
+# Read replica routing (todo.routers): read-only views served from "replica"
+# while it is at most TASKS_REPLICA_MAX_LAG seconds old; a client that wrote
+# stays on the primary long enough to see its own writes
+TASKS_REPLICA_VIEWS = ["list", "task_list", "lists", "update_task", "delete"]
+TASKS_REPLICA_MAX_LAG = 5  # seconds
+TASKS_REPLICA_STICKY_SECONDS = TASKS_REPLICA_MAX_LAG + 2
+TASKS_REPLICA_REFRESH_INTERVAL = 2  # seconds, for refresh_replica --every
+
+# Write coalescing (tasks.coalesce): batch task creations arriving within a
+# few milliseconds into one bulk_create transaction. Opt-in.
+TASKS_COALESCE_CREATES = False
+TASKS_COALESCE_WINDOW_MS = 5
+TASKS_COALESCE_MAX_BATCH = 200
+TASKS_COALESCE_TIMEOUT = 30  # seconds a request waits for its batch
+
+# Background jobs (tasks.jobs), executed by `manage.py run_jobs`: worker
+# threads per process, seconds between polls when idle, tries per job (retries
+# back off exponentially from TASKS_JOBS_RETRY_BACKOFF seconds) and how long a
+# running job may go without a heartbeat from its worker (sent every quarter
+# of that delay) before it is handed to another worker
+TASKS_JOBS_WORKERS = 2
+TASKS_JOBS_POLL_INTERVAL = 1.0
+TASKS_JOBS_MAX_ATTEMPTS = 3
+TASKS_JOBS_RETRY_BACKOFF = 5
+TASKS_JOBS_STALE_AFTER = 600
+
+# Due dates: tasks due within TASKS_UPCOMING_HOURS are flagged as upcoming.
+# `manage.py send_reminders` scans TASKS_REMINDER_LOOKAHEAD seconds ahead
+# every TASKS_REMINDER_RESCAN seconds and delivers through the backend
+# (tasks.reminders.ConsoleBackend, FileBackend or MemoryBackend)
+TASKS_UPCOMING_HOURS = 24
+TASKS_REMINDER_BACKEND = "tasks.reminders.ConsoleBackend"
+TASKS_REMINDER_OPTIONS = {}
+TASKS_REMINDER_LOOKAHEAD = 300
+TASKS_REMINDER_RESCAN = 60
+TASKS_REMINDER_BATCH_SIZE = 1000
+
+# Warm-up (todo.warmup): resolve URLs, compile these templates and load the
+# ORM and database backends when a WSGI/ASGI worker starts, before it takes
+# traffic (connections are per request, so none is opened ahead). Opt-in;
+# `manage.py profile_startup` shows what it saves on the first request.
+TASKS_WARMUP = False
+TASKS_WARMUP_TEMPLATES = [
+    "tasks/list.html",
+    "tasks/task_row.html",
+    "tasks/lists.html",
+    "tasks/update_task.html",
+    "tasks/delete.html",
+]
 
-
-
-
-
-
-
-
-
-
+# `manage.py serve` (todo.server): worker processes (None: one per CPU),
+# threads per worker, keep-alive timeout, requests before a worker is
+# recycled (0: never) and seconds workers get to finish on reload/shutdown
+TASKS_SERVE_WORKERS = None
+TASKS_SERVE_THREADS = 8
+TASKS_SERVE_KEEPALIVE = 5
+TASKS_SERVE_MAX_REQUESTS = 10000
+TASKS_SERVE_GRACEFUL_TIMEOUT = 30
+
+# Archiving (tasks.archive): tasks completed more than TASKS_ARCHIVE_AFTER_DAYS
+# ago move to the archive table (`manage.py archive_completed_tasks` or the
+# archive_completed_tasks job); the archive page lists them
+# TASKS_ARCHIVE_PAGE_SIZE at a time
+TASKS_ARCHIVE_AFTER_DAYS = 30
+TASKS_ARCHIVE_BATCH_SIZE = 500
+TASKS_ARCHIVE_PAUSE = 0.2  # seconds between batches
+TASKS_ARCHIVE_PAGE_SIZE = 50
+
+# Sharding (todo.sharding): task data partitioned by owner across these
+# database aliases, e.g. ["default", "shard1"]. Empty: everything on default.
+# Run `manage.py migrate --database <alias>` for each shard first.
+TASKS_SHARDS = []
+
+# Template engine of the list, update and delete pages: "django", or "jinja2"
+# for their Jinja2 versions in tasks/jinja2/ (see todo.jinja). The Jinja2
+# backend is only declared when the optional jinja2 package is installed.
+TASKS_TEMPLATE_ENGINE = "django"
+if find_spec("jinja2"):
+    TEMPLATES.append(
+        {
+            "BACKEND": "django.template.backends.jinja2.Jinja2",
+            "DIRS": [],
+            "APP_DIRS": True,
+            "OPTIONS": {
+                "environment": "todo.jinja.environment",
+                "context_processors": ["todo.context_processors.version"],
+            },
+        }
+    )
+
+# Admission control (todo.throttle). Token buckets per client and route
+# class, as (requests per second, burst): "read" is GET/HEAD/OPTIONS,
+# "write" the rest; an empty bucket answers 429. Past
+# TASKS_THROTTLE_MAX_WRITES writes in progress over all workers, writes
+# answer 503 (None: no cap). Both with Retry-After. The counters live in
+# TASKS_THROTTLE_STORE, a SQLite file shared by the worker processes.
+TASKS_THROTTLE = False
+TASKS_THROTTLE_RATES = {"read": (20, 60), "write": (5, 20)}
+TASKS_THROTTLE_MAX_WRITES = 8
+TASKS_THROTTLE_STORE = BASE_DIR / "throttle.sqlite3"
+
+# Request profiling (todo.profiling). Off: the middleware is not loaded. On:
+# requests sent by staff with "X-Profile: 1", and a TASKS_PROFILE_SAMPLE_RATE
+# fraction of all requests, run under cProfile; the newest TASKS_PROFILE_KEEP
+# profiles are kept in TASKS_PROFILE_DIR and listed in the admin.
+TASKS_PROFILE = False
+TASKS_PROFILE_SAMPLE_RATE = 0.0
+TASKS_PROFILE_DIR = BASE_DIR / "profiles"
+TASKS_PROFILE_KEEP = 200
+
+# Slow query log (todo.slowlog): queries of a request taking at least
+# TASKS_SLOW_QUERY_MS milliseconds are logged with their query plan, as JSON
+# lines, to TASKS_SLOW_QUERY_LOG (rotated at TASKS_SLOW_QUERY_LOG_BYTES,
+# keeping TASKS_SLOW_QUERY_LOG_BACKUPS old files). `manage.py slow_queries`
+# ranks them. None: off.
+TASKS_SLOW_QUERY_MS = None
+TASKS_SLOW_QUERY_LOG = BASE_DIR / "slow_queries.log"
+TASKS_SLOW_QUERY_LOG_BYTES = 10 * 2**20
+TASKS_SLOW_QUERY_LOG_BACKUPS = 5
+
+# Backups (`manage.py backup_db` / `restore_db`, todo.sqlite_backup): online
+# copies through SQLite's backup API, TASKS_BACKUP_PAGES pages at a time with
+# TASKS_BACKUP_SLEEP seconds between steps so requests keep their latency.
+# Each backup is integrity-checked, optionally gzipped, and gets a .sha256
+# file; the newest TASKS_BACKUP_KEEP per database are kept (None: all).
+# `backup_db --every` repeats every TASKS_BACKUP_INTERVAL seconds.
+TASKS_BACKUP_DIR = BASE_DIR / "backups"
+TASKS_BACKUP_KEEP = 48
+TASKS_BACKUP_COMPRESS = False
+TASKS_BACKUP_PAGES = 256
+TASKS_BACKUP_SLEEP = 0.005
+TASKS_BACKUP_INTERVAL = 3600
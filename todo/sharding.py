@@ -0,0 +1,171 @@
+"""Partition the task data by owner across several SQLite databases.
+
+Off until ``TASKS_SHARDS`` lists database aliases. Every row of the models
+in ``SHARDED_MODELS`` then lives on the shard of its owner, so each shard
+has its own file and its own writer lock. Users, sessions, jobs and the
+placement table stay on ``default``.
+
+An owner's shard is picked once, the first time the owner is seen
+(``owner_id % len(TASKS_SHARDS)``), and recorded in ``ShardPlacement``:
+listing a new shard does not move anybody, and
+``manage.py rebalance_shards`` moves one owner at a time. Unowned rows live
+on the first shard.
+
+``ShardRoutingMiddleware`` points a request at the shard of its user;
+code running outside a request picks the shard with ``using_owner()`` or
+visits them all with ``each_shard()`` / ``gather()``.
+"""
+
+import heapq
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+
+SHARDED_MODELS = {
+    "tasks.tasklist",
+    "tasks.tag",
+    "tasks.task",
+    "tasks.tasktag",
+    "tasks.archivedtask",
+    "tasks.taskchange",
+}
+
+# Shard n allocates ids from n * SHARD_ID_SPAN: ids stay unique across
+# shards, so an owner moves with its ids unchanged.
+SHARD_ID_SPAN = 2**40
+
+_shard_alias = ContextVar("shard_alias", default=None)
+
+
+def aliases():
+    """The shards, or ``[None]`` (plain routing) when sharding is off."""
+    return list(settings.TASKS_SHARDS) or [None]
+
+
+def shard_for(owner_id):
+    """The alias holding ``owner_id``'s rows (placing a new owner)."""
+    shards = settings.TASKS_SHARDS
+    if not shards:
+        return None
+    if owner_id is None:
+        return shards[0]
+    ShardPlacement = apps.get_model("tasks", "ShardPlacement")
+    placements = ShardPlacement.objects.using(DEFAULT_DB_ALIAS)
+    alias = placements.filter(owner_id=owner_id).values_list("alias", flat=True)
+    alias = alias.first()
+    if alias is None:
+        alias = placements.get_or_create(
+            owner_id=owner_id, defaults={"alias": shards[owner_id % len(shards)]}
+        )[0].alias
+    return alias
+
+
+@contextmanager
+def using_shard(alias):
+    token = _shard_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _shard_alias.reset(token)
+
+
+@contextmanager
+def using_owner(owner_id):
+    """Route the sharded models to ``owner_id``'s shard meanwhile."""
+    with using_shard(shard_for(owner_id)):
+        yield
+
+
+def each_shard():
+    """Iterate over the shards, routing to each in turn (once if off)."""
+    for alias in aliases():
+        with using_shard(alias):
+            yield alias
+
+
+def gather(queryset, key):
+    """Scatter ``queryset`` to every shard and merge the results by ``key``.
+
+    ``queryset`` must be ordered by the same ``key``.
+    """
+    return heapq.merge(
+        *(queryset.using(alias).iterator() for alias in aliases()), key=key
+    )
+
+
+def seed_id_ranges(using):
+    """Start the id sequences of shard ``using`` at its ``SHARD_ID_SPAN``."""
+    shards = settings.TASKS_SHARDS
+    connection = connections[using]
+    if using not in shards or connection.vendor != "sqlite":
+        return
+    floor = shards.index(using) * SHARD_ID_SPAN
+    if not floor:
+        return
+    with connection.cursor() as cursor:
+        for label in sorted(SHARDED_MODELS):
+            model = apps.get_model(label)
+            if not model._meta.pk.db_returning:
+                continue  # not an AUTOINCREMENT key
+            table = model._meta.db_table
+            cursor.execute(
+                "UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s",
+                [floor, table, floor],
+            )
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s "
+                "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)",
+                [table, floor, table],
+            )
+
+
+def seed_after_migrate(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    if sender.label == "tasks":
+        seed_id_ranges(using)
+
+
+class ShardRouter:
+    """Goes before ``ReplicaRouter``; answers only for the sharded models."""
+
+    def _shard(self, model, instance=None, **hints):
+        if not settings.TASKS_SHARDS or model._meta.label_lower not in SHARDED_MODELS:
+            return None
+        if instance is not None:
+            label = instance._meta.label_lower
+            if label in SHARDED_MODELS:
+                if instance._state.db:
+                    return instance._state.db
+                if hasattr(instance, "owner_id"):
+                    return shard_for(instance.owner_id)
+            elif label == settings.AUTH_USER_MODEL.lower():
+                return shard_for(instance.pk)  # user.tasks and the like
+        return _shard_alias.get() or settings.TASKS_SHARDS[0]
+
+    db_for_read = _shard
+    db_for_write = _shard
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or db not in settings.TASKS_SHARDS:
+            return None
+        # Only the sharded tables; data migrations (no model) are skipped.
+        return model_name is not None and (
+            f"{app_label}.{model_name}" in SHARDED_MODELS
+        )
+
+
+class ShardRoutingMiddleware(MiddlewareMixin):
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if settings.TASKS_SHARDS:
+            user = request.user
+            owner_id = user.pk if user.is_authenticated else None
+            request._shard_alias_token = _shard_alias.set(shard_for(owner_id))
+
+    def process_response(self, request, response):
+        token = getattr(request, "_shard_alias_token", None)
+        if token is not None:
+            _shard_alias.reset(token)
+        return response
@@ -0,0 +1,169 @@
+"""Slow query log: every query over ``TASKS_SLOW_QUERY_MS``, with its plan.
+
+``SlowQueryMiddleware`` installs ``SlowQueryLog`` on each database
+connection with ``connection.execute_wrapper()`` for the length of a
+request. A query slower than the threshold is written as one JSON line to
+``TASKS_SLOW_QUERY_LOG`` with:
+
+* its SQL (parameters left out: they hold user data) and a fingerprint of
+  it with literals and ``IN`` lists collapsed, so the same query with other
+  values adds up under one key;
+* SQLite's ``EXPLAIN QUERY PLAN`` for it, run with the same parameters;
+* the view, URL name and path of the request that issued it.
+
+``manage.py slow_queries`` ranks the fingerprints by total time. Off when
+the threshold is None; ASGI requests are not watched (the view runs in
+another thread, with its own connections).
+"""
+
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import re
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process (runserver) writes the log
+    fcntl = None
+
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+
+def fingerprint(sql):
+    """``(digest, normalized SQL)``: the query with its values blanked out."""
+    text = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    text = re.sub(r"\b\d+(?:\.\d+)?\b", "?", text).replace("%s", "?")
+    text = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(...)", text)
+    text = re.sub(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+", "(...)", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha1(text.encode()).hexdigest()[:12], text
+
+
+def query_plan(connection, sql, params):
+    """SQLite's plan as indented lines, or None if it cannot be had."""
+    if connection.vendor != "sqlite" or not sql.lstrip().upper().startswith(
+        EXPLAINABLE
+    ):
+        return None
+    # A cursor of its own: the query's rows may not have been fetched yet.
+    cursor = connection.create_cursor()
+    try:
+        rows = cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except Exception:
+        return None
+    finally:
+        cursor.close()
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+class SharedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """A rotating file that several worker processes append to.
+
+    Rotation happens under a lock file, and a process whose file was rotated
+    by another one reopens the new file instead of writing to the old.
+    """
+
+    def emit(self, record):
+        if fcntl is None:
+            return super().emit(record)
+        with open(f"{self.baseFilename}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if self.stream is not None and self._rotated():
+                self.stream.close()
+                self.stream = None
+            super().emit(record)
+
+    def _rotated(self):
+        try:
+            current = os.stat(self.baseFilename).st_ino
+        except FileNotFoundError:
+            return True
+        return current != os.fstat(self.stream.fileno()).st_ino
+
+
+_handlers = {}
+
+
+def write(entry):
+    path = str(settings.TASKS_SLOW_QUERY_LOG)
+    if path not in _handlers:
+        handler = SharedRotatingFileHandler(
+            path,
+            maxBytes=settings.TASKS_SLOW_QUERY_LOG_BYTES,
+            backupCount=settings.TASKS_SLOW_QUERY_LOG_BACKUPS,
+            encoding="utf-8",
+            delay=True,
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _handlers[path] = handler
+    _handlers[path].handle(logging.makeLogRecord({"msg": json.dumps(entry)}))
+
+
+class SlowQueryLog:
+    """An execute wrapper timing each query of one request."""
+
+    def __init__(self, request, threshold_ms):
+        self.request = request
+        self.threshold = threshold_ms / 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.threshold:
+                self.log(sql, params, many, context["connection"], elapsed)
+
+    def log(self, sql, params, many, connection, elapsed):
+        digest, normalized = fingerprint(sql)
+        match = getattr(self.request, "resolver_match", None)
+        write(
+            {
+                "at": datetime.now(timezone.utc).isoformat(),
+                "ms": round(elapsed * 1000, 3),
+                "fingerprint": digest,
+                "normalized": normalized,
+                "sql": sql,
+                "many": many,
+                "plan": None if many else query_plan(connection, sql, params),
+                "alias": connection.alias,
+                "view": match.view_name if match else None,
+                "url_name": match.url_name if match else None,
+                "method": self.request.method,
+                "path": self.request.path,
+            }
+        )
+
+
+class SlowQueryMiddleware(MiddlewareMixin):
+    """Goes first: watches the queries of every other middleware too."""
+
+    def __init__(self, get_response):
+        if settings.TASKS_SLOW_QUERY_MS is None:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return super().__call__(request)
+        wrapper = SlowQueryLog(request, settings.TASKS_SLOW_QUERY_MS)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(wrapper))
+            return self.get_response(request)
@@ -0,0 +1,144 @@
+"""Online copies of the SQLite database through the sqlite3 backup API.
+
+Used by the read replica (``copy_database()``) and by ``manage.py
+backup_db`` / ``restore_db``.
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.db import connections
+
+CHUNK = 2**20
+
+
+def copy_database(target, alias="default", pages=256, sleep=0.005):
+    """Copy database ``alias`` into the file ``target`` while it stays online.
+
+    Pages are copied ``pages`` at a time with ``sleep`` seconds between steps
+    so writers are never starved. The copy is written next to ``target`` and
+    moved into place atomically: readers see the old file or the new one,
+    never a half-written one.
+    """
+    target = Path(target)
+    partial = target.with_name(target.name + ".partial")
+    connection = connections[alias]
+    connection.ensure_connection()
+    destination = sqlite3.connect(partial)
+    try:
+        connection.connection.backup(destination, pages=pages, sleep=sleep)
+    finally:
+        destination.close()
+    os.replace(partial, target)
+    return target
+
+
+def integrity_error(path):
+    """None if the database file ``path`` is sound, else SQLite's complaint."""
+    database = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = database.execute("PRAGMA integrity_check").fetchall()
+    except sqlite3.DatabaseError as e:
+        return str(e)
+    finally:
+        database.close()
+    result = "; ".join(row[0] for row in rows)
+    return None if result == "ok" else result
+
+
+def sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def checksum_path(path):
+    return Path(f"{path}.sha256")
+
+
+def verify(path):
+    """True when ``path`` matches its ``.sha256`` file, None if it has none."""
+    try:
+        expected = checksum_path(path).read_text().split()[0]
+    except (FileNotFoundError, IndexError):
+        return None
+    return sha256(path) == expected
+
+
+def backups(directory, alias):
+    """Backups of ``alias`` in ``directory``, newest first."""
+    found = [
+        path
+        for path in Path(directory).glob(f"{alias}-*.sqlite3*")
+        if path.name.endswith((".sqlite3", ".sqlite3.gz"))
+    ]
+    return sorted(found, key=lambda path: path.name, reverse=True)
+
+
+def backup(directory, alias="default", compress=False, keep=None, **copy_options):
+    """Back database ``alias`` up into ``directory``; returns the file.
+
+    The online copy (``copy_database()``) is checked with ``PRAGMA
+    integrity_check``, gzipped if ``compress``, and gets a ``sha256sum``
+    compatible ``.sha256`` file. Only the newest ``keep`` backups of the
+    alias are kept. Everything after the copy works on the copy alone.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    target = copy_database(
+        directory / f"{alias}-{stamp}.sqlite3", alias, **copy_options
+    )
+    error = integrity_error(target)
+    if error:
+        target.unlink()
+        raise sqlite3.DatabaseError(f"The copy of {alias} is corrupt: {error}")
+    if compress:
+        packed = target.with_name(target.name + ".gz")
+        partial = packed.with_name(packed.name + ".partial")
+        with open(target, "rb") as source, gzip.open(partial, "wb") as destination:
+            shutil.copyfileobj(source, destination, CHUNK)
+        os.replace(partial, packed)
+        target.unlink()
+        target = packed
+    checksum_path(target).write_text(f"{sha256(target)}  {target.name}\n")
+    if keep:
+        for old in backups(directory, alias)[keep:]:
+            old.unlink()
+            checksum_path(old).unlink(missing_ok=True)
+    return target
+
+
+def restore(path, alias="default", pages=256, sleep=0.005):
+    """Copy the backup ``path`` over database ``alias``, online.
+
+    A gzipped backup is unpacked to a temporary file first, and the copy is
+    refused if it fails ``PRAGMA integrity_check``. It goes through the
+    backup API into the live connection, so processes that have the
+    database open see the restored data, not a swapped file.
+    """
+    path = Path(path)
+    with tempfile.TemporaryDirectory() as tmp:
+        if path.name.endswith(".gz"):
+            unpacked = Path(tmp) / path.name[: -len(".gz")]
+            with gzip.open(path, "rb") as source, open(unpacked, "wb") as destination:
+                shutil.copyfileobj(source, destination, CHUNK)
+            path = unpacked
+        error = integrity_error(path)
+        if error:
+            raise sqlite3.DatabaseError(f"{path.name} is corrupt: {error}")
+        connection = connections[alias]
+        connection.ensure_connection()
+        source = sqlite3.connect(path)
+        try:
+            source.backup(connection.connection, pages=pages, sleep=sleep)
+        finally:
+            source.close()
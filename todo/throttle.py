@@ -0,0 +1,175 @@
+"""Admission control: shed load before it queues behind the writer lock.
+
+``AdmissionMiddleware`` checks two limits before a view runs:
+
+* a token bucket per client and route class (``read``: GET/HEAD/OPTIONS,
+  ``write``: the rest), refilled at ``TASKS_THROTTLE_RATES[cls][0]``
+  requests per second up to a burst of ``[1]``; an empty bucket answers
+  429;
+* a cap on writes in progress across all workers
+  (``TASKS_THROTTLE_MAX_WRITES``); past it a write answers 503 at once
+  instead of waiting for SQLite's lock.
+
+Both carry ``Retry-After``. A client is its user when logged in, its
+address otherwise. The counters live in a small SQLite file of their own
+(``TASKS_THROTTLE_STORE``), shared by every worker process and never
+touching the application database. If the store fails, requests are let
+through.
+"""
+
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+# A write slot held longer than this is taken for leaked and freed.
+SLOT_TTL = 300
+
+
+class SharedStore:
+    """Buckets and write slots, in a SQLite file every worker opens."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def connect(self):
+        # One connection per thread, reopened in a forked child.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # counters, not data
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bucket "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, stamp REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS slot "
+                "(id INTEGER PRIMARY KEY, pid INTEGER NOT NULL, since REAL NOT NULL)"
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key, rate, burst, now=None):
+        """Take a token from bucket ``key``: 0, or seconds until one is due."""
+        now = time.time() if now is None else now
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, stamp FROM bucket WHERE key = ?", [key]
+            ).fetchone()
+            tokens = burst
+            if row is not None:
+                tokens = min(burst, row[0] + max(0.0, now - row[1]) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute(
+                "INSERT OR REPLACE INTO bucket (key, tokens, stamp) VALUES (?, ?, ?)",
+                [key, tokens, now],
+            )
+            if random.random() < 0.001:
+                # Idle for an hour: full again, as good as absent.
+                conn.execute("DELETE FROM bucket WHERE stamp < ?", [now - 3600])
+        finally:
+            conn.execute("COMMIT")
+        return wait
+
+    def acquire(self, cap):
+        """A write slot id, or None when ``cap`` writes are in progress."""
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._in_use(conn) >= cap and self._reap(conn) >= cap:
+                return None
+            return conn.execute(
+                "INSERT INTO slot (pid, since) VALUES (?, ?)",
+                [os.getpid(), time.time()],
+            ).lastrowid
+        finally:
+            conn.execute("COMMIT")
+
+    def release(self, slot):
+        self.connect().execute("DELETE FROM slot WHERE id = ?", [slot])
+
+    def _in_use(self, conn):
+        return conn.execute("SELECT COUNT(*) FROM slot").fetchone()[0]
+
+    def _reap(self, conn):
+        """Free leaked slots and those of dead processes; returns the rest."""
+        conn.execute("DELETE FROM slot WHERE since < ?", [time.time() - SLOT_TTL])
+        for (pid,) in conn.execute("SELECT DISTINCT pid FROM slot").fetchall():
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                conn.execute("DELETE FROM slot WHERE pid = ?", [pid])
+            except PermissionError:
+                pass  # alive, under another user
+        return self._in_use(conn)
+
+
+_stores = {}
+
+
+def store():
+    path = str(settings.TASKS_THROTTLE_STORE)
+    if path not in _stores:
+        _stores[path] = SharedStore(path)
+    return _stores[path]
+
+
+def client_key(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"addr:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def refuse(status, retry_after, reason):
+    response = HttpResponse(reason, status=status, content_type="text/plain")
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+class AdmissionMiddleware(MiddlewareMixin):
+    """Goes after ``AuthenticationMiddleware`` (clients are users)."""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.TASKS_THROTTLE:
+            return None
+        route = "read" if request.method in READ_METHODS else "write"
+        limit = settings.TASKS_THROTTLE_RATES.get(route)
+        shared = store()
+        try:
+            if limit:
+                wait = shared.take(f"{route}:{client_key(request)}", *limit)
+                if wait:
+                    return refuse(429, wait, "Too many requests, slow down.")
+            cap = settings.TASKS_THROTTLE_MAX_WRITES
+            if route == "write" and cap:
+                request._write_slot = shared.acquire(cap)
+                if request._write_slot is None:
+                    return refuse(503, 1, "Too many writes in progress.")
+        except sqlite3.Error:
+            return None  # fail open: the limits are a safeguard
+        return None
+
+    def process_response(self, request, response):
+        slot = getattr(request, "_write_slot", None)
+        if slot is not None:
+            try:
+                store().release(slot)
+            except sqlite3.Error:
+                pass  # reaped after SLOT_TTL, at worst
+        return response
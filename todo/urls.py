@@ -17,4 +17,16 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
-urlpatterns = [path("admin/", admin.site.urls), path("", include("tasks.urls"))]
+from tasks.admin import download_profile, profiles
+
+urlpatterns = [
+    # Before admin.site.urls, whose catch-all would answer 404 first.
+    path("admin/profiles/", admin.site.admin_view(profiles), name="profiles"),
+    path(
+        "admin/profiles/<str:name>",
+        admin.site.admin_view(download_profile),
+        name="profile_download",
+    ),
+    path("admin/", admin.site.urls),
+    path("", include("tasks.urls")),
+]
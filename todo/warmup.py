@@ -0,0 +1,144 @@
+"""Pay the cold-start costs before a worker takes traffic.
+
+``warm_up()`` is called by ``todo.wsgi`` / ``todo.asgi`` when
+``TASKS_WARMUP`` is on. Without it the first request of every fresh worker
+populates the URL resolver, compiles its templates and imports the lazily
+loaded view, ORM and database backend code, and is a latency outlier.
+
+Database connections are not opened ahead: Django keeps one per thread and
+closes it when a request starts or ends (``CONN_MAX_AGE`` is 0), so one
+opened here would never serve a request.
+
+``profile_stages()`` measures the same steps from a cold interpreter; it is
+what ``manage.py profile_startup`` runs in a subprocess.
+"""
+
+import importlib
+import os
+import sys
+import time
+from contextlib import contextmanager
+from wsgiref.util import setup_testing_defaults
+
+
+@contextmanager
+def _timed(timings, stage):
+    # Appended first, so stages nested inside are listed after it.
+    entry = [stage, 0.0]
+    timings.append(entry)
+    start = time.perf_counter()
+    yield
+    entry[1] = time.perf_counter() - start
+
+
+def _time_dynamic_imports(timings):
+    """Time the outermost ``importlib.import_module()`` calls.
+
+    Django imports the settings, app configs and models modules that way,
+    which ``python -X importtime`` does not report. Has to be installed
+    before django is imported (it binds ``import_module`` at import time).
+    """
+    original = importlib.import_module
+    depth = 0
+
+    def import_module(name, package=None):
+        nonlocal depth
+        if depth or name in sys.modules:
+            return original(name, package)
+        depth += 1
+        try:
+            with _timed(timings, f"  import {name}"):
+                return original(name, package)
+        finally:
+            depth -= 1
+
+    importlib.import_module = import_module
+
+
+def warm_up(timings=None):
+    """Run every warm-up stage; returns ``[[stage, seconds], ...]``."""
+    from django.conf import settings
+    from django.db import DEFAULT_DB_ALIAS, connections
+    from django.template import TemplateDoesNotExist, engines
+    from django.template.loader import get_template
+    from django.urls import resolve, reverse
+    from django.utils.module_loading import import_string
+
+    from tasks.models import Task
+    from todo.routers import REPLICA
+
+    timings = [] if timings is None else timings
+    with _timed(timings, "warm-up: urls"):
+        # Reversing populates the resolver; resolving imports the views.
+        resolve(reverse("list"))
+    with _timed(timings, "warm-up: templates"):
+        for name in settings.TASKS_WARMUP_TEMPLATES:
+            try:
+                get_template(name, using=settings.TASKS_TEMPLATE_ENGINE)
+            except TemplateDoesNotExist:
+                get_template(name)  # a page with no Jinja2 version
+        for backend in engines.all():
+            # Context processors of the Django template engine(s).
+            engine = getattr(backend, "engine", None)
+            for path in getattr(engine, "context_processors", ()):
+                import_string(path)
+        import_string(settings.MESSAGE_STORAGE)
+    with _timed(timings, "warm-up: orm"):
+        routed = {DEFAULT_DB_ALIAS, REPLICA, *settings.TASKS_SHARDS}
+        for alias in connections:
+            if alias in routed:  # not e.g. a shard left out of TASKS_SHARDS
+                connections[alias].ops  # noqa: B018 (imports the backend)
+        # Compiles a query, without running it, to pull the ORM's hot paths in.
+        Task.objects.filter(complete=False)[:1].query.get_compiler(
+            DEFAULT_DB_ALIAS
+        ).as_sql()
+    return timings
+
+
+def use_database(name):
+    """Point the default database at the SQLite file ``name``.
+
+    For a fresh interpreter, before anything connects (``profile_stages()``
+    and the migration ``manage.py profile_startup`` runs for it).
+    """
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = name
+
+
+def profile_stages(warm=False, database=None):
+    """Time a cold start, stage by stage, up to the second request.
+
+    Must run in a fresh interpreter: it imports the settings and sets
+    Django up itself. With ``warm`` the warm-up runs before the requests;
+    with ``database`` they run against that SQLite file instead of the
+    default database. Returns ``[[stage, seconds], ...]``.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
+    timings = []
+    _time_dynamic_imports(timings)
+    with _timed(timings, "import settings"):
+        from django.conf import settings
+
+        settings.INSTALLED_APPS  # noqa: B018 (loads the settings module)
+    if database is not None:
+        use_database(database)
+    with _timed(timings, "django.setup (apps, models)"):
+        import django
+
+        django.setup(set_prefix=False)
+    with _timed(timings, "wsgi application (middleware)"):
+        from django.core.handlers.wsgi import WSGIHandler
+
+        application = WSGIHandler()
+    if warm:
+        warm_up(timings)
+
+    host = next((h for h in settings.ALLOWED_HOSTS if "*" not in h), "localhost")
+    for stage in ("first request", "second request"):
+        environ = {}
+        setup_testing_defaults(environ)
+        environ["HTTP_HOST"] = host.lstrip(".")
+        with _timed(timings, stage):
+            b"".join(application(environ, lambda status, headers: None))
+    return timings
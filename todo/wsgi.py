@@ -2,6 +2,7 @@
 WSGI config for todo project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+With ``TASKS_WARMUP`` on, the worker is warmed up (todo.warmup) on import.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
@@ -9,8 +10,15 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from todo.warmup import warm_up
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
 
 application = get_wsgi_application()
+
+if settings.TASKS_WARMUP:
+    # Before the server hands this worker its first request.
+    warm_up()